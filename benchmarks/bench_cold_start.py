@@ -0,0 +1,110 @@
+"""
+Measure cold-start cost of every Lambda handler.
+
+Each handler is loaded in a fresh Python process, so the numbers include interpreter-level
+import costs exactly as a new Lambda container would pay them. For each handler this reports
+the module import time and the latency of the first invocation with a representative event.
+
+First invocations talk to AWS; point them at DynamoDB Local (serverless dynamodb start) with
+--endpoint-url. Handlers whose dependencies are unavailable locally (e.g. the
+pricing_integration layer) report the error instead of a latency.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--endpoint-url http://localhost:8000] [--import-only]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PROPOSAL_IMAGE = {
+    'StoreID': {'S': 'default'}, 'ProductID': {'S': '1234'}, 'VariantID': {'S': '5678'}, 'CurrentPrice': {'N': '100'},
+    'CompetitorPrice': {'N': '95'}, 'ProposedPrice': {'N': '95'}, 'ApprovalStatus': {'S': 'Pending'}
+}
+REVIEW_BODY = json.dumps({"product_id": "1234", "variant_id": "5678", "reviewer": "bench"})
+
+HANDLERS = {
+    'add_product': {"body": json.dumps({
+        "product_id": "1234", "variant_id": "5678", "competitor_url": "https://example.com/p/1",
+        "current_price": 100, "competitor_price": 95, "proposed_price": 95
+    })},
+    'generate_price_sheet': {"proposals": [{
+        "competitor_url": "https://example.com/p/1", "competitor_product_id": "5678",
+        "competitor_price": 95, "internal_product_id": "1234", "current_price": 100
+    }]},
+    'get_products': {"queryStringParameters": {"limit": "50"}},
+    'get_product_by_id': {"pathParameters": {"product_id": "1234", "variant_id": "5678"}},
+    'approval_handler': {"body": json.dumps({"action": "approve", "product_id": "1234", "variant_id": "5678"})},
+    'approve_price': {"body": REVIEW_BODY},
+    'reject_price': {"body": REVIEW_BODY},
+    'bulk_review': {"body": json.dumps({"action": "approve", "product_id": "1234"})},
+    'email_notifier': {"Records": [{"eventName": "INSERT", "dynamodb": {"SequenceNumber": "1", "NewImage": PROPOSAL_IMAGE}}]},
+    'apply_approved_changes': {"store_id": "default"},
+}
+
+# Runs inside the child process: time the import, then the first call
+CHILD = r"""
+import importlib, json, sys, time
+
+class Context:
+    function_name = 'bench'
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:000000000000:function:bench'
+    def get_remaining_time_in_millis(self):
+        return 900000
+
+module_name, event, import_only = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3] == '1'
+result = {}
+start = time.perf_counter()
+try:
+    module = importlib.import_module('lambda_functions.' + module_name)
+    result['import_ms'] = (time.perf_counter() - start) * 1000
+    if not import_only:
+        start = time.perf_counter()
+        response = module.lambda_handler(event, Context())
+        result['first_call_ms'] = (time.perf_counter() - start) * 1000
+        result['status'] = response.get('statusCode', 'ok') if isinstance(response, dict) else 'ok'
+except Exception as e:
+    result['error'] = f"{type(e).__name__}: {e}"
+print(json.dumps(result))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint-url', help="AWS endpoint override, e.g. DynamoDB Local")
+    parser.add_argument('--import-only', action='store_true', help="Only measure module import time")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh processes per handler; the median is reported")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    if args.endpoint_url:
+        env['AWS_ENDPOINT_URL'] = args.endpoint_url
+        env.setdefault('AWS_ACCESS_KEY_ID', 'local')
+        env.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+
+    print(f"{'handler':<24} {'import ms':>10} {'first call ms':>14}  result")
+    for module_name, event in HANDLERS.items():
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, '-c', CHILD, module_name, json.dumps(event), '1' if args.import_only else '0'],
+                cwd=ROOT, env=env, capture_output=True, text=True
+            )
+            lines = output.stdout.strip().splitlines()
+            runs.append(json.loads(lines[-1]) if lines else {'error': output.stderr.strip().splitlines()[-1:]})
+
+        def median(key):
+            values = sorted(run[key] for run in runs if key in run)
+            return f"{values[len(values) // 2]:.1f}" if values else '-'
+
+        outcome = runs[-1].get('error') or runs[-1].get('status', '')
+        print(f"{module_name:<24} {median('import_ms'):>10} {median('first_call_ms'):>14}  {outcome}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Exercise the competitor price fetcher against the local fixture server.
+
+Runs three crawls over the same URLs, spread across two host names (127.0.0.1 and localhost)
+so per-domain limits apply:
+
+1. cold: every page is fetched and parsed;
+2. warm: every page should come back 304 Not Modified, except the few re-priced in between;
+3. against a server that ignores conditional requests: unchanged pages should hit the
+   parse cache instead of being parsed again.
+
+For each crawl it reports the wall time and status counts, and it checks that:
+- every extracted price equals the fixture price;
+- no host ever saw more requests per second than the configured limit allows.
+
+Usage:
+    python benchmarks/bench_competitor_fetch.py [--urls 200] [--rate 20] [--domain-concurrency 4]
+
+Exits with status 1 when a check fails.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def max_rate(times, window=1.0):
+    """Largest number of requests seen in any `window`-second interval."""
+    times = sorted(times)
+    best = start = 0
+    for end in range(len(times)):
+        while times[end] - times[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=20, help="Requests per second allowed per domain")
+    parser.add_argument('--domain-concurrency', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--reprice', type=int, default=10, help="Pages re-priced between the cold and warm crawls")
+    args = parser.parse_args()
+
+    # The fetcher reads its limits at import time
+    os.environ['COMPETITOR_DOMAIN_RATE_LIMIT'] = str(args.rate)
+    os.environ['COMPETITOR_DOMAIN_CONCURRENCY'] = str(args.domain_concurrency)
+    os.environ.pop('COMPETITOR_PAGE_TABLE', None)
+    # The fixture server listens on loopback, which the fetcher refuses by default
+    os.environ['COMPETITOR_ALLOW_PRIVATE_ADDRESSES'] = 'true'
+
+    from benchmarks import competitor_fixture_server as fixture
+    from lambda_functions.competitor_fetcher import fetch_competitor_prices
+
+    server = fixture.start_server(latency_ms=args.latency_ms)
+    hosts = ('127.0.0.1', 'localhost')
+    product_ids = [f"C{number:05d}" for number in range(args.urls)]
+    urls = {
+        f"http://{hosts[number % len(hosts)]}:{server.server_port}/products/{product_id}": product_id
+        for number, product_id in enumerate(product_ids)
+    }
+
+    failures = []
+
+    def crawl(label):
+        fixture.reset_counters()
+        start = time.perf_counter()
+        results, stats = fetch_competitor_prices(urls)
+        elapsed = time.perf_counter() - start
+
+        for url, product_id in urls.items():
+            expected = fixture.fixture_price(product_id, fixture.CompetitorFixtureHandler.revisions[product_id])
+            if results[url]['price'] != expected:
+                failures.append(f"{label}: {url} priced {results[url]['price']} (expected {expected}; {results[url].get('error')})")
+        rates = {host: max_rate(times) for host, times in fixture.CompetitorFixtureHandler.request_times.items()}
+        for host, rate in rates.items():
+            # One interval of slack for requests released at the edges of the window
+            if rate > args.rate + 1:
+                failures.append(f"{label}: {host} saw {rate} requests in one second (limit {args.rate})")
+
+        print(f"{label:<22} {elapsed:7.2f}s  statuses={stats}  http={dict(fixture.CompetitorFixtureHandler.statuses)}  peak req/s={rates}")
+        return stats
+
+    crawl("cold")
+    fixture.reprice(product_ids[:args.reprice])
+    warm = crawl("warm (conditional)")
+    if warm.get('not_modified', 0) != len(urls) - args.reprice:
+        failures.append(f"warm: expected {len(urls) - args.reprice} not_modified, got {warm}")
+
+    fixture.CompetitorFixtureHandler.ignore_conditional = True
+    unconditional = crawl("warm (no 304 support)")
+    if unconditional.get('parse_cached', 0) != len(urls):
+        failures.append(f"no 304 support: expected {len(urls)} parse_cached, got {unconditional}")
+
+    server.shutdown()
+    if failures:
+        print("\nFailures:\n  " + "\n  ".join(failures[:20]))
+        sys.exit(1)
+    print("\nAll fetcher checks passed.")
+
+
+if __name__ == '__main__':
+    main()
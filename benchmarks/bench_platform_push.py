@@ -0,0 +1,100 @@
+"""
+Measure price-push throughput against the local stub platform server.
+
+Compares the old serial loop with platform_push.push_prices for a mixed batch of
+Shopify, NetSuite and Zoey items, using per-item adapters and, with --bulk, adapters
+backed by the stub's batch endpoint. Each worker thread keeps one HTTP/1.1 connection
+open, as a keep-alive session would.
+
+Usage:
+    python benchmarks/bench_platform_push.py [--items 600] [--latency-ms 80] [--throttle-rate 0.02] [--bulk]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.stub_platform_server import start_server
+from lambda_functions import platform_adapters, platform_push
+
+
+class ThrottledError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Throttled, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def make_adapter(port, platform, bulk=False):
+    """Build a platform adapter whose update functions call the stub server."""
+    local = threading.local()
+
+    def post(payload):
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection('127.0.0.1', port)
+        local.connection.request('POST', f'/{platform}/prices', json.dumps(payload, default=str), {'Content-Type': 'application/json'})
+        response = local.connection.getresponse()
+        response.read()
+        if response.status == 429:
+            raise ThrottledError(float(response.getheader('Retry-After', '1')))
+        return response.status == 200
+
+    def update_product_price(product_id, variant_id, price):
+        return post({"product_id": product_id, "variant_id": variant_id, "price": price})
+
+    def bulk_update_product_prices(updates):
+        success = post({"items": updates})
+        return {(update['product_id'], update['variant_id']): success for update in updates}
+
+    adapter_class = platform_adapters.ADAPTER_CLASSES[platform]
+    return adapter_class(update_product_price, bulk_update_product_prices if bulk else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=600)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--throttle-rate', type=float, default=0.02)
+    parser.add_argument('--bulk', action='store_true', help="Use the stub's batch endpoint")
+    args = parser.parse_args()
+
+    server = start_server(latency_ms=args.latency_ms, throttle_rate=args.throttle_rate)
+    adapters = {
+        platform: make_adapter(server.server_port, platform, args.bulk)
+        for platform in platform_adapters.ADAPTER_CLASSES
+    }
+
+    # The stub has no real rate limit, so let the benchmark measure concurrency alone
+    for platform in platform_push.PLATFORM_RATE_LIMIT:
+        platform_push.PLATFORM_RATE_LIMIT[platform] = 1000
+
+    platforms = list(adapters)
+    items = [
+        {'ProductID': f'P{i}', 'VariantID': f'V{i}', 'ProposedPrice': '9.99', 'Platform': platforms[i % len(platforms)]}
+        for i in range(args.items)
+    ]
+
+    serial_count = min(len(items), 100)
+    start = time.perf_counter()
+    for item in items[:serial_count]:
+        limiter = platform_push.RateLimiter(1000)
+        platform_push.push_with_retry(adapters[item['Platform']], limiter, [item])
+    serial_rate = serial_count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = list(platform_push.push_prices(items, adapters.get))
+    concurrent_elapsed = time.perf_counter() - start
+    succeeded = sum(1 for _, _, success, _ in results if success)
+
+    print(f"serial:     {serial_rate:8.1f} items/s (sampled {serial_count} items)")
+    print(f"concurrent: {len(items) / concurrent_elapsed:8.1f} items/s ({succeeded}/{len(items)} succeeded in {concurrent_elapsed:.2f}s)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
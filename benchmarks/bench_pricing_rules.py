@@ -0,0 +1,125 @@
+"""
+Compare the vectorized pricing engine against the original per-row proposal loop.
+
+Both sides are timed end to end on what generate_price_sheet receives: a batch of feed rows
+as dicts with string prices plus the minimum prices by product. The engine side builds its
+float64 columns in the validation pass, as process_proposals does, and then evaluates them.
+Parsing the dicts costs the same on both sides and dominates a single if/else per row, so
+with the default match_competitor rule the engine path is slower than the loop: filling the
+columns costs more than the comparison it replaces. The engine pays off with multi-rule
+pipelines, which are compared against their scalar equivalent.
+
+Usage:
+    python benchmarks/bench_pricing_rules.py [--rows 100000] [--repeat 5]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.pricing_rules import PricingEngine
+
+
+def per_row_loop(feed, minimum_prices):
+    """The scalar if/else generate_price_sheet applied to each proposal."""
+    proposed = []
+    for row in feed:
+        current_price = float(row['current_price'])
+        competitor_price = float(row['competitor_price'])
+        min_price = minimum_prices[row['internal_product_id']]
+        if competitor_price < current_price and competitor_price >= min_price:
+            proposed.append(competitor_price)
+        else:
+            proposed.append(current_price)
+    return proposed
+
+
+def per_row_pipeline(feed, minimum_prices):
+    """Scalar equivalent of the 4-rule pipeline benchmarked below."""
+    proposed = []
+    for row in feed:
+        current_price = float(row['current_price'])
+        competitor_price = float(row['competitor_price'])
+        min_price = minimum_prices[row['internal_product_id']]
+        price = competitor_price * 0.99 if competitor_price < current_price else current_price
+        if price >= 0.99:
+            price = math.floor(max(price - 0.99, 0) + 1e-9) + 0.99
+        allowed = current_price * 10 / 100
+        price = min(max(price, current_price - allowed), current_price + allowed)
+        proposed.append(round(max(price, min_price), 2))
+    return proposed
+
+
+def engine_from_dicts(engine, feed, minimum_prices):
+    """The process_proposals path: fill preallocated columns while validating, then evaluate."""
+    current = np.empty(len(feed))
+    competitor = np.empty(len(feed))
+    minimum = np.empty(len(feed))
+    for index, row in enumerate(feed):
+        current[index] = float(row['current_price'])
+        competitor[index] = float(row['competitor_price'])
+        minimum[index] = minimum_prices[row['internal_product_id']]
+    return engine.evaluate(current, competitor, minimum).tolist()
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    current = np.round(rng.uniform(5, 500, args.rows), 2)
+    competitor = np.round(current * rng.uniform(0.7, 1.2, args.rows), 2)
+    minimum = np.round(current * rng.uniform(0.6, 0.95, args.rows), 2)
+
+    # Feed rows arrive with string prices, as in the event payload and the streamed feeds
+    feed = [
+        {'internal_product_id': f"P{index}", 'competitor_price': f"{competitor_price:.2f}", 'current_price': f"{current_price:.2f}"}
+        for index, (current_price, competitor_price) in enumerate(zip(current.tolist(), competitor.tolist()))
+    ]
+    minimum_prices = {f"P{index}": min_price for index, min_price in enumerate(minimum.tolist())}
+
+    default_engine = PricingEngine()
+    full_engine = PricingEngine.from_config([
+        {"rule": "undercut", "percent": 1},
+        {"rule": "round_ending", "ending": 0.99},
+        {"rule": "max_delta", "max_percent": 10},
+        {"rule": "bounds", "floor_column": "minimum_price"},
+    ])
+
+    assert np.array_equal(engine_from_dicts(default_engine, feed, minimum_prices), np.round(per_row_loop(feed, minimum_prices), 2))
+    # np.round and round() may settle a half cent differently
+    assert np.allclose(engine_from_dicts(full_engine, feed, minimum_prices), per_row_pipeline(feed, minimum_prices), atol=0.011)
+
+    loop_time = best_of(lambda: per_row_loop(feed, minimum_prices), args.repeat)
+    default_time = best_of(lambda: engine_from_dicts(default_engine, feed, minimum_prices), args.repeat)
+    pipeline_loop_time = best_of(lambda: per_row_pipeline(feed, minimum_prices), args.repeat)
+    full_time = best_of(lambda: engine_from_dicts(full_engine, feed, minimum_prices), args.repeat)
+    evaluate_time = best_of(lambda: full_engine.evaluate(current, competitor, minimum), args.repeat)
+
+    # Ratios above 1x mean the engine path is faster than the per-row loop
+    print(f"rows: {args.rows} (dicts with string prices -> proposed prices)")
+    print(f"per-row loop (match_competitor):   {loop_time * 1000:8.2f} ms")
+    print(f"engine (match_competitor):         {default_time * 1000:8.2f} ms  ({loop_time / default_time:.2f}x)")
+    print(f"per-row loop (4-rule pipeline):    {pipeline_loop_time * 1000:8.2f} ms")
+    print(f"engine (4-rule pipeline):          {full_time * 1000:8.2f} ms  ({pipeline_loop_time / full_time:.2f}x)")
+    print(f"  of which evaluate on columns:    {evaluate_time * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
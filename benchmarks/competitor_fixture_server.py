@@ -0,0 +1,133 @@
+"""
+Local fixture of competitor product pages for testing the competitor price fetcher.
+
+Serves GET /products/<id> as an HTML page that publishes its price as JSON-LD, microdata or
+Open Graph meta tags (rotating by id), with ETag and Last-Modified headers. Conditional
+requests are answered with 304 unless --ignore-conditional is set, which mimics sites that
+always resend the page. Request arrival times are recorded per Host header so per-domain rate
+limits can be checked, and pages can be re-priced while the server runs.
+
+Usage:
+    python benchmarks/competitor_fixture_server.py [--port 8082] [--latency-ms 50]
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Served once the process starts; pages keep this Last-Modified until they are re-priced
+STARTED_AT = formatdate(time.time(), usegmt=True)
+
+PAGE_TEMPLATES = [
+    '<html><head><script type="application/ld+json">'
+    '{{"@type": "Product", "sku": "{id}", "offers": {{"@type": "Offer", "price": "{price}", "priceCurrency": "USD"}}}}'
+    '</script></head><body><h1>Product {id}</h1></body></html>',
+    '<html><body><h1>Product {id}</h1><span itemprop="price" content="{price}">${price}</span></body></html>',
+    '<html><head><meta property="product:price:amount" content="{price}"></head><body>Product {id}</body></html>',
+]
+
+
+def fixture_price(product_id, revision=0):
+    """Deterministic price of a fixture product at a given revision."""
+    digest = int(hashlib.sha256(f"{product_id}:{revision}".encode('utf-8')).hexdigest()[:8], 16)
+    return round(5 + (digest % 50000) / 100, 2)
+
+
+class CompetitorFixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.05
+    ignore_conditional = False
+    revisions = defaultdict(int)
+    modified_at = {}
+    request_times = defaultdict(list)
+    statuses = defaultdict(int)
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        host = (self.headers.get('Host') or '').split(':')[0]
+        with self.lock:
+            CompetitorFixtureHandler.request_times[host].append(time.monotonic())
+
+        if not self.path.startswith('/products/'):
+            self._respond(404, b'Not found')
+            return
+
+        product_id = self.path[len('/products/'):]
+        revision = self.revisions[product_id]
+        body = PAGE_TEMPLATES[int(hashlib.sha256(product_id.encode('utf-8')).hexdigest()[:4], 16) % len(PAGE_TEMPLATES)].format(
+            id=product_id, price=f"{fixture_price(product_id, revision):.2f}"
+        ).encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        last_modified = self.modified_at.get(product_id, STARTED_AT)
+
+        if not self.ignore_conditional and (
+            self.headers.get('If-None-Match') == etag
+            or (self.headers.get('If-None-Match') is None and self.headers.get('If-Modified-Since') == last_modified)
+        ):
+            self._respond(304, b'', {'ETag': etag, 'Last-Modified': last_modified})
+            return
+        self._respond(200, body, {'ETag': etag, 'Last-Modified': last_modified, 'Content-Type': 'text/html'})
+
+    def _respond(self, status, body, headers=None):
+        with self.lock:
+            CompetitorFixtureHandler.statuses[status] += 1
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def reprice(product_ids):
+    """Give the given fixture products a new price (and so a new ETag and Last-Modified)."""
+    with CompetitorFixtureHandler.lock:
+        for product_id in product_ids:
+            CompetitorFixtureHandler.revisions[product_id] += 1
+            CompetitorFixtureHandler.modified_at[product_id] = formatdate(time.time() + 1, usegmt=True)
+
+
+def reset_counters():
+    with CompetitorFixtureHandler.lock:
+        CompetitorFixtureHandler.request_times.clear()
+        CompetitorFixtureHandler.statuses.clear()
+
+
+def start_server(port=0, latency_ms=50, ignore_conditional=False):
+    """Start the fixture server on a background thread and return it; port 0 picks a free port."""
+    CompetitorFixtureHandler.latency = latency_ms / 1000
+    CompetitorFixtureHandler.ignore_conditional = ignore_conditional
+    server = ThreadingHTTPServer(('127.0.0.1', port), CompetitorFixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--ignore-conditional', action='store_true')
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency_ms, args.ignore_conditional)
+    print(f"Competitor fixture server listening on http://127.0.0.1:{server.server_port}/products/<id>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Load-test harness for the Lambda handlers against DynamoDB Local and stub platforms.
+
+Generates a synthetic catalog (see synthetic_catalog.py), then drives the handlers in the order
+of a real day: generate_price_sheet over the competitor feed, get_products paging through the
+pending proposals, single approvals through approval_handler, bulk approvals through
+bulk_review, and apply_approved_changes pushing to the stub platform server. For every
+scenario it reports invocation latency (p50/p99/max), DynamoDB calls per operation and
+consumed capacity, and compares them with the stored baseline for the same catalog size.
+
+Start DynamoDB Local first (e.g. `serverless dynamodb start`), then:
+    python benchmarks/load_test.py --variants 10000 [--save-baseline]
+
+Baselines are machine-specific, so none are shipped: record one per catalog size with
+--save-baseline on the machine that runs the comparison, commit benchmarks/baselines.json
+there, and re-save it when a change is expected to move the numbers. Exits with status 1
+when a scenario regresses beyond the tolerance.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = {
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactWriteItems', 'TransactGetItems'
+}
+
+
+class DynamoDBMeter:
+    """Counts DynamoDB calls and consumed capacity through botocore event hooks."""
+
+    def __init__(self, session):
+        self.calls = Counter()
+        self.capacity = 0.0
+        session.events.register('provide-client-params.dynamodb', self._request_capacity)
+        session.events.register('after-call.dynamodb', self._record)
+
+    def _request_capacity(self, params, model, **kwargs):
+        if model.name in CAPACITY_OPERATIONS:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+    def _record(self, parsed, model, **kwargs):
+        self.calls[model.name] += 1
+        consumed = parsed.get('ConsumedCapacity') or []
+        for entry in consumed if isinstance(consumed, list) else [consumed]:
+            self.capacity += float(entry.get('CapacityUnits', 0))
+
+    def snapshot(self):
+        return Counter(self.calls), self.capacity
+
+
+class Context:
+    function_name = 'load-test'
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:000000000000:function:load-test'
+
+    def get_remaining_time_in_millis(self):
+        return 900000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run_scenario(meter, invocations):
+    """Run an iterable of zero-argument callables, timing each one. Returns the scenario metrics."""
+    calls_before, capacity_before = meter.snapshot()
+    latencies = []
+    errors = 0
+    for invoke in invocations:
+        start = time.perf_counter()
+        response = invoke()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if isinstance(response, dict) and response.get('statusCode', 200) >= 400:
+            errors += 1
+    calls_after, capacity_after = meter.snapshot()
+    calls = calls_after - calls_before
+
+    return {
+        'invocations': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(max(latencies, default=0), 2),
+        'dynamodb_calls': sum(calls.values()),
+        'dynamodb_calls_by_operation': dict(calls),
+        'capacity_units': round(capacity_after - capacity_before, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of p99 latency, DynamoDB calls or capacity beyond the tolerance."""
+    regressions = []
+    for scenario, metrics in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        for metric in ('p99_ms', 'dynamodb_calls', 'capacity_units'):
+            if previous.get(metric) and metrics[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{scenario}.{metric}: {metrics[metric]} vs baseline {previous[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variants', type=int, default=10000, help="Catalog size, e.g. 10000 to 1000000")
+    parser.add_argument('--endpoint-url', default='http://localhost:8000')
+    parser.add_argument('--feed-chunk', type=int, default=5000, help="Proposals per generate_price_sheet invocation")
+    parser.add_argument('--page-size', type=int, default=500, help="get_products page size")
+    parser.add_argument('--max-pages', type=int, default=200)
+    parser.add_argument('--single-reviews', type=int, default=200)
+    parser.add_argument('--bulk-products', type=int, default=200)
+    parser.add_argument('--platform-latency-ms', type=float, default=50)
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed regression vs baseline (0.2 = 20%%)")
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    # Handlers read their configuration at import time, so set it up before importing them
+    os.environ['AWS_ENDPOINT_URL'] = args.endpoint_url
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.pop('MIN_PRICE_SNAPSHOT_BUCKET', None)
+    os.environ['APPLY_FAN_OUT'] = 'false'
+
+    import boto3
+    boto3.setup_default_session()
+    meter = DynamoDBMeter(boto3.DEFAULT_SESSION)
+
+    from benchmarks import synthetic_catalog
+    from benchmarks.bench_platform_push import make_adapter
+    from benchmarks.stub_platform_server import start_server
+    from lambda_functions import (
+        apply_approved_changes, approval_handler, bulk_review, generate_price_sheet, get_products, platform_adapters, stores
+    )
+
+    dynamodb = boto3.resource('dynamodb', endpoint_url=args.endpoint_url)
+    synthetic_catalog.create_tables(dynamodb, reset=True)
+    products = synthetic_catalog.load_minimum_prices(dynamodb, args.variants)
+    print(f"Catalog: {args.variants} variants across {products} products")
+
+    # Route platform pushes to the local stub server
+    server = start_server(latency_ms=args.platform_latency_ms)
+    for platform in platform_adapters.ADAPTER_CLASSES:
+        platform_adapters._adapters[platform] = make_adapter(server.server_port, platform, bulk=True)
+
+    context = Context()
+    results = {}
+
+    def feed_invocations():
+        chunk = []
+        for proposal in synthetic_catalog.competitor_feed(args.variants):
+            chunk.append(proposal)
+            if len(chunk) == args.feed_chunk:
+                yield lambda chunk=chunk: generate_price_sheet.lambda_handler({'proposals': chunk}, context)
+                chunk = []
+        if chunk:
+            yield lambda: generate_price_sheet.lambda_handler({'proposals': chunk}, context)
+
+    results['generate_price_sheet'] = run_scenario(meter, feed_invocations())
+
+    # Each page needs the previous page's cursor, so the invocations are built lazily
+    cursor = {'value': None}
+
+    def fetch_page():
+        params = {'limit': str(args.page_size)}
+        if cursor['value']:
+            params['cursor'] = cursor['value']
+        response = get_products.lambda_handler({'queryStringParameters': params}, context)
+        cursor['value'] = json.loads(response['body']).get('next_cursor')
+        return response
+
+    def page_invocations():
+        yield fetch_page
+        for _ in range(args.max_pages - 1):
+            if not cursor['value']:
+                return
+            yield fetch_page
+
+    results['get_products'] = run_scenario(meter, page_invocations())
+
+    rng = random.Random(7)
+    catalog = list(synthetic_catalog.generate_catalog(args.variants))
+    sampled = rng.sample(catalog, min(len(catalog), args.single_reviews + args.bulk_products))
+    single, bulk = sampled[:args.single_reviews], sampled[args.single_reviews:]
+
+    results['approval_handler'] = run_scenario(meter, (
+        lambda product_id=product_id, variant=variants[0]: approval_handler.lambda_handler({'body': json.dumps({
+            'action': 'approve', 'product_id': product_id, 'variant_id': variant['variant_id'], 'reviewer': 'load-test'
+        })}, context)
+        for product_id, _, variants in single
+    ))
+    results['bulk_review'] = run_scenario(meter, (
+        lambda product_id=product_id: bulk_review.lambda_handler({'body': json.dumps({
+            'action': 'approve', 'product_id': product_id, 'reviewer': 'load-test'
+        })}, context)
+        for product_id, _, _ in bulk
+    ))
+    results['apply_approved_changes'] = run_scenario(meter, [
+        lambda: apply_approved_changes.lambda_handler({'store_id': stores.DEFAULT_STORE_ID}, context)
+    ])
+    server.shutdown()
+
+    print(f"\n{'scenario':<24} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'ddb calls':>10} {'capacity':>10}")
+    for scenario, metrics in results.items():
+        print(
+            f"{scenario:<24} {metrics['invocations']:>6} {metrics['p50_ms']:>9} {metrics['p99_ms']:>9} {metrics['max_ms']:>9} "
+            f"{metrics.get('dynamodb_calls', '-'):>10} {metrics.get('capacity_units', '-'):>10}"
+        )
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as baseline_file:
+            baselines = json.load(baseline_file)
+    size_key = str(args.variants)
+
+    if args.save_baseline:
+        baselines[size_key] = results
+        with open(BASELINE_FILE, 'w') as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved for {size_key} variants.")
+        return
+
+    regressions = compare(results, baselines.get(size_key, {}), args.tolerance)
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+    if size_key in baselines:
+        print("\nNo regressions against the stored baseline.")
+    else:
+        print(f"\nNo baseline stored for {size_key} variants; record one with --variants {size_key} --save-baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Concurrency stress test for proposal status transitions against DynamoDB Local.
+
+Seeds Pending proposals, then races three kinds of writers over the same rows:
+
+* reviewers approving and rejecting random rows (like clicks in the review UI, which carry no version);
+* a regenerator rewriting random rows as new Pending proposals with a bumped Version (like
+  generate_price_sheet);
+* an apply loop that reads Approved rows from the status index, records a "push" of
+  (row, Version) and then marks the row Completed at the version it read (like
+  apply_approved_changes).
+
+At the end it checks the invariants status_transitions is meant to guarantee:
+
+* no (row, Version) is pushed twice;
+* at most one review succeeds per (row, Version);
+* every Completed row was pushed at its final Version.
+
+Passing --unconditional swaps in plain update_item calls, as the handlers used to make, to
+show the duplicate pushes the state machine prevents.
+
+Start DynamoDB Local first, then:
+    python benchmarks/stress_status_transitions.py --rows 500 --reviewers 16 --seconds 30
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.synthetic_catalog import PROPOSALS_TABLE, STATUS_INDEX_NAME, create_tables
+from lambda_functions.dynamodb_utils import status_timestamp
+from lambda_functions.status_transitions import TransitionConflict, transition
+from lambda_functions.stores import DEFAULT_STORE_ID, proposal_key, store_status
+
+
+def pending_row(key, version):
+    return dict(
+        key, StoreID=DEFAULT_STORE_ID, ProductID=key['StoreProductID'].split('#', 1)[1], ApprovalStatus='Pending',
+        StoreStatus=store_status(DEFAULT_STORE_ID, 'Pending'), StatusUpdatedAt=status_timestamp(), Version=version
+    )
+
+
+def seed_rows(table, rows):
+    keys = [proposal_key(DEFAULT_STORE_ID, f"P{number:06d}", 'V0') for number in range(rows)]
+    with table.batch_writer() as batch:
+        for key in keys:
+            batch.put_item(Item=pending_row(key, 1))
+    return keys
+
+
+def unconditional_update(table, key, new_status, reviewer=None):
+    """The pre-state-machine behaviour: a blind write of the new status."""
+    update_expression = "SET ApprovalStatus = :status"
+    values = {':status': new_status}
+    if reviewer:
+        update_expression += ", ReviewedBy = :reviewer"
+        values[':reviewer'] = reviewer
+    if new_status == 'Approved':
+        update_expression += ", StoreStatus = :store_status, StatusUpdatedAt = :updated_at"
+        values[':store_status'] = store_status(DEFAULT_STORE_ID, new_status)
+        values[':updated_at'] = status_timestamp()
+    else:
+        update_expression += " REMOVE StoreStatus, StatusUpdatedAt"
+    table.update_item(Key=key, UpdateExpression=update_expression, ExpressionAttributeValues=values)
+
+
+class Recorder:
+    """Thread-safe tallies of successful writes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pushes = Counter()
+        self.reviews = Counter()
+        self.conflicts = Counter()
+
+    def add(self, counter, key):
+        with self.lock:
+            counter[key] += 1
+
+
+def reviewer_loop(table, keys, recorder, stop, unconditional):
+    rng = random.Random()
+    while not stop.is_set():
+        key = rng.choice(keys)
+        new_status = rng.choice(('Approved', 'Approved', 'Rejected'))
+        try:
+            if unconditional:
+                unconditional_update(table, key, new_status, reviewer='stress')
+                version = table.get_item(Key=key, ConsistentRead=True)['Item'].get('Version')
+            else:
+                response = transition(table, key, new_status, set_attributes={'ReviewedBy': 'stress'}, return_values='ALL_NEW')
+                # Version is incremented by the transition; the review belongs to the version before it
+                version = response['Attributes']['Version'] - 1
+            recorder.add(recorder.reviews, (key['StoreProductID'], int(version)))
+        except TransitionConflict:
+            recorder.add(recorder.conflicts, 'review')
+
+
+def regenerator_loop(table, keys, recorder, stop, interval):
+    rng = random.Random()
+    while not stop.wait(interval):
+        key = rng.choice(keys)
+        current = table.get_item(Key=key, ConsistentRead=True)['Item']
+        table.put_item(Item=pending_row(key, int(current['Version']) + 1))
+
+
+def apply_loop(table, recorder, stop, unconditional):
+    # DynamoDB Local updates indexes synchronously; against a real table a stale index read
+    # could show a just-completed row once more, which this loop would count as a second push
+    while not stop.is_set():
+        response = table.query(
+            IndexName=STATUS_INDEX_NAME,
+            KeyConditionExpression=Key('StoreStatus').eq(store_status(DEFAULT_STORE_ID, 'Approved')),
+            Limit=100
+        )
+        for item in response.get('Items', []):
+            key = {'StoreProductID': item['StoreProductID'], 'VariantID': item['VariantID']}
+            recorder.add(recorder.pushes, (item['StoreProductID'], int(item['Version'])))
+            try:
+                if unconditional:
+                    unconditional_update(table, key, 'Completed')
+                else:
+                    transition(table, key, 'Completed', expected_version=item['Version'], return_values='NONE')
+            except TransitionConflict:
+                recorder.add(recorder.conflicts, 'complete')
+
+
+def check(table, keys, recorder, unconditional):
+    """Return a list of invariant violations."""
+    violations = [f"{row} v{version} pushed {count} times" for (row, version), count in recorder.pushes.items() if count > 1]
+    violations += [f"{row} v{version} reviewed {count} times" for (row, version), count in recorder.reviews.items() if count > 1]
+    if unconditional:
+        # Blind writes keep no version history to check Completed rows against
+        return violations
+    for key in keys:
+        item = table.get_item(Key=key, ConsistentRead=True)['Item']
+        if item['ApprovalStatus'] == 'Completed' and (item['StoreProductID'], int(item['Version']) - 1) not in recorder.pushes:
+            violations.append(f"{item['StoreProductID']} Completed at v{item['Version']} without a push of its approved version")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint-url', default='http://localhost:8000')
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--reviewers', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--regenerate-interval', type=float, default=0.05, help="Seconds between proposal rewrites")
+    parser.add_argument('--unconditional', action='store_true', help="Use blind writes, as before the state machine")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb', endpoint_url=args.endpoint_url, region_name='us-east-1')
+    create_tables(dynamodb, reset=True)
+    table = dynamodb.Table(PROPOSALS_TABLE)
+    keys = seed_rows(table, args.rows)
+
+    recorder = Recorder()
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.reviewers + 2) as executor:
+        futures = [executor.submit(reviewer_loop, table, keys, recorder, stop, args.unconditional) for _ in range(args.reviewers)]
+        if not args.unconditional:
+            futures.append(executor.submit(regenerator_loop, table, keys, recorder, stop, args.regenerate_interval))
+        futures.append(executor.submit(apply_loop, table, recorder, stop, args.unconditional))
+        time.sleep(args.seconds)
+        stop.set()
+        for future in futures:
+            future.result()
+
+    print(f"Reviews: {sum(recorder.reviews.values())}  Pushes: {sum(recorder.pushes.values())}  "
+          f"Conflicts: {dict(recorder.conflicts)}")
+    violations = check(table, keys, recorder, args.unconditional)
+    if violations:
+        print(f"{len(violations)} invariant violations, e.g.:\n  " + "\n  ".join(violations[:20]))
+        sys.exit(1)
+    print("All transition invariants held.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Local stub of the commerce platform price-update APIs for offline benchmarking.
+
+Accepts POST /<platform>/prices with a JSON body, sleeps for a configurable latency to
+simulate the network round trip, and answers 200. A fraction of requests can be answered
+with 429 + Retry-After to exercise backoff. Connections are kept alive (HTTP/1.1).
+
+Usage:
+    python benchmarks/stub_platform_server.py [--port 8081] [--latency-ms 80] [--throttle-rate 0.0]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubPlatformHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.08
+    throttle_rate = 0.0
+    requests_served = 0
+    counter_lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.latency)
+
+        with StubPlatformHandler.counter_lock:
+            StubPlatformHandler.requests_served += 1
+
+        if random.random() < self.throttle_rate:
+            self._respond(429, {"error": "Too many requests"}, {"Retry-After": "0.1"})
+            return
+
+        updated = payload.get('items') or [payload]
+        self._respond(200, {"updated": len(updated)})
+
+    def _respond(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, latency_ms=80, throttle_rate=0.0):
+    """Start the stub server on a background thread and return it; port 0 picks a free port."""
+    StubPlatformHandler.latency = latency_ms / 1000
+    StubPlatformHandler.throttle_rate = throttle_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubPlatformHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency_ms, args.throttle_rate)
+    print(f"Stub platform server listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
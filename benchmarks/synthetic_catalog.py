@@ -0,0 +1,148 @@
+"""
+Synthetic catalogs for load testing against DynamoDB Local.
+
+Generates products with 1-8 variants each, realistic minimum prices (60-95% of the base
+price) and a competitor feed scattered around the current price, deterministically from a
+seed. Tables are created with the same keys and indexes as serverless.yml.
+
+Usage:
+    python benchmarks/synthetic_catalog.py --variants 100000 --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import os
+import random
+import sys
+from decimal import Decimal
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lambda_functions.stores import DEFAULT_STORE_ID
+
+PROPOSALS_TABLE = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
+MIN_PRICE_TABLE = os.getenv('MIN_PRICE_TABLE', 'MinimumPrices')
+APPLY_RUN_TABLE = os.getenv('APPLY_RUN_TABLE', 'ApplyRunState')
+STATUS_INDEX_NAME = os.getenv('STATUS_INDEX_NAME', 'StoreStatusIndex')
+PLATFORMS = ('shopify', 'netsuite', 'zoey')
+
+TABLE_DEFINITIONS = {
+    PROPOSALS_TABLE: {
+        'AttributeDefinitions': [
+            {'AttributeName': 'StoreProductID', 'AttributeType': 'S'},
+            {'AttributeName': 'VariantID', 'AttributeType': 'S'},
+            {'AttributeName': 'StoreStatus', 'AttributeType': 'S'},
+            {'AttributeName': 'StatusUpdatedAt', 'AttributeType': 'S'},
+        ],
+        'KeySchema': [
+            {'AttributeName': 'StoreProductID', 'KeyType': 'HASH'},
+            {'AttributeName': 'VariantID', 'KeyType': 'RANGE'},
+        ],
+        'GlobalSecondaryIndexes': [{
+            'IndexName': STATUS_INDEX_NAME,
+            'KeySchema': [
+                {'AttributeName': 'StoreStatus', 'KeyType': 'HASH'},
+                {'AttributeName': 'StatusUpdatedAt', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+        }],
+    },
+    MIN_PRICE_TABLE: {
+        'AttributeDefinitions': [
+            {'AttributeName': 'StoreID', 'AttributeType': 'S'},
+            {'AttributeName': 'ProductID', 'AttributeType': 'S'},
+        ],
+        'KeySchema': [
+            {'AttributeName': 'StoreID', 'KeyType': 'HASH'},
+            {'AttributeName': 'ProductID', 'KeyType': 'RANGE'},
+        ],
+    },
+    APPLY_RUN_TABLE: {
+        'AttributeDefinitions': [{'AttributeName': 'RunID', 'AttributeType': 'S'}],
+        'KeySchema': [{'AttributeName': 'RunID', 'KeyType': 'HASH'}],
+    },
+}
+
+
+def create_tables(dynamodb, reset=False):
+    """Create the benchmark tables, optionally dropping existing ones first."""
+    existing = set(dynamodb.meta.client.list_tables()['TableNames'])
+    for name, definition in TABLE_DEFINITIONS.items():
+        if name in existing:
+            if not reset:
+                continue
+            dynamodb.Table(name).delete()
+            dynamodb.Table(name).wait_until_not_exists()
+        dynamodb.create_table(TableName=name, BillingMode='PAY_PER_REQUEST', **definition).wait_until_exists()
+
+
+def generate_catalog(variants, seed=42):
+    """
+    Yield (product_id, minimum_price, [variant dicts]) for about `variants` variants.
+    Each variant dict carries variant_id, current_price, competitor_price, competitor_url and platform.
+    """
+    rng = random.Random(seed)
+    produced = 0
+    product_number = 0
+    while produced < variants:
+        product_id = f"P{product_number:07d}"
+        base_price = round(rng.lognormvariate(3.5, 0.9), 2) + 1
+        minimum_price = round(base_price * rng.uniform(0.6, 0.95), 2)
+        variant_count = min(rng.randint(1, 8), variants - produced)
+
+        product_variants = []
+        for variant_number in range(variant_count):
+            current_price = round(base_price * rng.uniform(0.95, 1.1), 2)
+            product_variants.append({
+                'variant_id': f"{product_id}-V{variant_number}",
+                'current_price': current_price,
+                'competitor_price': round(current_price * rng.uniform(0.8, 1.15), 2),
+                'competitor_url': f"https://competitor.example.com/products/{product_id}/{variant_number}",
+                'platform': PLATFORMS[product_number % len(PLATFORMS)],
+            })
+
+        yield product_id, minimum_price, product_variants
+        produced += variant_count
+        product_number += 1
+
+
+def competitor_feed(variants, seed=42):
+    """Yield generate_price_sheet proposals for the synthetic catalog."""
+    for product_id, _, product_variants in generate_catalog(variants, seed):
+        for variant in product_variants:
+            yield {
+                'internal_product_id': product_id,
+                'competitor_product_id': variant['variant_id'],
+                'competitor_price': variant['competitor_price'],
+                'current_price': variant['current_price'],
+                'competitor_url': variant['competitor_url'],
+            }
+
+
+def load_minimum_prices(dynamodb, variants, seed=42, store_id=DEFAULT_STORE_ID):
+    """Write the catalog's minimum prices into a store. Returns the number of products."""
+    products = 0
+    with dynamodb.Table(MIN_PRICE_TABLE).batch_writer() as batch:
+        for product_id, minimum_price, _ in generate_catalog(variants, seed):
+            batch.put_item(Item={'StoreID': store_id, 'ProductID': product_id, 'MinimumPrice': Decimal(str(minimum_price))})
+            products += 1
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variants', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--endpoint-url', default='http://localhost:8000')
+    parser.add_argument('--reset', action='store_true', help="Drop and recreate the tables first")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb', endpoint_url=args.endpoint_url, region_name='us-east-1')
+    create_tables(dynamodb, reset=args.reset)
+    products = load_minimum_prices(dynamodb, args.variants, args.seed)
+    print(f"Loaded minimum prices for {products} products ({args.variants} variants).")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,22 @@
-import boto3
 import json
 import os
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.dynamodb_utils import price_drop_value, status_timestamp
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.stores import store_id_from, store_product_id, store_status
+
+# The DynamoDB table is created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
 
+@instrumented
 def lambda_handler(event, context):
     """
     Lambda function to add a product to the PricingProposals table.
     Expects the following JSON input in the request body:
     {
+      "store_id": "<StoreID>" (optional, defaults to DEFAULT_STORE_ID),
       "product_id": "<ProductID>",
       "variant_id": "<VariantID>",
       "competitor_url": "<CompetitorURL>",
@@ -38,16 +43,29 @@ def lambda_handler(event, context):
                 "body": json.dumps("Missing required fields.")
             }
 
+        try:
+            store_id = store_id_from(body)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(str(e))
+            }
+
         # Create the item to be added to the DynamoDB table
         item = {
-            'ProductID': product_id,
+            'StoreProductID': store_product_id(store_id, product_id),
             'VariantID': variant_id,
+            'StoreID': store_id,
+            'ProductID': product_id,
             'CompetitorURL': competitor_url,
             'CurrentPrice': float(current_price),
             'CompetitorPrice': float(competitor_price),
             'ProposedPrice': float(proposed_price),
+            'PriceDrop': price_drop_value(current_price, proposed_price),
             'ApprovalStatus': 'Pending',
-            'ReviewedBy': 'None'
+            'ReviewedBy': 'None',
+            'StoreStatus': store_status(store_id, 'Pending'),
+            'StatusUpdatedAt': status_timestamp()
         }
 
         # Write the item to DynamoDB
@@ -55,7 +73,7 @@ def lambda_handler(event, context):
 
         return {
             "statusCode": 200,
-            "body": json.dumps(f"Product {product_id} added successfully.")
+            "body": json.dumps(f"Product {product_id} added successfully to store {store_id}.")
         }
 
     except Exception as e:
@@ -1,67 +1,328 @@
 import json
-import boto3
 import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 
-# Import platform-specific update functions from the Pricing Integration Framework
-from pricing_integration.shopify_api import update_product_price as update_shopify_price
-from pricing_integration.netsuite_api import update_product_price as update_netsuite_price
-from pricing_integration.zoey_api import update_product_price as update_zoey_price
+from lambda_functions.aws_clients import deserialize_item, lazy_client, lazy_table, serialize_item
+from lambda_functions.dynamodb_utils import query_status_page, status_timestamp
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.platform_adapters import get_adapter
+from lambda_functions.platform_push import push_prices
+from lambda_functions.status_transitions import TransitionConflict, transition
+from lambda_functions.stores import DEFAULT_STORE_ID, STORE_IDS, proposal_key, store_id_from
 
-# Initialize the DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+# DynamoDB tables are created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
 
+# Run-state table holding the checkpoint of each apply run
+run_table_name = os.getenv('APPLY_RUN_TABLE', 'ApplyRunState')
+run_table = lazy_table(run_table_name)
+
+lambda_client = lazy_client('lambda')
+
+# Number of approved items per work chunk (one checkpoint per chunk)
+PUSH_CHUNK_SIZE = int(os.getenv('PUSH_CHUNK_SIZE', '500'))
+# Items pushed between two deadline checks within a chunk
+PUSH_BATCH_SIZE = int(os.getenv('PUSH_BATCH_SIZE', '100'))
+# Hand chunks to parallel worker invocations instead of pushing them inline
+APPLY_FAN_OUT = os.getenv('APPLY_FAN_OUT', 'false').lower() == 'true'
+# Re-invoke to continue once less than this much time is left in the invocation. Must cover
+# one push batch, including its retries and backoff
+TIME_MARGIN_MS = int(os.getenv('APPLY_TIME_MARGIN_MS', '120000'))
+# Items that failed this many pushes are left Approved for manual follow-up
+MAX_APPLY_ATTEMPTS = int(os.getenv('MAX_APPLY_ATTEMPTS', '5'))
+RETRY_BASE_MINUTES = 5
+RUN_STATE_TTL_DAYS = 14
+
+def mark_completed(item):
+    """
+    Mark a DynamoDB entry as "Completed" and drop it from the status index.
+    Only succeeds if the row is still Approved at the Version that was read, so a proposal
+    regenerated or re-reviewed during the push is not closed with the old price.
+    """
+    transition(
+        table,
+        proposal_key(item['StoreID'], item['ProductID'], item['VariantID']),
+        'Completed',
+        expected_version=item.get('Version', 0),
+        remove_attributes=('ApplyAttempts', 'NextAttemptAt'),
+        return_values='NONE'
+    )
+
+def record_failure(item, error):
+    """
+    Count a failed push and schedule the next attempt with exponential backoff.
+    Like mark_completed, only updates the row at the Version that was read: a proposal deleted,
+    regenerated or re-reviewed during the push is left alone (and not recreated as a stub).
+    Returns False when the row changed meanwhile.
+    """
+    attempts = int(item.get('ApplyAttempts', 0)) + 1
+    next_attempt = datetime.now(timezone.utc) + timedelta(minutes=RETRY_BASE_MINUTES * (2 ** (attempts - 1)))
+    values = {
+        ":attempts": attempts,
+        ":next_attempt": next_attempt.isoformat(timespec='milliseconds'),
+        ":error": str(error)[:500]
+    }
+    version = int(item.get('Version', 0))
+    if version:
+        values[":version"] = version
+    try:
+        table.update_item(
+            Key=proposal_key(item['StoreID'], item['ProductID'], item['VariantID']),
+            UpdateExpression="SET ApplyAttempts = :attempts, NextAttemptAt = :next_attempt, LastApplyError = :error",
+            ConditionExpression="attribute_exists(StoreProductID) AND " + ("#version = :version" if version else "attribute_not_exists(#version)"),
+            ExpressionAttributeNames={"#version": "Version"},
+            ExpressionAttributeValues=values
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+def out_of_time(context):
+    """Whether the invocation is too close to its timeout to push another batch."""
+    return context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS
+
+def process_chunk(run_id, items, context=None):
+    """
+    Push one chunk of approved items in batches of PUSH_BATCH_SIZE and record each outcome.
+    The invocation deadline is checked before every batch; items not pushed before it are
+    returned so the caller can continue them in a new invocation.
+    Returns (applied, failed, conflicts, remaining_items).
+    """
+    applied = failed = conflicts = 0
+    start = 0
+    while start < len(items) and not out_of_time(context):
+        for item, platform, success, error in push_prices(items[start:start + PUSH_BATCH_SIZE], get_adapter):
+            product_id = item['ProductID']
+            try:
+                if success:
+                    # If the price update was successful, mark the DynamoDB entry as "Completed"
+                    mark_completed(item)
+                    applied += 1
+                    print(f"Successfully updated price for Product {product_id} in {platform} and marked as Completed.")
+                elif record_failure(item, error):
+                    failed += 1
+                    print(f"Failed to update price for Product {product_id} in {platform}: {error}")
+                else:
+                    conflicts += 1
+                    print(f"Failed to update price for Product {product_id} in {platform}, but the proposal changed meanwhile: {error}")
+            except TransitionConflict as e:
+                conflicts += 1
+                print(f"Price for Product {product_id} was pushed but the proposal changed meanwhile: {e}")
+            except Exception as e:
+                failed += 1
+                print(f"Error applying price change for Product {product_id}: {e}")
+        start += PUSH_BATCH_SIZE
+
+    run_table.update_item(
+        Key={'RunID': run_id},
+        UpdateExpression="ADD Applied :applied, Failed :failed, Conflicts :conflicts SET UpdatedAt = :now",
+        ExpressionAttributeValues={":applied": applied, ":failed": failed, ":conflicts": conflicts, ":now": status_timestamp()}
+    )
+    return applied, failed, conflicts, items[start:]
+
+def load_run_state(run_id, store_id):
+    """Fetch the checkpoint of an existing run, or start a new run for a store."""
+    if run_id:
+        state = run_table.get_item(Key={'RunID': run_id}, ConsistentRead=True).get('Item')
+        if state:
+            return state
+
+    state = {
+        'RunID': run_id or f"{store_id}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+        'StoreID': store_id,
+        'RunStatus': 'Running',
+        'StartedAt': status_timestamp(),
+        'Cursor': None,
+        'Checkpoints': 0,
+        'Applied': 0,
+        'Failed': 0,
+        'Outstanding': 0,
+        'ExpiresAt': int(time.time()) + RUN_STATE_TTL_DAYS * 86400
+    }
+    run_table.put_item(Item=state)
+    return state
+
+def save_checkpoint(run_id, cursor, run_status='Running'):
+    """Persist the position of the run in the Approved index after a chunk has been handled."""
+    run_table.update_item(
+        Key={'RunID': run_id},
+        UpdateExpression="SET #cursor = :cursor, RunStatus = :run_status, UpdatedAt = :now ADD Checkpoints :one",
+        ExpressionAttributeNames={"#cursor": "Cursor"},
+        ExpressionAttributeValues={
+            ":cursor": json.dumps(cursor, default=str) if cursor else None,
+            ":run_status": run_status,
+            ":now": status_timestamp(),
+            ":one": 1
+        }
+    )
+
+def chunk_dispatched(run_id):
+    """Count a chunk handed to a worker invocation as outstanding."""
+    run_table.update_item(
+        Key={'RunID': run_id},
+        UpdateExpression="ADD Outstanding :one",
+        ExpressionAttributeValues={":one": 1}
+    )
+
+def finish_run(run_id):
+    """Mark a run Done, unless it already is."""
+    try:
+        run_table.update_item(
+            Key={'RunID': run_id},
+            UpdateExpression="SET RunStatus = :done, UpdatedAt = :now",
+            ConditionExpression="RunStatus <> :done",
+            ExpressionAttributeValues={":done": 'Done', ":now": status_timestamp()}
+        )
+        print(f"Apply run {run_id} finished.")
+    except run_table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+def scan_finished(run_id):
+    """
+    Record that the coordinator has read the whole Approved index. The run is Done right away
+    when no worker chunks are outstanding; otherwise the last worker to finish marks it Done.
+    """
+    state = run_table.update_item(
+        Key={'RunID': run_id},
+        UpdateExpression="SET #cursor = :cursor, RunStatus = :draining, ScanComplete = :true, UpdatedAt = :now",
+        ExpressionAttributeNames={"#cursor": "Cursor"},
+        ExpressionAttributeValues={":cursor": None, ":draining": 'Draining', ":true": True, ":now": status_timestamp()},
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+    if state.get('Outstanding', 0) <= 0:
+        finish_run(run_id)
+
+def chunk_finished(run_id):
+    """Count a worker chunk as done, and finish the run when it was the last one after the scan ended."""
+    state = run_table.update_item(
+        Key={'RunID': run_id},
+        UpdateExpression="ADD Outstanding :minus_one",
+        ExpressionAttributeValues={":minus_one": -1},
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+    if state.get('ScanComplete') and state.get('Outstanding', 0) <= 0:
+        finish_run(run_id)
+
+def dispatch_chunk(context, run_id, items):
+    """
+    Hand a chunk of items to a worker invocation. Items travel as DynamoDB attribute values, so
+    the worker gets ProposedPrice back as a Decimal, exactly as an inline run does.
+    """
+    chunk = [
+        serialize_item({key: item[key] for key in ('StoreID', 'ProductID', 'VariantID', 'ProposedPrice', 'Platform', 'ApplyAttempts', 'Version') if key in item})
+        for item in items
+    ]
+    invoke_async(context, {"run_id": run_id, "chunk": chunk})
+
+def invoke_async(context, payload):
+    """Invoke this function again asynchronously."""
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload, default=str).encode('utf-8')
+    )
+
+@instrumented
 def lambda_handler(event, context):
     """
     Lambda function to apply price changes for products marked as 'Approved' in DynamoDB.
-    Uses the Pricing Integration Framework to update prices in Shopify, NetSuite, and Zoey.
+    Uses the Pricing Integration Framework adapters to update prices in Shopify, NetSuite, and Zoey,
+    sending bulk requests to each platform concurrently within its own concurrency and rate limits.
+
+    Each run applies one store ({"store_id": ...}) and reads only that store's partition of the
+    status index. Invoked without a store or run (the schedule), it starts one run per store in
+    STORE_IDS, so stores are applied in parallel and a large store does not hold up the others.
+
+    Approved items are read from the status index in chunks. After each chunk the run's cursor
+    is checkpointed in the run-state table, and when the invocation nears its timeout the function
+    re-invokes itself with {"run_id": ...} to continue from the checkpoint. The deadline is also
+    checked between push batches within a chunk; a chunk cut short is checkpointed at its start
+    and re-read, which returns only its items that are still Approved and due.
+
+    With APPLY_FAN_OUT enabled, chunks are handed to parallel worker invocations
+    ({"run_id": ..., "chunk": [...]}) and counted as Outstanding on the run. A worker nearing
+    its own timeout re-invokes itself with the rest of its chunk. The run stays Draining until
+    the coordinator has read the whole index and every chunk has finished, then becomes Done.
+    Failed items are retried on later runs with exponential backoff, up to MAX_APPLY_ATTEMPTS.
     """
-    # Scan the DynamoDB table for items with ApprovalStatus = "Approved"
+    event = event or {}
+
+    # Worker invocation: push a chunk dispatched by the coordinator
+    if 'chunk' in event:
+        run_id = event['run_id']
+        items = [deserialize_item(item) for item in event['chunk']]
+        applied, failed, conflicts, remaining = process_chunk(run_id, items, context)
+        if remaining:
+            dispatch_chunk(context, run_id, remaining)
+            print(f"Chunk of apply run {run_id} continues with {len(remaining)} items in a new invocation.")
+        else:
+            chunk_finished(run_id)
+        return {"statusCode": 200, "body": json.dumps({"applied": applied, "failed": failed, "conflicts": conflicts, "remaining": len(remaining)})}
+
+    # Scheduled invocation: one independent run per store
+    if not event.get('run_id') and not event.get('store_id'):
+        for store_id in STORE_IDS:
+            invoke_async(context, {"store_id": store_id})
+        print(f"Apply runs started for stores {STORE_IDS}.")
+        return {"statusCode": 202, "body": json.dumps({"stores": STORE_IDS, "message": "Apply runs started."})}
+
     try:
-        response = table.scan(
-            FilterExpression="ApprovalStatus = :status",
-            ExpressionAttributeValues={":status": "Approved"}
-        )
+        state = load_run_state(event.get('run_id'), store_id_from(event))
+    except ValueError as e:
+        return {"statusCode": 400, "body": json.dumps(str(e))}
     except Exception as e:
-        print(f"Error scanning DynamoDB table: {e}")
-        return {"statusCode": 500, "body": json.dumps("Error scanning DynamoDB table.")}
+        print(f"Error loading apply run state: {e}")
+        return {"statusCode": 500, "body": json.dumps("Error loading apply run state.")}
 
-    # Process each approved item
-    approved_items = response.get('Items', [])
-    for item in approved_items:
-        try:
-            product_id = item['ProductID']
-            variant_id = item['VariantID']
-            proposed_price = item['ProposedPrice']
-            platform = item.get('Platform', 'shopify')  # Assuming a Platform field specifies where to update
-
-            # Call the appropriate function from the Integration Framework
-            if platform == "shopify":
-                success = update_shopify_price(product_id, variant_id, proposed_price)
-            elif platform == "netsuite":
-                success = update_netsuite_price(product_id, variant_id, proposed_price)
-            elif platform == "zoey":
-                success = update_zoey_price(product_id, variant_id, proposed_price)
-            else:
-                print(f"Unknown platform for Product {product_id}. Skipping update.")
-                continue
-
-            # If the price update was successful, mark the DynamoDB entry as "Completed"
-            if success:
-                table.update_item(
-                    Key={
-                        'ProductID': product_id,
-                        'VariantID': variant_id
-                    },
-                    UpdateExpression="SET ApprovalStatus = :status",
-                    ExpressionAttributeValues={":status": "Completed"}
-                )
-                print(f"Successfully updated price for Product {product_id} in {platform} and marked as Completed.")
-            else:
-                print(f"Failed to update price for Product {product_id} in {platform}. Retrying...")
-
-        except Exception as e:
-            print(f"Error applying price change for Product {product_id}: {e}")
-
-    return {"statusCode": 200, "body": json.dumps("Approved price changes applied successfully.")}
+    run_id = state['RunID']
+    # Runs checkpointed before stores existed belong to the default store
+    store_id = state.get('StoreID', DEFAULT_STORE_ID)
+    if state.get('RunStatus') in ('Done', 'Draining'):
+        return {"statusCode": 200, "body": json.dumps(f"Apply run {run_id} has already read all approved items.")}
+
+    cursor = json.loads(state['Cursor']) if state.get('Cursor') else None
+    # Skip items waiting out their retry backoff and items that exhausted their attempts
+    due_filter = {
+        "FilterExpression": "(attribute_not_exists(NextAttemptAt) OR NextAttemptAt <= :now) "
+                            "AND (attribute_not_exists(ApplyAttempts) OR ApplyAttempts < :max_attempts)",
+        "ExpressionAttributeValues": {":now": status_timestamp(), ":max_attempts": MAX_APPLY_ATTEMPTS}
+    }
+
+    try:
+        while True:
+            # Query the store's status index partition for the next chunk of items with ApprovalStatus = "Approved"
+            chunk_start = cursor
+            items, cursor = query_status_page(table, store_id, "Approved", PUSH_CHUNK_SIZE, exclusive_start_key=cursor, **due_filter)
+
+            remaining = []
+            if items:
+                if APPLY_FAN_OUT:
+                    # Counted before the invoke, so a fast worker cannot finish the run early
+                    chunk_dispatched(run_id)
+                    dispatch_chunk(context, run_id, items)
+                else:
+                    _, _, _, remaining = process_chunk(run_id, items, context)
+
+            if remaining:
+                # Out of time mid-chunk: completed and backed-off items drop out of the re-read
+                cursor = chunk_start
+            elif cursor is None:
+                scan_finished(run_id)
+                break
+
+            save_checkpoint(run_id, cursor)
+            if remaining or out_of_time(context):
+                invoke_async(context, {"run_id": run_id})
+                print(f"Apply run {run_id} of store {store_id} checkpointed; continuing in a new invocation.")
+                return {"statusCode": 202, "body": json.dumps({"run_id": run_id, "message": "Apply run continues."})}
+    except Exception as e:
+        print(f"Error applying approved changes for run {run_id} of store {store_id}: {e}")
+        return {"statusCode": 500, "body": json.dumps(f"Error applying approved changes for run {run_id}.")}
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"run_id": run_id, "store_id": store_id, "message": "Approved price changes applied successfully."})
+    }
@@ -1,22 +1,30 @@
 import json
-import boto3
 import os
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.status_transitions import TransitionConflict, transition
+from lambda_functions.stores import proposal_key, store_id_from
+
+# The DynamoDB table is created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
 
+@instrumented
 def lambda_handler(event, context):
     """
     Lambda function to handle approval or rejection of proposed price changes.
     Expects the following JSON input:
     {
       "action": "approve" or "reject",
+      "store_id": "<StoreID>" (optional, defaults to DEFAULT_STORE_ID),
       "product_id": "<ProductID>",
       "variant_id": "<VariantID>",
-      "reviewer": "<Reviewer Name>"
+      "reviewer": "<Reviewer Name>",
+      "version": <Version the reviewer saw> (optional)
     }
+    Only Pending proposals can be reviewed; a proposal that was already reviewed, applied or
+    regenerated since it was displayed returns 409.
     """
 
     # Parse the input from the HTTP request body
@@ -33,6 +41,14 @@ def lambda_handler(event, context):
             "body": json.dumps("Missing required fields: 'action', 'product_id', and 'variant_id'.")
         }
 
+    try:
+        store_id = store_id_from(body)
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps(str(e))
+        }
+
     # Determine the new approval status based on the action
     if action == "approve":
         new_status = "Approved"
@@ -44,19 +60,14 @@ def lambda_handler(event, context):
             "body": json.dumps(f"Invalid action: {action}. Allowed values are 'approve' or 'reject'.")
         }
 
-    # Update the DynamoDB table entry for the specified product and variant
+    # The transition only succeeds from Pending (and, if given, at the version the reviewer saw)
     try:
-        response = table.update_item(
-            Key={
-                'ProductID': product_id,
-                'VariantID': variant_id
-            },
-            UpdateExpression="SET ApprovalStatus = :status, ReviewedBy = :reviewer",
-            ExpressionAttributeValues={
-                ':status': new_status,
-                ':reviewer': reviewer
-            },
-            ReturnValues="UPDATED_NEW"
+        response = transition(
+            table,
+            proposal_key(store_id, product_id, variant_id),
+            new_status,
+            expected_version=body.get('version'),
+            set_attributes={'ReviewedBy': reviewer}
         )
 
         return {
@@ -64,7 +75,13 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "message": f"Price change for Product {product_id} (Variant {variant_id}) has been {new_status.lower()} by {reviewer}.",
                 "updatedAttributes": response['Attributes']
-            })
+            }, default=str)
+        }
+
+    except TransitionConflict as e:
+        return {
+            "statusCode": 409,
+            "body": json.dumps(str(e))
         }
 
     except Exception as e:
@@ -1,19 +1,25 @@
-import boto3
 import json
 import os
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.status_transitions import TransitionConflict, transition
+from lambda_functions.stores import proposal_key, store_id_from
+
+# The DynamoDB table is created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
 
+@instrumented
 def lambda_handler(event, context):
     """
     Lambda function to approve a price change for a product.
     Expects the following parameters in the event body:
+    - store_id: The store the product belongs to (optional, defaults to DEFAULT_STORE_ID)
     - product_id: The ID of the product
     - variant_id: The ID of the variant (optional)
     - reviewer: The name of the person approving the price
+    - version: The Version of the proposal the reviewer saw (optional; 409 if it changed)
     """
 
     try:
@@ -30,18 +36,21 @@ def lambda_handler(event, context):
                 "body": json.dumps("Missing required fields: 'product_id' and 'variant_id'.")
             }
 
-        # Update the DynamoDB table to mark the price as approved
-        response = table.update_item(
-            Key={
-                'ProductID': product_id,
-                'VariantID': variant_id
-            },
-            UpdateExpression="SET ApprovalStatus = :status, ReviewedBy = :reviewer",
-            ExpressionAttributeValues={
-                ':status': 'Approved',
-                ':reviewer': reviewer
-            },
-            ReturnValues="UPDATED_NEW"
+        try:
+            store_id = store_id_from(body)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(str(e))
+            }
+
+        # Mark the price as approved; only a Pending proposal can be approved
+        response = transition(
+            table,
+            proposal_key(store_id, product_id, variant_id),
+            'Approved',
+            expected_version=body.get('version'),
+            set_attributes={'ReviewedBy': reviewer}
         )
 
         return {
@@ -49,7 +58,13 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "message": f"Price change for Product {product_id} (Variant {variant_id}) has been approved.",
                 "updatedAttributes": response['Attributes']
-            })
+            }, default=str)
+        }
+
+    except TransitionConflict as e:
+        return {
+            "statusCode": 409,
+            "body": json.dumps(str(e))
         }
 
     except Exception as e:
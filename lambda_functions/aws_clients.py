@@ -0,0 +1,104 @@
+"""
+Shared, lazily initialized AWS clients for the Lambda handlers.
+
+Handlers used to build boto3 resources and tables at import time, so every cold start paid
+for importing boto3 and loading the DynamoDB resource model even on paths that never touch
+AWS (validation errors, empty stream batches). Here boto3 is imported and each client,
+resource and table is created on first use, then cached for the life of the container so
+warm invocations reuse them.
+
+Module-level names keep working through lazy proxies:
+
+    dynamodb = lazy_resource('dynamodb')
+    table = lazy_table(os.getenv('DYNAMODB_TABLE', 'PricingProposals'))
+    ses = lazy_client('ses', region_name='us-east-1')
+
+Every client is registered with the instrumentation hooks, so calls made through it are timed
+and DynamoDB capacity is reported per invocation.
+
+Loading the DynamoDB resource model costs noticeably more at cold start than a low-level
+client. The short, latency-bound handlers (stream consumers, single-item API reads) therefore
+use `lazy_client('dynamodb')` with serialize_item/deserialize_item and never build a resource.
+Table resources are kept for the long batch jobs and the conditional-update helpers, where
+the load is paid once per run and the resource's type conversion keeps the code simple.
+"""
+
+import threading
+
+from lambda_functions.instrumentation import instrument_client
+
+_cache = {}
+# Re-entrant: a table's factory creates (and caches) the DynamoDB resource under the same lock
+_cache_lock = threading.RLock()
+
+def _cached(key, factory):
+    """Create a value once per container; creation is serialized because boto3 sessions are not thread-safe."""
+    value = _cache.get(key)
+    if value is None:
+        with _cache_lock:
+            value = _cache.get(key)
+            if value is None:
+                value = factory()
+                _cache[key] = value
+    return value
+
+def get_client(service_name, region_name=None):
+    """Cached low-level boto3 client."""
+    def factory():
+        import boto3
+        return instrument_client(boto3.client(service_name, region_name=region_name))
+    return _cached(('client', service_name, region_name), factory)
+
+def get_resource(service_name, region_name=None):
+    """Cached boto3 service resource."""
+    def factory():
+        import boto3
+        resource = boto3.resource(service_name, region_name=region_name)
+        instrument_client(resource.meta.client)
+        return resource
+    return _cached(('resource', service_name, region_name), factory)
+
+def get_table(table_name):
+    """Cached DynamoDB Table resource."""
+    return _cached(('table', table_name), lambda: get_resource('dynamodb').Table(table_name))
+
+def _type_serializer():
+    from boto3.dynamodb.types import TypeSerializer
+    return _cached(('serializer',), TypeSerializer)
+
+def _type_deserializer():
+    from boto3.dynamodb.types import TypeDeserializer
+    return _cached(('deserializer',), TypeDeserializer)
+
+def serialize_item(item):
+    """Plain item (str, Decimal, int, ...) -> attribute-value map for low-level DynamoDB client calls."""
+    serializer = _type_serializer()
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+def deserialize_item(image):
+    """Attribute-value map returned by a low-level DynamoDB client -> plain item, as a resource returns it."""
+    deserializer = _type_deserializer()
+    return {name: deserializer.deserialize(value) for name, value in image.items()}
+
+
+class LazyProxy:
+    """Stand-in that builds its target on first attribute access and forwards to it afterwards."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+
+    def __getattr__(self, name):
+        if self._target is None:
+            self._target = self._factory()
+        return getattr(self._target, name)
+
+
+def lazy_client(service_name, region_name=None):
+    return LazyProxy(lambda: get_client(service_name, region_name))
+
+def lazy_resource(service_name, region_name=None):
+    return LazyProxy(lambda: get_resource(service_name, region_name))
+
+def lazy_table(table_name):
+    return LazyProxy(lambda: get_table(table_name))
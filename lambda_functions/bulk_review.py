@@ -0,0 +1,183 @@
+import json
+import os
+import time
+
+from lambda_functions.aws_clients import lazy_resource, lazy_table
+from lambda_functions.dynamodb_utils import query_items
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.status_transitions import transition_update
+from lambda_functions.stores import proposal_key, store_id_from, store_product_id
+
+# DynamoDB resource and tables are created on first use
+dynamodb = lazy_resource('dynamodb')
+table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
+table = lazy_table(table_name)
+
+# TransactWriteItems accepts at most 100 actions per request
+TRANSACTION_SIZE = 100
+MAX_BULK_ITEMS = int(os.getenv('MAX_BULK_REVIEW_ITEMS', '5000'))
+MAX_TRANSACTION_ATTEMPTS = 4
+
+def pending_variants(store_id, product_id):
+    """Keys and versions of every Pending variant of a product in a store, read with a single-partition query."""
+    return [
+        {'ProductID': item['ProductID'], 'VariantID': item['VariantID'], 'Version': item.get('Version', 0)}
+        for item in query_items(
+            table,
+            KeyConditionExpression="StoreProductID = :store_product_id",
+            FilterExpression="ApprovalStatus = :pending",
+            ProjectionExpression="ProductID, VariantID, Version",
+            ExpressionAttributeValues={':store_product_id': store_product_id(store_id, product_id), ':pending': 'Pending'}
+        )
+    ]
+
+def review_update(store_id, key, new_status, reviewer):
+    """
+    TransactWriteItems update that reviews one Pending row and leaves reviewed rows untouched.
+    A Version on the key must still match, so a proposal regenerated since it was read is skipped.
+    """
+    update = transition_update(
+        proposal_key(store_id, key['ProductID'], key['VariantID']),
+        new_status,
+        expected_version=key.get('Version'),
+        set_attributes={'ReviewedBy': reviewer}
+    )
+    update['TableName'] = table_name
+    return {'Update': update}
+
+def apply_reviews(store_id, keys, new_status, reviewer):
+    """
+    Review the given keys of one store in transactions of up to 100 rows.
+    A cancelled transaction is retried without the rows whose condition failed, so one
+    already-reviewed row does not block the rest of its chunk.
+    Returns a dict of (ProductID, VariantID) -> (outcome, reason).
+    """
+    client = dynamodb.meta.client
+    outcomes = {}
+
+    for start in range(0, len(keys), TRANSACTION_SIZE):
+        chunk = keys[start:start + TRANSACTION_SIZE]
+
+        for attempt in range(MAX_TRANSACTION_ATTEMPTS):
+            if not chunk:
+                break
+            try:
+                client.transact_write_items(
+                    TransactItems=[review_update(store_id, key, new_status, reviewer) for key in chunk]
+                )
+                for key in chunk:
+                    outcomes[(key['ProductID'], key['VariantID'])] = (new_status.lower(), None)
+                chunk = []
+            except client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get('CancellationReasons') or [{'Code': 'Unknown'}] * len(chunk)
+                retry = []
+                for key, reason in zip(chunk, reasons):
+                    code = reason.get('Code')
+                    if code == 'ConditionalCheckFailed':
+                        outcomes[(key['ProductID'], key['VariantID'])] = ('skipped', "Not pending (already reviewed, changed or missing).")
+                    else:
+                        # 'None' rows were fine; conflicts and throttles are worth another try
+                        retry.append(key)
+                chunk = retry
+                if any(reason.get('Code') not in ('None', 'ConditionalCheckFailed') for reason in reasons):
+                    time.sleep(0.05 * (2 ** attempt))
+
+        for key in chunk:
+            outcomes[(key['ProductID'], key['VariantID'])] = ('failed', "Transaction could not be completed.")
+
+    return outcomes
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Lambda function to approve or reject many proposed price changes in one request.
+    Expects the following JSON input:
+    {
+      "action": "approve" or "reject",
+      "reviewer": "<Reviewer Name>",
+      "store_id": "<StoreID>" (optional, defaults to DEFAULT_STORE_ID),
+      "items": [{"product_id": "<ProductID>", "variant_id": "<VariantID>", "version": <Version, optional>}, ...]
+    }
+    or, to review every pending variant of a product:
+    {
+      "action": "approve" or "reject",
+      "reviewer": "<Reviewer Name>",
+      "store_id": "<StoreID>" (optional),
+      "product_id": "<ProductID>"
+    }
+    All rows of a request belong to one store. Only rows that are still Pending are changed; the response lists the outcome of each row.
+    """
+
+    try:
+        # Parse the input from the HTTP request body
+        body = json.loads(event.get("body") or "{}")
+        action = body.get('action')
+        reviewer = body.get('reviewer', 'Unknown')
+
+        try:
+            store_id = store_id_from(body)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(str(e))
+            }
+
+        # Determine the new approval status based on the action
+        if action == "approve":
+            new_status = "Approved"
+        elif action == "reject":
+            new_status = "Rejected"
+        else:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(f"Invalid action: {action}. Allowed values are 'approve' or 'reject'.")
+            }
+
+        if body.get('items'):
+            keys = []
+            for entry in body['items']:
+                if not entry.get('product_id') or not entry.get('variant_id'):
+                    return {
+                        "statusCode": 400,
+                        "body": json.dumps("Every item needs 'product_id' and 'variant_id'.")
+                    }
+                key = {'ProductID': str(entry['product_id']), 'VariantID': str(entry['variant_id'])}
+                if entry.get('version') is not None:
+                    key['Version'] = entry['version']
+                keys.append(key)
+        elif body.get('product_id'):
+            keys = pending_variants(store_id, str(body['product_id']))
+        else:
+            return {
+                "statusCode": 400,
+                "body": json.dumps("Missing required fields: 'items' or 'product_id'.")
+            }
+
+        # A transaction may not touch the same row twice
+        keys = list({(key['ProductID'], key['VariantID']): key for key in keys}.values())
+        if len(keys) > MAX_BULK_ITEMS:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(f"Too many items: {len(keys)}. At most {MAX_BULK_ITEMS} rows can be reviewed per request.")
+            }
+
+        outcomes = apply_reviews(store_id, keys, new_status, reviewer)
+        results = [
+            {"product_id": product_id, "variant_id": variant_id, "outcome": outcome, "reason": reason}
+            for (product_id, variant_id), (outcome, reason) in outcomes.items()
+        ]
+        reviewed = sum(1 for result in results if result['outcome'] == new_status.lower())
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "message": f"{reviewed} of {len(keys)} price changes in store {store_id} have been {new_status.lower()} by {reviewer}.",
+                "results": results
+            })
+        }
+
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps(f"Error reviewing items: {str(e)}")
+        }
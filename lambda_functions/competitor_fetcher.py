@@ -0,0 +1,363 @@
+"""
+Competitor price fetcher.
+
+Fetches the pages behind stored CompetitorURLs concurrently and extracts their prices, so
+proposals can be generated without a pre-priced feed:
+
+* requests are scheduled with asyncio. Each runs on a dedicated thread pool (urllib is
+  blocking and the standard library has no async HTTP client), with a global concurrency
+  bound plus a per-domain concurrency bound and request-rate limit. 429/503 responses pause
+  the domain for their Retry-After;
+* every page is fetched conditionally (If-None-Match / If-Modified-Since) with the
+  validators from its last fetch, and a 304 reuses the price parsed then;
+* parse results are cached by content hash, so a page whose body did not change is not
+  parsed again even when the site ignores conditional requests;
+* CompetitorURLs come from API requests, so every connection (including redirects) is only
+  made to public addresses: a host resolving to a loopback, private, link-local (e.g. the
+  169.254.169.254 metadata service) or otherwise reserved address is refused. With
+  COMPETITOR_ALLOWED_DOMAINS set, only those domains and their subdomains are fetched.
+
+Validators, content hashes and prices are kept per URL in memory for warm containers and,
+when COMPETITOR_PAGE_TABLE is set, in a DynamoDB table shared by all invocations.
+
+    results, stats = fetch_competitor_prices(urls)
+    results[url] -> {"price": 19.99 or None, "status": "fetched" | "not_modified" | "parse_cached" | "error", "error": ...}
+"""
+
+import asyncio
+import hashlib
+import http.client
+import ipaddress
+import os
+import re
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from html import unescape
+from urllib.parse import urlsplit
+
+from lambda_functions.aws_clients import get_resource, get_table
+from lambda_functions.dynamodb_utils import batch_get_items, status_timestamp
+from lambda_functions.instrumentation import record_span
+
+page_table_name = os.getenv('COMPETITOR_PAGE_TABLE')
+
+# Sustained requests per second and in-flight requests allowed per competitor domain
+DOMAIN_RATE_LIMIT = float(os.getenv('COMPETITOR_DOMAIN_RATE_LIMIT', '2'))
+DOMAIN_CONCURRENCY = int(os.getenv('COMPETITOR_DOMAIN_CONCURRENCY', '2'))
+# In-flight requests across all domains
+MAX_CONCURRENCY = int(os.getenv('COMPETITOR_MAX_CONCURRENCY', '32'))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('COMPETITOR_REQUEST_TIMEOUT_SECONDS', '10'))
+USER_AGENT = os.getenv('COMPETITOR_USER_AGENT', 'PricingApprovalBot/1.0')
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_FETCH_ATTEMPTS = 3
+MAX_RETRY_AFTER_SECONDS = 30
+# Comma-separated domains competitor pages may be fetched from; empty allows any public host
+ALLOWED_DOMAINS = tuple(domain.strip().lower() for domain in os.getenv('COMPETITOR_ALLOWED_DOMAINS', '').split(',') if domain.strip())
+# Only for local fixture servers: lets the fetcher connect to loopback and private addresses
+ALLOW_PRIVATE_ADDRESSES = os.getenv('COMPETITOR_ALLOW_PRIVATE_ADDRESSES', 'false').lower() == 'true'
+
+# Where product pages usually publish their price, most reliable first
+PRICE_PATTERNS = [
+    # schema.org Offer in JSON-LD
+    re.compile(r'"price"\s*:\s*"?\s*([\d.,]+)', re.I),
+    # Open Graph / microdata meta tags, with the attributes in either order
+    re.compile(r'<meta[^>]+(?:property|itemprop|name)=["\'](?:product:price:amount|og:price:amount|price)["\'][^>]*content=["\']([\d.,]+)', re.I),
+    re.compile(r'<meta[^>]+content=["\']([\d.,]+)["\'][^>]*(?:property|itemprop|name)=["\'](?:product:price:amount|og:price:amount|price)["\']', re.I),
+    # Visible microdata price
+    re.compile(r'itemprop=["\']price["\'][^>]*>\s*[^\d<]{0,5}([\d.,]+)', re.I),
+]
+
+
+class RetryLater(Exception):
+    """The site asked us to slow down (429/503)."""
+
+    def __init__(self, status, retry_after):
+        super().__init__(f"HTTP {status}")
+        self.retry_after = retry_after
+
+
+class BlockedAddress(OSError):
+    """The URL's host is not allowed or resolves to a non-public address."""
+
+
+def is_public_address(address):
+    """Whether an IP address is globally routable (IPv4-mapped IPv6 addresses are checked as IPv4)."""
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def is_allowed_domain(host):
+    """Whether a host is covered by ALLOWED_DOMAINS (always true when no allowlist is set)."""
+    host = (host or '').lower().rstrip('.')
+    return not ALLOWED_DOMAINS or any(host == domain or host.endswith(f".{domain}") for domain in ALLOWED_DOMAINS)
+
+def _guarded_create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, **kwargs):
+    """
+    socket.create_connection that only connects to addresses allowed for competitor pages.
+    The check happens on the address actually connected to, so DNS rebinding cannot slip a
+    private address in between the check and the connection.
+    """
+    host, port = address
+    if not is_allowed_domain(host):
+        raise BlockedAddress(f"{host} is not in COMPETITOR_ALLOWED_DOMAINS")
+    error = None
+    for family, type, proto, _, sockaddr in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        if not ALLOW_PRIVATE_ADDRESSES and not is_public_address(sockaddr[0]):
+            error = BlockedAddress(f"{host} resolves to the non-public address {sockaddr[0]}")
+            continue
+        sock = socket.socket(family, type, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or BlockedAddress(f"{host} did not resolve")
+
+
+class _GuardedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _guarded_create_connection
+
+
+class _GuardedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _guarded_create_connection
+
+
+class _GuardedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_GuardedHTTPConnection, req)
+
+
+class _GuardedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_GuardedHTTPSConnection, req, context=self._context)
+
+
+# Redirects are followed through the same opener, so their targets are checked as well.
+# Proxies are not used: they would connect on our behalf, past the address check.
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}), _GuardedHTTPHandler, _GuardedHTTPSHandler)
+
+
+def parse_number(text):
+    """Parse "1,299.00", "1.299,00" or "19,99" into a float; None if it is not a price."""
+    text = text.strip().rstrip('.,')
+    if ',' in text and '.' in text:
+        # Whichever separator comes last is the decimal point
+        text = text.replace(',', '') if text.rfind('.') > text.rfind(',') else text.replace('.', '').replace(',', '.')
+    elif ',' in text:
+        whole, _, fraction = text.rpartition(',')
+        text = f"{whole.replace(',', '')}.{fraction}" if len(fraction) == 2 else text.replace(',', '')
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+def extract_price(body):
+    """Extract the product price from a page body, or None when no known pattern matches."""
+    text = unescape(body.decode('utf-8', errors='replace'))
+    for pattern in PRICE_PATTERNS:
+        for match in pattern.finditer(text):
+            price = parse_number(match.group(1))
+            if price is not None:
+                return price
+    return None
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (HTTP dates fall back to one second), capped."""
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return 1.0
+
+def fetch_page(url, cached):
+    """
+    Fetch one page (blocking), conditionally when validators are cached.
+    Returns (status, headers, body); a 304 has an empty body.
+    """
+    headers = {'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml,application/json'}
+    if cached.get('ETag'):
+        headers['If-None-Match'] = cached['ETag']
+    if cached.get('LastModified'):
+        headers['If-Modified-Since'] = cached['LastModified']
+
+    try:
+        with _opener.open(urllib.request.Request(url, headers=headers), timeout=REQUEST_TIMEOUT_SECONDS) as response:
+            return response.status, response.headers, response.read(MAX_PAGE_BYTES)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, e.headers, b''
+        if e.code in (429, 503):
+            raise RetryLater(e.code, retry_after_seconds(e.headers.get('Retry-After')))
+        raise
+
+
+class PageCache:
+    """URL -> validators, content hash and parsed price, in memory with an optional DynamoDB table behind it."""
+
+    def __init__(self, table_name=None, max_entries=200000):
+        self.table_name = table_name
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def load(self, urls):
+        """Return the cached entries for the given URLs."""
+        with self.lock:
+            found = {url: self.entries[url] for url in urls if url in self.entries}
+        unknown = [url for url in urls if url not in found]
+        if unknown and self.table_name:
+            for item in batch_get_items(get_resource('dynamodb'), self.table_name, [{'URL': url} for url in unknown]):
+                entry = {key: value for key, value in item.items() if key != 'URL'}
+                if 'Price' in entry:
+                    entry['Price'] = float(entry['Price'])
+                found[item['URL']] = entry
+            with self.lock:
+                for url in unknown:
+                    if url in found:
+                        self.entries[url] = found[url]
+        return found
+
+    def save(self, entries):
+        """Store updated entries (URL -> entry)."""
+        with self.lock:
+            self.entries.update(entries)
+            while len(self.entries) > self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+        if entries and self.table_name:
+            with get_table(self.table_name).batch_writer(overwrite_by_pkeys=['URL']) as batch:
+                for url, entry in entries.items():
+                    item = {key: value for key, value in entry.items() if value is not None}
+                    if 'Price' in item:
+                        item['Price'] = Decimal(str(item['Price']))
+                    batch.put_item(Item=dict(item, URL=url))
+
+
+page_cache = PageCache(page_table_name)
+
+
+class DomainLimiter:
+    """Per-domain request spacing and concurrency bound for the asyncio fetch loop."""
+
+    def __init__(self, rate, concurrency):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+
+    async def wait_for_slot(self):
+        async with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot)
+            self.next_slot = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def pause(self, seconds):
+        self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+async def _fetch_page(url, cached, limiter, global_limit, executor):
+    """
+    Fetch one page, retrying while the site asks us to slow down. The domain's semaphore and
+    rate-limit slot are taken before a global slot, and the global slot is held only for the
+    request itself, so fetches waiting on a slow or rate-limited domain never keep other
+    domains from using the pool. Returns ((status, headers, body), None) or (None, error).
+    """
+    loop = asyncio.get_running_loop()
+    error = None
+    async with limiter.semaphore:
+        for _ in range(MAX_FETCH_ATTEMPTS):
+            await limiter.wait_for_slot()
+            async with global_limit:
+                start = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(executor, fetch_page, url, cached), None
+                except RetryLater as e:
+                    limiter.pause(e.retry_after)
+                    error = str(e)
+                except Exception as e:
+                    return None, str(e)
+                finally:
+                    record_span('competitor.fetch', (time.perf_counter() - start) * 1000)
+    return None, error
+
+async def _fetch_one(url, cached, limiter, global_limit, executor):
+    """Fetch and price one URL. Returns (result, updated cache entry or None)."""
+    response, error = await _fetch_page(url, cached, limiter, global_limit, executor)
+    if response is not None and response[0] == 304:
+        if cached.get('Price') is not None:
+            return {"price": cached['Price'], "status": "not_modified"}, dict(cached, FetchedAt=status_timestamp())
+        # Validators without a parsed price to reuse: fetch the page again unconditionally
+        cached = {}
+        response, error = await _fetch_page(url, cached, limiter, global_limit, executor)
+    if response is None:
+        return {"price": None, "status": "error", "error": error}, None
+    status, headers, body = response
+
+    content_hash = hashlib.sha256(body).hexdigest()[:32]
+    entry = {
+        'ETag': headers.get('ETag'),
+        'LastModified': headers.get('Last-Modified'),
+        'ContentHash': content_hash,
+        'FetchedAt': status_timestamp(),
+    }
+    if content_hash == cached.get('ContentHash') and cached.get('Price') is not None:
+        entry['Price'] = cached['Price']
+        return {"price": cached['Price'], "status": "parse_cached"}, entry
+
+    price = extract_price(body)
+    entry['Price'] = price
+    if price is None:
+        return {"price": None, "status": "error", "error": "No price found on the page"}, entry
+    return {"price": price, "status": "fetched"}, entry
+
+async def _fetch_all(urls, cached_entries):
+    limiters = {}
+    global_limit = asyncio.Semaphore(MAX_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix='competitor-fetch') as executor:
+        tasks = []
+        for url in urls:
+            domain = urlsplit(url).hostname or ''
+            if domain not in limiters:
+                limiters[domain] = DomainLimiter(DOMAIN_RATE_LIMIT, DOMAIN_CONCURRENCY)
+            tasks.append(_fetch_one(url, cached_entries.get(url, {}), limiters[domain], global_limit, executor))
+        return await asyncio.gather(*tasks)
+
+def fetch_competitor_prices(urls):
+    """
+    Fetch the current price behind each URL.
+    Returns (results, stats): results maps every URL to {"price", "status"[, "error"]} and stats
+    counts the statuses.
+    """
+    urls = [url for url in dict.fromkeys(urls) if url and urlsplit(url).scheme in ('http', 'https')]
+    if not urls:
+        return {}, {}
+
+    cached_entries = page_cache.load(urls)
+    outcomes = asyncio.run(_fetch_all(urls, cached_entries))
+
+    results = {}
+    updated = {}
+    for url, (result, entry) in zip(urls, outcomes):
+        results[url] = result
+        if entry is not None:
+            updated[url] = entry
+    page_cache.save(updated)
+
+    return results, dict(Counter(result['status'] for result in results.values()))
@@ -0,0 +1,435 @@
+"""
+Pre-aggregated dashboard summary of the PricingProposals table.
+
+The DashboardSummary table holds, for every store, one small item per product
+("product#<StoreID>#<ProductID>") and one "overview#<StoreID>" item, so a store's dashboard
+header and overview load with a single get_item:
+
+* <Status>Count: number of rows per ApprovalStatus;
+* PendingImpact: sum of (ProposedPrice - CurrentPrice) over Pending rows, i.e. the per-unit
+  price movement the review queue would apply;
+* largest drops: per product, one "Drop:<VariantID>" attribute per Pending variant whose
+  proposal lowers the price. The overview keeps a TopDrops list of the store's largest drops.
+
+update_summary keeps the items current from the PricingProposals stream, splitting each batch
+by store so stores never contend for the same overview item. Counts and impact
+are applied with ADD. TopDrops is merged with a read-modify-write guarded by the overview's
+Version. TopDrops keeps spare entries so removals do not empty it.
+
+Retried batches are not counted twice: each product item stores the LastSequence of the
+stream records folded into it and is only updated by later records (a product's rows share a
+partition key, so its records arrive in order on one shard), and a store's records are added
+to an IdempotencyStore as soon as its overview is updated, so a retry skips stores that were
+already done. A store whose update fails has its records reported in batchItemFailures.
+rebuild_summary recomputes everything from a parallel scan. It runs on a schedule, which
+repairs any drift, and is also available as scripts/rebuild_dashboard_summary.py.
+"""
+
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.dynamodb_utils import scan_items, status_timestamp
+from lambda_functions.idempotency import IdempotencyStore
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.stores import split_store_product_id, store_id_from, store_product_id
+
+# The DynamoDB tables are created on first use
+summary_table_name = os.getenv('DASHBOARD_SUMMARY_TABLE', 'DashboardSummary')
+summary_table = lazy_table(summary_table_name)
+proposals_table = lazy_table(os.getenv('DYNAMODB_TABLE', 'PricingProposals'))
+
+OVERVIEW_PREFIX = 'overview#'
+PRODUCT_PREFIX = 'product#'
+DROP_PREFIX = 'Drop:'
+STATUSES = ('Pending', 'Approved', 'Rejected', 'Completed')
+
+TOP_DROPS_SHOWN = 20
+# Spare entries beyond those shown, so rows leaving Pending do not empty the list before a rebuild
+TOP_DROPS_KEPT = 100
+PRODUCT_UPDATE_WORKERS = 8
+MAX_OVERVIEW_ATTEMPTS = 5
+REBUILD_SEGMENTS = int(os.getenv('DASHBOARD_REBUILD_SEGMENTS', '8'))
+
+# Stream records already folded into the summary
+applied_records = IdempotencyStore(os.getenv('SUMMARY_DEDUPE_TABLE'), ttl_seconds=86400)
+
+def overview_id(store_id):
+    return f"{OVERVIEW_PREFIX}{store_id}"
+
+def product_summary_id(store_id, product_id):
+    return f"{PRODUCT_PREFIX}{store_product_id(store_id, product_id)}"
+
+def record_store(record):
+    """StoreID of a stream record, from its key."""
+    return split_store_product_id(record['dynamodb']['Keys']['StoreProductID']['S'])[0]
+
+def sortable_sequence(sequence_number):
+    """
+    Stream sequence number as a zero-padded string. They can have up to 40 digits, more than
+    a DynamoDB number holds, so LastSequence is stored and compared as a string.
+    """
+    return sequence_number.zfill(40)
+
+def contribution(image):
+    """(product_id, variant_id, status, impact) of a stream image or item, or None for an empty image."""
+    if not image:
+        return None
+
+    def value(attribute):
+        raw = image.get(attribute)
+        return raw.get('N', raw.get('S')) if isinstance(raw, dict) else raw
+
+    status = value('ApprovalStatus') or 'Unknown'
+    current_price = value('CurrentPrice')
+    proposed_price = value('ProposedPrice')
+    impact = Decimal(0)
+    if status == 'Pending' and current_price is not None and proposed_price is not None:
+        impact = Decimal(str(proposed_price)) - Decimal(str(current_price))
+    return str(value('ProductID')), str(value('VariantID')), status, impact
+
+
+class SummaryDelta:
+    """Changes to the overview and product items accumulated over a batch of rows."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.impact = Decimal(0)
+        self.products = {}
+        # (ProductID, VariantID) -> drop, or None when the row no longer has a pending drop
+        self.drops = {}
+        # ProductID -> highest stream sequence number folded in, see sortable_sequence
+        self.sequences = {}
+
+    def _product(self, product_id):
+        return self.products.setdefault(product_id, {'counts': Counter(), 'impact': Decimal(0)})
+
+    def add(self, row, sign=1):
+        if row is None:
+            return
+        product_id, variant_id, status, impact = row
+        product = self._product(product_id)
+        self.counts[status] += sign
+        product['counts'][status] += sign
+        self.impact += sign * impact
+        product['impact'] += sign * impact
+        if sign > 0:
+            self.drops[(product_id, variant_id)] = -impact if impact < 0 else None
+        else:
+            self.drops.setdefault((product_id, variant_id), None)
+
+    def add_record(self, record):
+        """Fold one stream record in: the old image is taken out and the new image added."""
+        product_id = split_store_product_id(record['dynamodb']['Keys']['StoreProductID']['S'])[1]
+        sequence = sortable_sequence(record['dynamodb']['SequenceNumber'])
+        self.sequences[product_id] = max(sequence, self.sequences.get(product_id, ''))
+        self.add(contribution(record['dynamodb'].get('OldImage')), sign=-1)
+        new_row = contribution(record['dynamodb'].get('NewImage'))
+        if new_row is None:
+            # REMOVE: the row and any drop it had are gone
+            old_row = contribution(record['dynamodb'].get('OldImage'))
+            if old_row:
+                self.drops[(old_row[0], old_row[1])] = None
+        self.add(new_row)
+
+
+def product_drops(delta, pending_only=False):
+    """ProductID -> {VariantID: drop} of a delta; pending_only leaves out removed drops."""
+    drops_by_product = {}
+    for (product_id, variant_id), drop in delta.drops.items():
+        if drop is not None or not pending_only:
+            drops_by_product.setdefault(product_id, {})[variant_id] = drop
+    return drops_by_product
+
+def product_update(store_id, product_id, product, drops, now, sequence=None):
+    """
+    update_item arguments applying one product's part of a store's delta. With a stream
+    sequence number the update only applies if the item has not seen it yet.
+    """
+    names = {}
+    values = {':now': now}
+    additions = []
+    for index, (status, count) in enumerate(product['counts'].items()):
+        if count:
+            names[f'#count{index}'] = f"{status}Count"
+            values[f':count{index}'] = count
+            additions.append(f"#count{index} :count{index}")
+    if product['impact']:
+        values[':impact'] = product['impact']
+        additions.append("PendingImpact :impact")
+
+    assignments = ["UpdatedAt = :now"]
+    if sequence is not None:
+        values[':sequence'] = sequence
+        assignments.append("LastSequence = :sequence")
+    removals = []
+    for index, (variant_id, drop) in enumerate(drops.items()):
+        names[f'#drop{index}'] = f"{DROP_PREFIX}{variant_id}"
+        if drop is None:
+            removals.append(f'#drop{index}')
+        else:
+            values[f':drop{index}'] = drop
+            assignments.append(f"#drop{index} = :drop{index}")
+
+    expression = f"SET {', '.join(assignments)}"
+    if removals:
+        expression += f" REMOVE {', '.join(removals)}"
+    if additions:
+        expression += f" ADD {', '.join(additions)}"
+
+    update = {
+        'TableName': summary_table_name,
+        'Key': {'SummaryID': product_summary_id(store_id, product_id)},
+        'UpdateExpression': expression,
+        'ExpressionAttributeValues': values,
+    }
+    if names:
+        update['ExpressionAttributeNames'] = names
+    if sequence is not None:
+        update['ConditionExpression'] = "attribute_not_exists(LastSequence) OR LastSequence < :sequence"
+    return update
+
+def apply_product_update(client, update):
+    """Run one product update; False when the item had already seen its records."""
+    try:
+        client.update_item(**update)
+        return True
+    except client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def merge_top_drops(top_drops, drops):
+    """Apply drop changes to a TopDrops list and keep the TOP_DROPS_KEPT largest, largest first."""
+    merged = {(entry['ProductID'], entry['VariantID']): entry['Drop'] for entry in top_drops}
+    for key, drop in drops.items():
+        if drop is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = drop
+    largest = sorted(merged.items(), key=lambda entry: entry[1], reverse=True)[:TOP_DROPS_KEPT]
+    return [{'ProductID': product_id, 'VariantID': variant_id, 'Drop': drop} for (product_id, variant_id), drop in largest]
+
+def update_overview(store_id, delta, now):
+    """Apply a delta to a store's overview item, retrying when another writer changed it first."""
+    client = summary_table.meta.client
+    key = {'SummaryID': overview_id(store_id)}
+    for _ in range(MAX_OVERVIEW_ATTEMPTS):
+        current = summary_table.get_item(Key=key, ConsistentRead=True).get('Item', {})
+
+        names = {'#version': 'Version'}
+        values = {
+            ':now': now,
+            ':one': 1,
+            ':top_drops': merge_top_drops(current.get('TopDrops', []), delta.drops),
+        }
+        additions = ["#version :one"]
+        for index, (status, count) in enumerate(delta.counts.items()):
+            if count:
+                names[f'#count{index}'] = f"{status}Count"
+                values[f':count{index}'] = count
+                additions.append(f"#count{index} :count{index}")
+        if delta.impact:
+            values[':impact'] = delta.impact
+            additions.append("PendingImpact :impact")
+
+        if 'Version' in current:
+            condition = "#version = :version"
+            values[':version'] = current['Version']
+        else:
+            condition = "attribute_not_exists(#version)"
+
+        try:
+            summary_table.update_item(
+                Key=key,
+                UpdateExpression=f"SET TopDrops = :top_drops, UpdatedAt = :now ADD {', '.join(additions)}",
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return
+        except client.exceptions.ConditionalCheckFailedException:
+            continue
+    raise RuntimeError(f"Dashboard overview of store {store_id} kept changing; giving up for this batch.")
+
+def apply_store_delta(store_id, delta, now):
+    """Apply one store's delta: its product items (skipping those already updated), then its overview."""
+    drops_by_product = product_drops(delta)
+    updates = [
+        product_update(store_id, product_id, product, drops_by_product.get(product_id, {}), now, delta.sequences.get(product_id))
+        for product_id, product in delta.products.items()
+    ]
+
+    # The resource's client is thread-safe, unlike the Table resource
+    client = summary_table.meta.client
+    with ThreadPoolExecutor(max_workers=PRODUCT_UPDATE_WORKERS) as executor:
+        skipped = list(executor.map(lambda update: apply_product_update(client, update), updates)).count(False)
+    if skipped:
+        print(f"Skipped {skipped} product summaries of store {store_id} that already include their records.")
+    update_overview(store_id, delta, now)
+
+@instrumented
+def update_summary(event, context):
+    """
+    Lambda function that folds PricingProposals stream records into the dashboard summary.
+    Triggered by the PricingProposals DynamoDB stream; records already applied are skipped.
+    Records of stores whose summary could not be updated are returned in batchItemFailures.
+    """
+    records = event.get('Records', [])
+    record_keys = [f"summary#{record['dynamodb']['SequenceNumber']}" for record in records]
+    already = applied_records.seen(record_keys)
+
+    deltas = {}
+    store_records = {}
+    for record, key in zip(records, record_keys):
+        if key not in already:
+            store_id = record_store(record)
+            deltas.setdefault(store_id, SummaryDelta()).add_record(record)
+            store_records.setdefault(store_id, []).append((key, record['dynamodb']['SequenceNumber']))
+
+    now = status_timestamp()
+    applied = 0
+    failed_sequence_numbers = []
+    for store_id, delta in deltas.items():
+        try:
+            apply_store_delta(store_id, delta, now)
+        except Exception as e:
+            print(f"Error updating the dashboard summary of store {store_id}: {e}")
+            failed_sequence_numbers += [sequence_number for _, sequence_number in store_records[store_id]]
+            continue
+
+        applied += len(store_records[store_id])
+        try:
+            applied_records.record(key for key, _ in store_records[store_id])
+        except Exception as e:
+            # Product items are still protected by LastSequence; only the overview could be counted twice
+            print(f"Error recording applied stream records of store {store_id}: {e}")
+
+    print(f"Applied {applied} of {len(records)} stream records to the dashboard summary.")
+    return {"batchItemFailures": [{"itemIdentifier": number} for number in failed_sequence_numbers]}
+
+def rebuild_summary(total_segments=REBUILD_SEGMENTS):
+    """
+    Recompute every summary item from a parallel scan of PricingProposals and replace the
+    stored ones, deleting items of products and stores that no longer exist. Returns the
+    overview counts per store.
+    """
+    deltas = {}
+    for item in scan_items(
+        proposals_table,
+        total_segments=total_segments,
+        ProjectionExpression="StoreID, ProductID, VariantID, ApprovalStatus, CurrentPrice, ProposedPrice"
+    ):
+        deltas.setdefault(item['StoreID'], SummaryDelta()).add(contribution(item))
+
+    now = status_timestamp()
+    stale = {
+        item['SummaryID'] for item in scan_items(summary_table, total_segments=total_segments, ProjectionExpression="SummaryID")
+        if item['SummaryID'].startswith((PRODUCT_PREFIX, OVERVIEW_PREFIX))
+    }
+    with summary_table.batch_writer(overwrite_by_pkeys=['SummaryID']) as batch:
+        for store_id, delta in deltas.items():
+            drops_by_product = product_drops(delta, pending_only=True)
+            for product_id, product in delta.products.items():
+                item = {'SummaryID': product_summary_id(store_id, product_id), 'PendingImpact': product['impact'], 'UpdatedAt': now}
+                item.update({f"{status}Count": count for status, count in product['counts'].items() if count})
+                item.update({f"{DROP_PREFIX}{variant_id}": drop for variant_id, drop in drops_by_product.get(product_id, {}).items()})
+                batch.put_item(Item=item)
+                stale.discard(item['SummaryID'])
+            stale.discard(overview_id(store_id))
+        for summary_id in stale:
+            batch.delete_item(Key={'SummaryID': summary_id})
+
+    for store_id, delta in deltas.items():
+        # Bumping the Version makes stream updates that read the old overview retry against this one
+        current = summary_table.get_item(Key={'SummaryID': overview_id(store_id)}, ConsistentRead=True).get('Item', {})
+        overview = {
+            'SummaryID': overview_id(store_id),
+            'PendingImpact': delta.impact,
+            'TopDrops': merge_top_drops([], {key: drop for key, drop in delta.drops.items() if drop is not None}),
+            'UpdatedAt': now,
+            'RebuiltAt': now,
+            'Version': int(current.get('Version', 0)) + 1,
+        }
+        overview.update({f"{status}Count": count for status, count in delta.counts.items() if count})
+        summary_table.put_item(Item=overview)
+
+    return {
+        store_id: {status: delta.counts.get(status, 0) for status in STATUSES}
+        for store_id, delta in deltas.items()
+    }
+
+@instrumented
+def rebuild_handler(event, context):
+    """Lambda function that rebuilds the dashboard summary on a schedule."""
+    counts = rebuild_summary()
+    print(f"Rebuilt the dashboard summary: {counts}")
+    return {"statusCode": 200, "body": json.dumps(counts)}
+
+def number(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+def format_overview(item):
+    return {
+        "counts": {status: int(item.get(f"{status}Count", 0)) for status in STATUSES},
+        "pending_impact": number(item.get('PendingImpact', 0)),
+        "largest_drops": [
+            {"product_id": entry['ProductID'], "variant_id": entry['VariantID'], "drop": number(entry['Drop'])}
+            for entry in item.get('TopDrops', [])[:TOP_DROPS_SHOWN]
+        ],
+        "updated_at": item.get('UpdatedAt'),
+        "rebuilt_at": item.get('RebuiltAt'),
+    }
+
+def format_product(product_id, item):
+    drops = {key[len(DROP_PREFIX):]: number(value) for key, value in item.items() if key.startswith(DROP_PREFIX)}
+    return {
+        "product_id": product_id,
+        "counts": {status: int(item.get(f"{status}Count", 0)) for status in STATUSES},
+        "pending_impact": number(item.get('PendingImpact', 0)),
+        "largest_drop": max(drops.values(), default=None),
+        "drops": drops,
+        "updated_at": item.get('UpdatedAt'),
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Lambda function to get a store's dashboard summary with a single get_item.
+    Returns the store's overview (counts per status, pending impact, largest drops), or one
+    product's summary when a "product_id" query string parameter is given. The store is the
+    "store_id" query string parameter (default DEFAULT_STORE_ID).
+    """
+    try:
+        params = event.get('queryStringParameters') or {}
+        try:
+            store_id = store_id_from(params)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(str(e))
+            }
+
+        product_id = params.get('product_id')
+        summary_id = product_summary_id(store_id, product_id) if product_id else overview_id(store_id)
+        item = summary_table.get_item(Key={'SummaryID': summary_id}).get('Item')
+
+        if item is None and product_id:
+            return {
+                "statusCode": 404,
+                "body": json.dumps(f"No summary for Product {product_id} in store {store_id}.")
+            }
+
+        body = format_product(product_id, item) if product_id else format_overview(item or {})
+        body['store_id'] = store_id
+        return {
+            "statusCode": 200,
+            "body": json.dumps(body)
+        }
+
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps(f"Error reading dashboard summary: {str(e)}")
+        }
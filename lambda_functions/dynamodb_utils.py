@@ -0,0 +1,225 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from lambda_functions.stores import store_status
+
+# Sparse GSI keyed on StoreStatus ("<StoreID>#<ApprovalStatus>") + StatusUpdatedAt, so each
+# store's statuses are separate index partitions. Only rows that still need work (Pending,
+# Approved) carry StoreStatus and StatusUpdatedAt, so Completed and Rejected rows drop out of it.
+STATUS_INDEX_NAME = os.getenv('STATUS_INDEX_NAME', 'StoreStatusIndex')
+INDEXED_STATUSES = ('Pending', 'Approved')
+# Sparse GSI keyed on StoreStatus + PriceDrop, so a store's rows of one status can be read
+# largest price drop first. Rows without PriceDrop are missing from it until backfilled.
+DROP_INDEX_NAME = os.getenv('DROP_INDEX_NAME', 'StoreDropIndex')
+
+# BatchGetItem accepts at most 100 keys per request, BatchWriteItem 25 writes
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+MAX_UNPROCESSED_RETRIES = 5
+
+# Sentinel pushed by each segment worker once it has read its last page
+_SEGMENT_DONE = object()
+
+def _scan_segment(table, scan_kwargs, segment=None, total_segments=None):
+    """Yield the pages of one scan segment (or the whole table), following LastEvaluatedKey."""
+    # The resource's client is thread-safe (unlike the Table resource) and still converts types
+    client = table.meta.client
+    kwargs = dict(scan_kwargs, TableName=table.name)
+    if total_segments:
+        kwargs['Segment'] = segment
+        kwargs['TotalSegments'] = total_segments
+
+    while True:
+        response = client.scan(**kwargs)
+        yield response.get('Items', [])
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+def scan_items(table, total_segments=1, max_buffered_pages=None, **scan_kwargs):
+    """
+    Scan a DynamoDB table and yield its items one at a time, following pagination.
+    With total_segments > 1 the scan is split into parallel segments read by a thread
+    pool. Pages are handed over through a bounded queue, so at most a few pages are held
+    in memory regardless of table size.
+    Any extra keyword arguments (FilterExpression, ProjectionExpression, ...) are passed to scan.
+    """
+    if total_segments <= 1:
+        for page in _scan_segment(table, scan_kwargs):
+            yield from page
+        return
+
+    pages = queue.Queue(maxsize=max_buffered_pages or total_segments * 2)
+    stop = threading.Event()
+
+    def put(value):
+        # Give up once the consumer has gone away so workers never block forever
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(segment):
+        try:
+            for page in _scan_segment(table, scan_kwargs, segment, total_segments):
+                if not put(page):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        for segment in range(total_segments):
+            executor.submit(worker, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        # Unblock workers waiting on a full queue if the caller stops early or a segment failed
+        stop.set()
+        executor.shutdown(wait=False)
+
+def status_timestamp():
+    """Sortable UTC timestamp stored in StatusUpdatedAt, the status index sort key."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+def price_drop_value(current_price, proposed_price):
+    """PriceDrop stored on a proposal: how far the proposed price is below the current price, in cents."""
+    return (Decimal(str(current_price)) - Decimal(str(proposed_price))).quantize(Decimal('0.01'))
+
+def query_items(table, **query_kwargs):
+    """Query a table or index and yield its items one at a time, following LastEvaluatedKey."""
+    kwargs = dict(query_kwargs)
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get('Items', [])
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+def _status_key_condition(store_id, status, query_kwargs, index_name=None):
+    """Add the status index (or drop index) key condition for one store's status to a set of query arguments."""
+    if status not in INDEXED_STATUSES:
+        raise ValueError(f"Status {status} is not indexed. Indexed statuses are {INDEXED_STATUSES}.")
+
+    query_kwargs['ExpressionAttributeNames'] = dict(query_kwargs.get('ExpressionAttributeNames', {}), **{'#status_key': 'StoreStatus'})
+    query_kwargs['ExpressionAttributeValues'] = dict(query_kwargs.get('ExpressionAttributeValues', {}), **{':status_value': store_status(store_id, status)})
+    query_kwargs['IndexName'] = index_name or STATUS_INDEX_NAME
+    query_kwargs['KeyConditionExpression'] = "#status_key = :status_value"
+    return query_kwargs
+
+def query_by_status(table, store_id, status, **query_kwargs):
+    """
+    Yield a store's items with the given ApprovalStatus from the status index, oldest first.
+    Only statuses in INDEXED_STATUSES are present in the index.
+    Extra keyword arguments (FilterExpression, Limit, ...) are passed to query.
+    """
+    return query_items(table, **_status_key_condition(store_id, status, query_kwargs))
+
+def query_status_page(table, store_id, status, limit, exclusive_start_key=None, item_filter=None, largest_drop_first=False, **query_kwargs):
+    """
+    Read one page of up to `limit` of a store's items with the given status from the status index,
+    oldest first, or with largest_drop_first from the drop index in descending PriceDrop order.
+    item_filter is an optional predicate for conditions DynamoDB cannot express; the index
+    is read until the page is full or exhausted. Returns (items, last_key), where last_key
+    is the ExclusiveStartKey for the next page or None when there are no more items.
+    """
+    if largest_drop_first:
+        kwargs = _status_key_condition(store_id, status, query_kwargs, DROP_INDEX_NAME)
+        kwargs['ScanIndexForward'] = False
+        key_attributes = ('StoreProductID', 'VariantID', 'StoreStatus', 'PriceDrop')
+    else:
+        kwargs = _status_key_condition(store_id, status, query_kwargs)
+        key_attributes = ('StoreProductID', 'VariantID', 'StoreStatus', 'StatusUpdatedAt')
+    kwargs['Limit'] = limit
+
+    items = []
+    while True:
+        if exclusive_start_key:
+            kwargs['ExclusiveStartKey'] = exclusive_start_key
+        response = table.query(**kwargs)
+
+        for item in response.get('Items', []):
+            if item_filter and not item_filter(item):
+                continue
+            items.append(item)
+            if len(items) == limit:
+                # Resume right after the last item handed out, even if it was mid-page
+                return items, {attribute: item[attribute] for attribute in key_attributes}
+
+        exclusive_start_key = response.get('LastEvaluatedKey')
+        if not exclusive_start_key:
+            return items, None
+
+def batch_get_items(dynamodb, table_name, keys, **request_options):
+    """
+    Yield the items stored under the given keys, read with BatchGetItem in chunks of 100.
+    Unprocessed keys are retried with backoff; chunks that still fail are logged and skipped,
+    so callers must treat keys without an item as "unknown or missing".
+    Extra keyword arguments (ProjectionExpression, ...) are added to each table request.
+    dynamodb is a service resource (plain keys and items) or a low-level client
+    (attribute-value keys and items).
+    """
+    keys = list(keys)
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        chunk = keys[start:start + BATCH_GET_SIZE]
+        request_items = {table_name: dict(request_options, Keys=chunk)}
+
+        attempt = 0
+        while request_items:
+            try:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+            except Exception as e:
+                print(f"Error reading {len(chunk)} items from {table_name}: {e}")
+                break
+
+            yield from response.get('Responses', {}).get(table_name, [])
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                if attempt > MAX_UNPROCESSED_RETRIES:
+                    print(f"Giving up on unprocessed {table_name} keys after {MAX_UNPROCESSED_RETRIES} retries.")
+                    break
+                time.sleep(min(0.05 * (2 ** attempt), 2))
+
+def batch_write_items(client, table_name, items):
+    """
+    Put attribute-value items (see aws_clients.serialize_item) with a low-level client's
+    BatchWriteItem, in chunks of 25. Unprocessed items are retried with backoff; unlike
+    batch_get_items, items still unprocessed after MAX_UNPROCESSED_RETRIES raise, because a
+    lost write is not safe to ignore.
+    """
+    items = list(items)
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        request_items = {table_name: [{'PutRequest': {'Item': item}} for item in items[start:start + BATCH_WRITE_SIZE]]}
+
+        attempt = 0
+        while request_items:
+            request_items = client.batch_write_item(RequestItems=request_items).get('UnprocessedItems') or {}
+            if request_items:
+                attempt += 1
+                if attempt > MAX_UNPROCESSED_RETRIES:
+                    raise RuntimeError(f"Unprocessed {table_name} writes after {MAX_UNPROCESSED_RETRIES} retries.")
+                time.sleep(min(0.05 * (2 ** attempt), 2))
@@ -1,110 +1,291 @@
-import boto3
+import csv
+import hashlib
+import io
 import os
 import json
+from decimal import Decimal
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from html import escape
 
-# Initialize the SES client
-ses = boto3.client('ses', region_name='us-east-1')
+from lambda_functions.aws_clients import lazy_client
+from lambda_functions.idempotency import IdempotencyStore
+from lambda_functions.instrumentation import instrumented
+
+# The SES client is created on first use
+ses = lazy_client('ses', region_name='us-east-1')
 
 # Get environment variables
 SENDER_EMAIL = os.getenv('SES_SENDER_EMAIL', 'no-reply@yourdomain.com')
 APPROVAL_EMAIL_LIST = os.getenv('APPROVAL_EMAIL_LIST', 'manager@example.com,manager2@example.com')
 WEB_PAGE_URL = os.getenv('WEB_PAGE_URL', 'https://your-approval-page.com')
 
+# Digests with more rows than this list only the largest movements inline and attach the full sheet as CSV
+DIGEST_INLINE_ROWS = int(os.getenv('DIGEST_INLINE_ROWS', '200'))
+
+# Sequence numbers and notification contents already emailed; retried batches and repeated
+# notifications are dropped before SES. Without a table only warm-container memory is used.
+dedupe_store = IdempotencyStore(
+    os.getenv('NOTIFICATION_DEDUPE_TABLE'),
+    ttl_seconds=int(os.getenv('NOTIFICATION_DEDUPE_TTL_SECONDS', '86400'))
+)
+
+DIGEST_COLUMNS = ['Store', 'Product ID', 'Variant ID', 'Event', 'Current Price', 'Competitor Price', 'Proposed Price', 'Change', 'Reviewed By']
+
+@instrumented
 def lambda_handler(event, context):
     """
-    Lambda function to send email notifications when a new pricing proposal is added or updated.
-    Triggered by DynamoDB Streams.
+    Lambda function to send a digest email for a batch of pricing proposals added or updated.
+    Triggered by DynamoDB Streams with large batches and a batching window; every record in the
+    batch ends up in a single digest. Records already emailed (same stream sequence number, or
+    the same notification content within the dedupe TTL) are dropped before SES is called.
+    Records that cannot be parsed would fail the same way on every retry, so they are logged and
+    dropped. When the digest cannot be sent, its records are returned in batchItemFailures so
+    only they are retried.
     """
+    entries = []
+    failed_sequence_numbers = []
 
     # Parse through DynamoDB stream events
-    for record in event['Records']:
-        if record['eventName'] == 'INSERT':
-            # New item added to the PricingProposals table
-            new_image = record['dynamodb']['NewImage']
-            send_proposal_notification(new_image)
-        elif record['eventName'] == 'MODIFY':
-            # Item in the PricingProposals table modified (could be approval or rejection)
-            old_image = record['dynamodb']['OldImage']
-            new_image = record['dynamodb']['NewImage']
-            if old_image['ApprovalStatus']['S'] == "Pending" and new_image['ApprovalStatus']['S'] in ["Approved", "Rejected"]:
-                send_approval_status_notification(new_image)
-
-    return {"statusCode": 200, "body": json.dumps("Notifications processed successfully.")}
-
-def send_proposal_notification(new_image):
-    """
-    Send an email notification for a new pricing proposal.
-    """
-    product_id = new_image['ProductID']['S']
-    current_price = new_image['CurrentPrice']['N']
-    competitor_price = new_image['CompetitorPrice']['N']
-    proposed_price = new_image['ProposedPrice']['N']
-    approval_status = new_image['ApprovalStatus']['S']
-
-    # Create the email subject and body
-    subject = f"New Pricing Proposal for Product {product_id}"
-    body_text = (
-        f"A new pricing proposal has been created:\n"
-        f"Product ID: {product_id}\n"
-        f"Current Price: {current_price}\n"
-        f"Competitor Price: {competitor_price}\n"
-        f"Proposed Price: {proposed_price}\n"
-        f"Approval Status: {approval_status}\n"
-        f"Please review the proposal in the Pricing Approval Dashboard: {WEB_PAGE_URL}"
-    )
+    for record in event.get('Records', []):
+        sequence_number = record.get('dynamodb', {}).get('SequenceNumber')
+        try:
+            entry = parse_record(record)
+            if entry:
+                entry['sequence_number'] = sequence_number
+                entry['dedupe_keys'] = (f"seq#{sequence_number}", f"content#{content_hash(entry)}")
+                entries.append(entry)
+        except Exception as e:
+            print(f"Dropping unparseable stream record {sequence_number}: {e}")
+
+    entries = drop_duplicates(entries)
+
+    if entries:
+        try:
+            send_digest(entries)
+        except Exception as e:
+            print(f"Error sending digest email: {e}")
+            failed_sequence_numbers.extend(entry['sequence_number'] for entry in entries)
+        else:
+            try:
+                dedupe_store.record(key for entry in entries for key in entry['dedupe_keys'])
+            except Exception as e:
+                print(f"Error recording sent notifications: {e}")
+
+    return {"batchItemFailures": [{"itemIdentifier": number} for number in failed_sequence_numbers]}
 
-    # Send the email
-    send_email(subject, body_text)
+def content_hash(entry):
+    """Hash of the fields a reader sees for a notification."""
+    content = json.dumps(entry_row(entry))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
 
+def drop_duplicates(entries):
+    """Drop entries already emailed and repeats within the batch. On store errors every entry is kept."""
+    try:
+        seen = dedupe_store.seen(key for entry in entries for key in entry['dedupe_keys'])
+    except Exception as e:
+        print(f"Error reading the notification dedupe store: {e}")
+        seen = set()
+
+    unique = []
+    for entry in entries:
+        if seen.intersection(entry['dedupe_keys']):
+            continue
+        seen.add(entry['dedupe_keys'][1])
+        unique.append(entry)
 
-def send_approval_status_notification(new_image):
+    if len(unique) < len(entries):
+        print(f"Dropped {len(entries) - len(unique)} duplicate notifications.")
+    return unique
+
+def parse_record(record):
     """
-    Send an email notification for a change in approval status.
+    Turn a stream record into a digest entry, or None when it needs no notification.
+    New proposals (INSERT) and Pending -> Approved/Rejected changes (MODIFY) are reported.
     """
-    product_id = new_image['ProductID']['S']
-    variant_id = new_image['VariantID']['S']
-    proposed_price = new_image['ProposedPrice']['N']
-    approval_status = new_image['ApprovalStatus']['S']
-    reviewed_by = new_image.get('ReviewedBy', {}).get('S', 'Unknown')
-
-    # Create the email subject and body
-    subject = f"Pricing Proposal Update for Product {product_id}"
+    if record['eventName'] == 'INSERT':
+        # New item added to the PricingProposals table
+        return build_entry(record['dynamodb']['NewImage'], 'New proposal')
+
+    if record['eventName'] == 'MODIFY':
+        # Item in the PricingProposals table modified (could be approval or rejection)
+        old_image = record['dynamodb']['OldImage']
+        new_image = record['dynamodb']['NewImage']
+        if old_image['ApprovalStatus']['S'] == "Pending" and new_image['ApprovalStatus']['S'] in ["Approved", "Rejected"]:
+            return build_entry(new_image, new_image['ApprovalStatus']['S'])
+
+    return None
+
+def build_entry(image, event_label):
+    """Extract the digest fields from a stream image."""
+    def number(attribute):
+        value = image.get(attribute, {}).get('N')
+        return Decimal(value) if value is not None else None
+
+    current_price = number('CurrentPrice')
+    proposed_price = number('ProposedPrice')
+    return {
+        'store_id': image['StoreID']['S'],
+        'product_id': image['ProductID']['S'],
+        'variant_id': image['VariantID']['S'],
+        'event': event_label,
+        'current_price': current_price,
+        'competitor_price': number('CompetitorPrice'),
+        'proposed_price': proposed_price,
+        'change': proposed_price - current_price if current_price is not None and proposed_price is not None else None,
+        'reviewed_by': image.get('ReviewedBy', {}).get('S', ''),
+    }
+
+def entry_row(entry):
+    """Digest table row for an entry, in DIGEST_COLUMNS order."""
+    def price(value):
+        return '' if value is None else f"{value:.2f}"
+
+    change = '' if entry['change'] is None else f"{entry['change']:+.2f}"
+    return [
+        entry['store_id'], entry['product_id'], entry['variant_id'], entry['event'], price(entry['current_price']),
+        price(entry['competitor_price']), price(entry['proposed_price']), change, entry['reviewed_by']
+    ]
+
+def summarize(entries):
+    """Counts and total price movement of the proposals in a digest."""
+    proposals = [entry for entry in entries if entry['event'] == 'New proposal']
+    changes = [entry['change'] for entry in proposals if entry['change'] is not None]
+    return {
+        'new_proposals': len(proposals),
+        'approved': sum(1 for entry in entries if entry['event'] == 'Approved'),
+        'rejected': sum(1 for entry in entries if entry['event'] == 'Rejected'),
+        'products': len({(entry['store_id'], entry['product_id']) for entry in entries}),
+        'total_movement': sum(changes, Decimal(0)),
+        'decreases': sum(1 for change in changes if change < 0),
+        'increases': sum(1 for change in changes if change > 0),
+    }
+
+def build_digest(entries):
+    """Build the digest subject, text body, HTML body and, for large digests, a CSV attachment."""
+    summary = summarize(entries)
+
+    # Group rows by product; large digests only show the biggest movements inline
+    inline = entries
+    if len(entries) > DIGEST_INLINE_ROWS:
+        inline = sorted(entries, key=lambda entry: abs(entry['change'] or 0), reverse=True)[:DIGEST_INLINE_ROWS]
+    inline = sorted(inline, key=lambda entry: (entry['store_id'], entry['product_id'], entry['variant_id']))
+
+    subject = (
+        f"Pricing digest: {summary['new_proposals']} new proposals, "
+        f"{summary['approved']} approved, {summary['rejected']} rejected"
+    )
+    summary_lines = [
+        f"Products affected: {summary['products']}",
+        f"New proposals: {summary['new_proposals']} ({summary['decreases']} decreases, {summary['increases']} increases)",
+        f"Total proposed price movement: {summary['total_movement']:+.2f}",
+        f"Approved: {summary['approved']}, Rejected: {summary['rejected']}",
+    ]
+    if len(inline) < len(entries):
+        summary_lines.append(f"Showing the {len(inline)} largest movements of {len(entries)}; the full list is attached.")
+
+    rows = [entry_row(entry) for entry in inline]
+    widths = [max(len(str(cell)) for cell in column) for column in zip(DIGEST_COLUMNS, *rows)]
+    text_table = '\n'.join(
+        '  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in [DIGEST_COLUMNS] + rows
+    )
     body_text = (
-        f"The pricing proposal for Product {product_id}, Variant {variant_id} has been {approval_status}.\n"
-        f"Proposed Price: {proposed_price}\n"
-        f"Reviewed By: {reviewed_by}\n"
-        f"Approval Status: {approval_status}\n"
-        f"Please review the status in the Pricing Approval Dashboard: {WEB_PAGE_URL}"
+        '\n'.join(summary_lines) + '\n\n' + text_table + '\n\n'
+        f"Please review the proposals in the Pricing Approval Dashboard: {WEB_PAGE_URL}"
     )
 
-    # Send the email
-    send_email(subject, body_text)
+    html_rows = []
+    current_product = None
+    for row in rows:
+        if tuple(row[:2]) != current_product:
+            current_product = tuple(row[:2])
+            html_rows.append(f"<tr><th colspan=\"{len(DIGEST_COLUMNS)}\" align=\"left\">Product {escape(row[1])} ({escape(row[0])})</th></tr>")
+        html_rows.append('<tr>' + ''.join(f"<td>{escape(str(cell))}</td>" for cell in row) + '</tr>')
+    body_html = (
+        '<p>' + '<br>'.join(escape(line) for line in summary_lines) + '</p>'
+        '<table border="1" cellpadding="4" cellspacing="0">'
+        '<tr>' + ''.join(f"<th>{escape(column)}</th>" for column in DIGEST_COLUMNS) + '</tr>'
+        + ''.join(html_rows) + '</table>'
+        f'<p><a href="{escape(WEB_PAGE_URL)}">Open the Pricing Approval Dashboard</a></p>'
+    )
+
+    attachment = None
+    if len(inline) < len(entries):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(DIGEST_COLUMNS)
+        for entry in sorted(entries, key=lambda entry: (entry['store_id'], entry['product_id'], entry['variant_id'])):
+            writer.writerow(entry_row(entry))
+        attachment = buffer.getvalue()
+
+    return subject, body_text, body_html, attachment
 
+def send_digest(entries):
+    """
+    Send one digest email covering every entry in the batch.
+    Raises on failure so the caller can report the records for retry.
+    """
+    subject, body_text, body_html, attachment = build_digest(entries)
+    if attachment is None:
+        send_email(subject, body_text, body_html)
+    else:
+        send_email_with_attachment(subject, body_text, body_html, 'pricing-digest.csv', attachment)
 
-def send_email(subject, body_text):
+def send_email(subject, body_text, body_html=None):
     """
     Helper function to send an email using SES.
     """
-    try:
-        # Send email using SES
-        response = ses.send_email(
-            Source=SENDER_EMAIL,
-            Destination={
-                'ToAddresses': APPROVAL_EMAIL_LIST.split(',')
+    body = {
+        'Text': {
+            'Data': body_text,
+            'Charset': 'UTF-8'
+        }
+    }
+    if body_html:
+        body['Html'] = {
+            'Data': body_html,
+            'Charset': 'UTF-8'
+        }
+
+    # Send email using SES
+    response = ses.send_email(
+        Source=SENDER_EMAIL,
+        Destination={
+            'ToAddresses': APPROVAL_EMAIL_LIST.split(',')
+        },
+        Message={
+            'Subject': {
+                'Data': subject,
+                'Charset': 'UTF-8'
             },
-            Message={
-                'Subject': {
-                    'Data': subject,
-                    'Charset': 'UTF-8'
-                },
-                'Body': {
-                    'Text': {
-                        'Data': body_text,
-                        'Charset': 'UTF-8'
-                    }
-                }
-            }
-        )
-        print(f"Email sent successfully: {response['MessageId']}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
+            'Body': body
+        }
+    )
+    print(f"Email sent successfully: {response['MessageId']}")
+
+def send_email_with_attachment(subject, body_text, body_html, filename, attachment_text):
+    """
+    Helper function to send an email with a text attachment using SES raw email.
+    """
+    message = MIMEMultipart('mixed')
+    message['Subject'] = subject
+    message['From'] = SENDER_EMAIL
+    message['To'] = APPROVAL_EMAIL_LIST
+
+    alternative = MIMEMultipart('alternative')
+    alternative.attach(MIMEText(body_text, 'plain', 'utf-8'))
+    alternative.attach(MIMEText(body_html, 'html', 'utf-8'))
+    message.attach(alternative)
+
+    part = MIMEApplication(attachment_text.encode('utf-8'))
+    part.add_header('Content-Disposition', 'attachment', filename=filename)
+    message.attach(part)
+
+    response = ses.send_raw_email(
+        Source=SENDER_EMAIL,
+        Destinations=APPROVAL_EMAIL_LIST.split(','),
+        RawMessage={'Data': message.as_string()}
+    )
+    print(f"Email with attachment sent successfully: {response['MessageId']}")
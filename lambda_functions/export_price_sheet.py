@@ -0,0 +1,302 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from itertools import islice
+
+from lambda_functions.aws_clients import lazy_client, lazy_table
+from lambda_functions.dynamodb_utils import INDEXED_STATUSES, query_by_status
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.min_price_cache import SNAPSHOT_BUCKET, MinimumPriceCache, get_minimum_prices
+from lambda_functions.stores import store_id_from
+
+# The DynamoDB table is created on first use
+table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
+table = lazy_table(table_name)
+
+s3 = lazy_client('s3')
+lambda_client = lazy_client('lambda')
+
+EXPORT_BUCKET = os.getenv('PRICE_SHEET_BUCKET')
+EXPORT_PREFIX = 'exports/'
+# Progress of each export is written next to it as <key>.status.json
+STATUS_SUFFIX = '.status.json'
+# S3 parts must be at least 5 MB (except the last one)
+PART_SIZE = int(os.getenv('EXPORT_PART_SIZE', str(8 * 1024 * 1024)))
+# Rows read from DynamoDB and converted per batch
+EXPORT_BATCH_SIZE = 5000
+DOWNLOAD_URL_EXPIRY_SECONDS = 3600
+
+FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+COLUMNS = [
+    'StoreID', 'ProductID', 'VariantID', 'ApprovalStatus', 'CurrentPrice', 'CompetitorPrice', 'ProposedPrice',
+    'MinimumPrice', 'MarginOverMinimum', 'MarginOverMinimumPct', 'DeltaVsCompetitor', 'DeltaVsCompetitorPct',
+    'CompetitorURL', 'ReviewedBy', 'StatusUpdatedAt'
+]
+NUMERIC_COLUMNS = {
+    'CurrentPrice', 'CompetitorPrice', 'ProposedPrice', 'MinimumPrice', 'MarginOverMinimum',
+    'MarginOverMinimumPct', 'DeltaVsCompetitor', 'DeltaVsCompetitorPct'
+}
+
+min_price_cache = MinimumPriceCache(get_minimum_prices, snapshot_bucket=SNAPSHOT_BUCKET)
+
+
+class MultipartUploadWriter:
+    """
+    Binary file-like object that streams everything written to it into an S3 multipart upload,
+    holding at most one part in memory.
+    """
+
+    def __init__(self, bucket, key, content_type, part_size=PART_SIZE):
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+        self.parts = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.position += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def close(self):
+        """Upload the final part and complete the upload."""
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self._upload_part(bytes(self.buffer))
+            self.buffer = bytearray()
+        s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+        self.closed = True
+
+    def abort(self):
+        if not self.closed:
+            s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.closed = True
+
+    def _upload_part(self, data):
+        part_number = len(self.parts) + 1
+        response = s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=data)
+        self.parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+
+
+def sheet_rows(store_id, status):
+    """Yield batches of export rows (dicts keyed by COLUMNS) for every proposal of a store with the given status."""
+    items = query_by_status(table, store_id, status)
+    while True:
+        batch = list(islice(items, EXPORT_BATCH_SIZE))
+        if not batch:
+            return
+        min_prices = min_price_cache.get_many(item['StoreProductID'] for item in batch)
+        yield [sheet_row(item, min_prices.get(item['StoreProductID'])) for item in batch]
+
+def sheet_row(item, min_price):
+    """One export row with computed margin and competitor-delta columns."""
+    def number(value):
+        return float(value) if isinstance(value, (Decimal, int, float)) else None
+
+    proposed = number(item.get('ProposedPrice'))
+    competitor = number(item.get('CompetitorPrice'))
+    row = {column: item.get(column) for column in COLUMNS}
+    row.update({
+        'CurrentPrice': number(item.get('CurrentPrice')),
+        'CompetitorPrice': competitor,
+        'ProposedPrice': proposed,
+        'MinimumPrice': min_price,
+        'MarginOverMinimum': None,
+        'MarginOverMinimumPct': None,
+        'DeltaVsCompetitor': None,
+        'DeltaVsCompetitorPct': None,
+    })
+    if proposed is not None and min_price is not None:
+        row['MarginOverMinimum'] = round(proposed - min_price, 2)
+        row['MarginOverMinimumPct'] = round((proposed - min_price) / proposed * 100, 2) if proposed else None
+    if proposed is not None and competitor is not None:
+        row['DeltaVsCompetitor'] = round(proposed - competitor, 2)
+        row['DeltaVsCompetitorPct'] = round((proposed - competitor) / competitor * 100, 2) if competitor else None
+    return row
+
+def write_csv(batches, writer):
+    count = 0
+    buffer = io.StringIO()
+    csv_writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    csv_writer.writeheader()
+    for batch in batches:
+        csv_writer.writerows(batch)
+        count += len(batch)
+        writer.write(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+    writer.write(buffer.getvalue().encode('utf-8'))
+    return count
+
+def write_parquet(batches, writer):
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([
+        (column, pyarrow.float64() if column in NUMERIC_COLUMNS else pyarrow.string())
+        for column in COLUMNS
+    ])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(writer, schema, compression='snappy') as parquet_writer:
+        for batch in batches:
+            # Each batch becomes one row group
+            parquet_writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+def write_xlsx(batches, writer):
+    """XLSX is a zip container, so the workbook is built on local disk in constant-memory mode and then streamed up."""
+    import xlsxwriter
+
+    count = 0
+    with tempfile.NamedTemporaryFile(suffix='.xlsx') as workbook_file:
+        workbook = xlsxwriter.Workbook(workbook_file.name, {'constant_memory': True, 'tmpdir': tempfile.gettempdir()})
+        worksheet = workbook.add_worksheet('Price Sheet')
+        worksheet.write_row(0, 0, COLUMNS)
+        for batch in batches:
+            for row in batch:
+                count += 1
+                worksheet.write_row(count, 0, [row[column] for column in COLUMNS])
+        workbook.close()
+
+        with open(workbook_file.name, 'rb') as workbook_data:
+            for data in iter(lambda: workbook_data.read(PART_SIZE), b''):
+                writer.write(data)
+    return count
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'parquet': write_parquet}
+
+def format_available(export_format):
+    """Whether the libraries an export format needs are installed in this package."""
+    if export_format == 'parquet':
+        return importlib.util.find_spec('pyarrow') is not None
+    if export_format == 'xlsx':
+        return importlib.util.find_spec('xlsxwriter') is not None
+    return True
+
+def write_status(key, state, **details):
+    """Record the state of an export ("Queued", "Running", "Done" or "Failed") in its status object."""
+    status = dict(details, state=state, key=key, updated_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    s3.put_object(Bucket=EXPORT_BUCKET, Key=key + STATUS_SUFFIX, Body=json.dumps(status).encode('utf-8'), ContentType='application/json')
+
+def run_export(store_id, status, export_format, key):
+    """Stream every proposal of a store with the given status into an S3 object. Returns the number of rows."""
+    _, content_type = FORMATS[export_format]
+    writer = MultipartUploadWriter(EXPORT_BUCKET, key, content_type)
+    try:
+        count = WRITERS[export_format](sheet_rows(store_id, status), writer)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return count
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Lambda function to export a downloadable price sheet of one store's pending or approved proposals.
+    Expects the following query string parameters:
+    - store_id: Store to export (default DEFAULT_STORE_ID); only its status index partition is read
+    - status: "Pending" (default) or "Approved"
+    - format: "csv" (default), "xlsx" or "parquet"
+    The export runs in a separate asynchronous invocation so large sheets are not bound by the
+    API Gateway timeout; the response carries a presigned download URL that becomes valid once
+    the export has been written, and a presigned status URL of a small JSON document whose
+    "state" goes Queued -> Running -> Done (with "rows") or Failed (with "error").
+    """
+    # Asynchronous worker invocation
+    if 'export' in event:
+        export = event['export']
+        key = export['key']
+        details = {name: export[name] for name in ('store_id', 'status', 'format')}
+        try:
+            write_status(key, 'Running', **details)
+            count = run_export(export['store_id'], export['status'], export['format'], key)
+        except Exception as e:
+            # Recorded rather than raised: the client re-requests instead of the export being retried blindly
+            print(f"Error exporting {export['status']} proposals of store {export['store_id']} to s3://{EXPORT_BUCKET}/{key}: {e}")
+            write_status(key, 'Failed', error=str(e)[:500], **details)
+            return {"statusCode": 500, "body": json.dumps({"error": str(e), "key": key})}
+
+        write_status(key, 'Done', rows=count, **details)
+        print(f"Exported {count} {export['status']} proposals of store {export['store_id']} to s3://{EXPORT_BUCKET}/{key}.")
+        return {"statusCode": 200, "body": json.dumps({"rows": count, "key": key})}
+
+    params = event.get('queryStringParameters') or {}
+    status = params.get('status', 'Pending')
+    export_format = params.get('format', 'csv').lower()
+
+    try:
+        store_id = store_id_from(params)
+    except ValueError as e:
+        return {"statusCode": 400, "body": json.dumps(str(e))}
+
+    if status not in INDEXED_STATUSES:
+        return {"statusCode": 400, "body": json.dumps(f"Invalid status: {status}. Allowed values are {list(INDEXED_STATUSES)}.")}
+    if export_format not in FORMATS:
+        return {"statusCode": 400, "body": json.dumps(f"Invalid format: {export_format}. Allowed values are {sorted(FORMATS)}.")}
+    if not format_available(export_format):
+        return {"statusCode": 400, "body": json.dumps(f"{export_format} exports are not available in this deployment.")}
+    if not EXPORT_BUCKET:
+        return {"statusCode": 500, "body": json.dumps("PRICE_SHEET_BUCKET is not configured.")}
+
+    try:
+        extension, _ = FORMATS[export_format]
+        key = f"{EXPORT_PREFIX}{store_id}/price-sheet-{status.lower()}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.{extension}"
+
+        write_status(key, 'Queued', store_id=store_id, status=status, format=export_format)
+        lambda_client.invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps({"export": {"store_id": store_id, "status": status, "format": export_format, "key": key}}).encode('utf-8')
+        )
+        download_url, status_url = (
+            s3.generate_presigned_url('get_object', Params={'Bucket': EXPORT_BUCKET, 'Key': object_key}, ExpiresIn=DOWNLOAD_URL_EXPIRY_SECONDS)
+            for object_key in (key, key + STATUS_SUFFIX)
+        )
+
+        return {
+            "statusCode": 202,
+            "body": json.dumps({
+                "message": f"Export of {status.lower()} proposals of store {store_id} started.",
+                "key": key,
+                "download_url": download_url,
+                "status_url": status_url
+            })
+        }
+
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps(f"Error starting export: {str(e)}")
+        }
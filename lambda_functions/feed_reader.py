@@ -0,0 +1,188 @@
+"""
+Streaming readers for competitor price feeds stored in S3.
+
+Feeds are read in bounded-memory chunks of proposal dicts (the same fields generate_price_sheet
+accepts inline: internal_product_id, competitor_product_id, competitor_price, current_price,
+competitor_url). Supported formats, chosen by file extension:
+
+- CSV with a header row (.csv)
+- JSON lines (.jsonl, .ndjson)
+- Parquet (.parquet), read with pyarrow (listed in requirement.txt)
+
+CSV and JSON-lines feeds can be split into byte ranges and Parquet feeds into row groups, so
+large feeds can be read by several workers at once. A byte-range reader owns every line that
+starts inside its range: it skips the partial line at the start of the range and finishes
+the line that crosses its end. CSV fields may contain quoted newlines, so a CSV record can
+span lines; plan_csv_ranges moves each range boundary to the next record start outside
+quotes, so no record is split between two readers.
+"""
+
+import csv
+import json
+import os
+
+from lambda_functions.aws_clients import lazy_client
+
+s3 = lazy_client('s3')
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+# Bytes read per step while planning CSV ranges
+CSV_PLAN_CHUNK_BYTES = 1024 * 1024
+# Characters of an unparseable line kept in its failure report
+MAX_REPORTED_LINE_LENGTH = 200
+
+def feed_format(key):
+    """Feed format for an S3 key, based on its extension."""
+    extension = os.path.splitext(key.lower())[1]
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported feed format: {key}. Supported extensions are {sorted(FORMATS)}.")
+    return FORMATS[extension]
+
+def _lines(bucket, key, byte_range=None):
+    """
+    Yield decoded lines of an object, or of the lines starting inside byte_range=(start, end).
+    Lines keep their line endings, so the csv module can rebuild quoted newlines.
+    """
+    if byte_range is None:
+        body = s3.get_object(Bucket=bucket, Key=key)['Body']
+        for line in body.iter_lines(keepends=True):
+            yield line.decode('utf-8-sig')
+        return
+
+    start, end = byte_range
+    # Start one byte early: if that byte is a newline, the first line begins exactly at `start`
+    read_from = max(start - 1, 0)
+    body = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={read_from}-")['Body']
+    position = read_from
+    skip_partial = start > 0
+    try:
+        for line in body.iter_lines(keepends=True):
+            line_start = position
+            position += len(line)
+            if skip_partial:
+                skip_partial = False
+                continue
+            if line_start > end:
+                return
+            yield line.decode('utf-8-sig')
+    finally:
+        body.close()
+
+def read_csv_header(bucket, key):
+    """Column names from the first line of a CSV feed."""
+    body = s3.get_object(Bucket=bucket, Key=key, Range="bytes=0-65535")['Body']
+    first_line = body.read().split(b'\n', 1)[0].decode('utf-8-sig')
+    return next(csv.reader([first_line]))
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _json_rows(lines, invalid_lines):
+    """Parse JSON lines, recording lines that are not a JSON object in invalid_lines and skipping them."""
+    for line in lines:
+        if not line.strip():
+            continue
+        line = line.rstrip('\r\n')
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            invalid_lines.append({"line": line[:MAX_REPORTED_LINE_LENGTH], "error": f"Invalid JSON line: {e}"})
+            continue
+        if not isinstance(row, dict):
+            invalid_lines.append({"line": line[:MAX_REPORTED_LINE_LENGTH], "error": "Invalid JSON line: not an object"})
+            continue
+        yield row
+
+def iter_feed_chunks(bucket, key, chunk_size=1000, byte_range=None, header=None, row_groups=None, invalid_lines=None):
+    """
+    Yield lists of at most chunk_size proposal dicts from a feed.
+    byte_range=(start, end) limits CSV/JSON-lines reading to the lines starting in that range;
+    CSV ranges that do not start at 0 need the feed's header. row_groups limits Parquet reading.
+    JSON lines that cannot be parsed do not stop the feed: they are skipped and appended to
+    invalid_lines, when given, as {"line": ..., "error": ...}.
+    """
+    format = feed_format(key)
+
+    if format == 'parquet':
+        for batch in _parquet_file(bucket, key).iter_batches(batch_size=chunk_size, row_groups=row_groups):
+            yield batch.to_pylist()
+        return
+
+    lines = _lines(bucket, key, byte_range)
+    if format == 'jsonl':
+        yield from _chunks(_json_rows(lines, invalid_lines if invalid_lines is not None else []), chunk_size)
+        return
+
+    if header is None and byte_range and byte_range[0] > 0:
+        header = read_csv_header(bucket, key)
+    if header is None:
+        # The first line of the object is the header
+        rows = csv.DictReader(lines)
+    else:
+        rows = csv.DictReader(lines, fieldnames=header)
+        # The header row itself is read by the range starting at 0
+        rows = (row for row in rows if list(row.values()) != header)
+    yield from _chunks(rows, chunk_size)
+
+def plan_byte_ranges(size, range_bytes):
+    """Split an object of `size` bytes into (start, end) ranges of about range_bytes each."""
+    return [(start, min(start + range_bytes, size) - 1) for start in range(0, size, range_bytes)]
+
+def plan_csv_ranges(bucket, key, size, range_bytes):
+    """
+    Split a CSV object into (start, end) ranges of about range_bytes each whose boundaries are
+    record starts: the first line start at or after each nominal boundary that is not inside a
+    quoted field. Streams the object once to track quote parity; doubled quotes ("") inside a
+    field leave the parity unchanged.
+    """
+    starts = [0]
+    target = range_bytes
+    offset = 0
+    in_quotes = False
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        for chunk in body.iter_chunks(CSV_PLAN_CHUNK_BYTES):
+            position = 0
+            while target < offset + len(chunk):
+                search_from = max(target - offset, 0)
+                in_quotes ^= chunk.count(b'"', position, search_from) % 2 == 1
+                position = search_from
+                newline = chunk.find(b'\n', position)
+                while newline != -1:
+                    in_quotes ^= chunk.count(b'"', position, newline) % 2 == 1
+                    position = newline
+                    if not in_quotes:
+                        break
+                    newline = chunk.find(b'\n', position + 1)
+                if newline == -1:
+                    # No record start left in this chunk; keep looking in the next one
+                    target = offset + len(chunk)
+                    break
+                if offset + newline + 1 < size:
+                    starts.append(offset + newline + 1)
+                target = max(offset + newline + 1 + range_bytes, target + 1)
+            in_quotes ^= chunk.count(b'"', position) % 2 == 1
+            offset += len(chunk)
+    finally:
+        body.close()
+    return [(start, next_start - 1) for start, next_start in zip(starts, starts[1:] + [size])]
+
+def parquet_row_groups(bucket, key):
+    """Number of row groups in a Parquet feed."""
+    return _parquet_file(bucket, key).num_row_groups
+
+def _parquet_file(bucket, key):
+    try:
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet feeds require pyarrow to be installed.")
+    filesystem = pyarrow.fs.S3FileSystem(region=os.getenv('AWS_REGION', 'us-east-1'))
+    return pyarrow.parquet.ParquetFile(filesystem.open_input_file(f"{bucket}/{key}"))
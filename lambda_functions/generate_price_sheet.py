@@ -1,71 +1,483 @@
-import boto3
+import hashlib
 import json
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import islice
+from urllib.parse import unquote_plus
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+import numpy as np
+
+from lambda_functions.aws_clients import lazy_client, lazy_resource, lazy_table
+from lambda_functions.competitor_fetcher import fetch_competitor_prices
+from lambda_functions.dynamodb_utils import batch_get_items, price_drop_value, scan_items, status_timestamp
+from lambda_functions.feed_reader import feed_format, iter_feed_chunks, parquet_row_groups, plan_byte_ranges, plan_csv_ranges, read_csv_header
+from lambda_functions.instrumentation import instrumented, span
+from lambda_functions.min_price_cache import SNAPSHOT_BUCKET, MinimumPriceCache, get_minimum_prices
+from lambda_functions.pricing_rules import PricingEngine
+from lambda_functions.stores import DEFAULT_STORE_ID, proposal_key, store_id_from, store_product_id, store_status, validate_store_id
+
+# DynamoDB resource and tables are created on first use
+dynamodb = lazy_resource('dynamodb')
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
+
+s3 = lazy_client('s3')
+lambda_client = lazy_client('lambda')
+
+# Feed rows processed (and written) per batch when streaming from S3
+FEED_CHUNK_SIZE = int(os.getenv('FEED_CHUNK_SIZE', '1000'))
+# Feeds larger than this are split into byte ranges of this size across invocations
+FEED_RANGE_BYTES = int(os.getenv('FEED_RANGE_BYTES', str(64 * 1024 * 1024)))
+FEED_ROW_GROUPS_PER_WORKER = int(os.getenv('FEED_ROW_GROUPS_PER_WORKER', '4'))
+MAX_REPORTED_FAILURES = 100
+# Concurrent conditional puts per batch of proposals
+PROPOSAL_WRITE_WORKERS = int(os.getenv('PROPOSAL_WRITE_WORKERS', '16'))
+# A crawl of the stored CompetitorURLs is split into this many parallel invocations. Each has
+# its own per-domain rate limit, so a domain sees up to CRAWL_SEGMENTS times that rate.
+CRAWL_SEGMENTS = int(os.getenv('CRAWL_SEGMENTS', '8'))
+CRAWL_TIME_MARGIN_MS = int(os.getenv('CRAWL_TIME_MARGIN_MS', '120000'))
+# Feeds uploaded under FEED_PREFIX/<StoreID>/ belong to that store; feeds directly under it to DEFAULT_STORE_ID
+FEED_PREFIX = 'feeds/'
 
-# Assume there's a separate table for minimum prices
-min_price_table_name = os.getenv('MIN_PRICE_TABLE', 'MinimumPrices')
-min_price_table = dynamodb.Table(min_price_table_name)
+# Minimum prices are cached across warm invocations and backed by the S3 snapshot when configured
+min_price_cache = MinimumPriceCache(
+    get_minimum_prices,
+    ttl_seconds=int(os.getenv('MIN_PRICE_CACHE_TTL_SECONDS', '3600')),
+    snapshot_bucket=SNAPSHOT_BUCKET
+)
 
-def get_minimum_price(internal_product_id):
-    """Fetch the minimum price for a given product from the minimum prices table."""
+def proposal_hash(competitor_url, current_price, competitor_price, proposed_price):
+    """Content hash of the fields that define a proposal, stored as ProposalHash."""
+    content = json.dumps([competitor_url, f"{current_price:.2f}", f"{competitor_price:.2f}", f"{proposed_price:.2f}"])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+def existing_proposals(store_id, keys):
+    """(ProposalHash, Version) of a store's stored rows for the given (ProductID, VariantID) keys."""
+    items = batch_get_items(
+        dynamodb,
+        table_name,
+        [{'StoreProductID': store_product_id(store_id, product_id), 'VariantID': variant_id} for product_id, variant_id in keys],
+        ProjectionExpression='ProductID, VariantID, ProposalHash, Version'
+    )
+    return {(item['ProductID'], item['VariantID']): (item.get('ProposalHash'), int(item.get('Version', 0))) for item in items}
+
+def put_proposal(item, stored_version):
+    """
+    Write a proposal only if the stored row is still at the Version it was read at (or still
+    absent), so a review or another feed worker that changed it meanwhile is not overwritten.
+    Returns False on such a conflict.
+    """
+    # The resource's client is thread-safe, unlike the Table resource
+    client = table.meta.client
+    condition = {"ConditionExpression": "attribute_not_exists(#version)", "ExpressionAttributeNames": {"#version": "Version"}}
+    if stored_version:
+        condition["ConditionExpression"] = "#version = :stored_version"
+        condition["ExpressionAttributeValues"] = {":stored_version": stored_version}
     try:
-        response = min_price_table.get_item(Key={'ProductID': internal_product_id})
-        return float(response['Item']['MinimumPrice'])
-    except Exception as e:
-        print(f"Error fetching minimum price for Product {internal_product_id}: {e}")
-        return None
+        client.put_item(TableName=table_name, Item=item, **condition)
+        return True
+    except client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def feed_store_id(key):
+    """Store of a feed object: the folder under FEED_PREFIX, or DEFAULT_STORE_ID for feeds at its top level."""
+    folders = key[len(FEED_PREFIX):].split('/')[:-1] if key.startswith(FEED_PREFIX) else []
+    return validate_store_id(folders[0]) if folders else DEFAULT_STORE_ID
+
+def process_proposals(proposals, engine, store_id):
+    """
+    Compute and store one store's proposals for one batch of feed rows.
+    Rows whose proposal is identical to the stored one are skipped, so unchanged prices keep
+    their review status and cause no write, stream record or email. The others are written
+    with conditional puts on the stored Version; rows changed since they were read are
+    reported as failures and can be sent again.
+    Returns (written, skipped, failures) where failures lists the rows that could not be processed.
+    """
+    # Fetch the minimum prices for every distinct product, from the cache or in one batched pass
+    min_prices = min_price_cache.get_many(
+        store_product_id(store_id, proposal['internal_product_id']) for proposal in proposals if 'internal_product_id' in proposal
+    )
+
+    failures = []
+    rows = []
+    # Price columns for the engine, filled in the same pass that validates the rows
+    current_prices = np.empty(len(proposals))
+    competitor_prices = np.empty(len(proposals))
+    minimum_prices = np.empty(len(proposals))
+
+    # Validate each proposal and pair it with its minimum price
+    for proposal in proposals:
+        try:
+            internal_product_id = str(proposal['internal_product_id'])
+            variant_id = str(proposal['competitor_product_id'])
+            competitor_price = float(proposal['competitor_price'])
+            current_price = float(proposal['current_price'])
+        except (KeyError, TypeError, ValueError) as e:
+            failures.append({"proposal": proposal, "error": f"Invalid proposal: {e}"})
+            continue
+
+        min_price = min_prices.get(store_product_id(store_id, internal_product_id))
+        if min_price is None:
+            failures.append({
+                "internal_product_id": internal_product_id,
+                "competitor_product_id": variant_id,
+                "error": f"Error retrieving minimum price for Product ID {internal_product_id} in store {store_id}."
+            })
+            continue
+
+        current_prices[len(rows)] = current_price
+        competitor_prices[len(rows)] = competitor_price
+        minimum_prices[len(rows)] = min_price
+        rows.append((internal_product_id, variant_id, proposal.get('competitor_url'), current_price, competitor_price))
+
+    # Compute every proposed price in one vectorized pass over the batch
+    proposed_prices = []
+    if rows:
+        count = len(rows)
+        with span('pricing.evaluate'):
+            proposed_prices = engine.evaluate(
+                current_prices[:count], competitor_prices[:count], minimum_prices[:count]
+            ).tolist()
+
+    # Only rows whose computed proposal differs from the stored one are written
+    stored = existing_proposals(store_id, dict.fromkeys((row[0], row[1]) for row in rows)) if rows else {}
+    written = skipped = 0
+
+    # Collect the entries for the PricingProposals table
+    status_updated_at = status_timestamp()
+    pending_key = store_status(store_id, 'Pending')
+    # Keyed by row key, so a SKU repeated in the batch is written once, with its last values
+    writes = {}
+    for (internal_product_id, variant_id, competitor_url, current_price, competitor_price), proposed_price in zip(rows, proposed_prices):
+        content_hash = proposal_hash(competitor_url, current_price, competitor_price, proposed_price)
+        stored_hash, stored_version = stored.get((internal_product_id, variant_id), (None, 0))
+        if stored_hash == content_hash:
+            skipped += 1
+            continue
+
+        item = {
+            'StoreProductID': store_product_id(store_id, internal_product_id),
+            'VariantID': variant_id,
+            'StoreID': store_id,
+            'ProductID': internal_product_id,
+            'CompetitorURL': competitor_url,
+            'CurrentPrice': Decimal(str(current_price)),
+            'CompetitorPrice': Decimal(str(competitor_price)),
+            'ProposedPrice': Decimal(str(proposed_price)),
+            'PriceDrop': price_drop_value(current_price, proposed_price),
+            'ApprovalStatus': 'Pending',
+            'ReviewedBy': 'None',
+            'StoreStatus': pending_key,
+            'StatusUpdatedAt': status_updated_at,
+            'ProposalHash': content_hash,
+            # A new Version makes in-flight reviews and applies of the old proposal conflict
+            'Version': stored_version + 1
+        }
+        writes[(internal_product_id, variant_id)] = (item, stored_version)
+
+    # Conditional puts cannot be batched, so they are spread over a thread pool
+    if writes:
+        with ThreadPoolExecutor(max_workers=min(PROPOSAL_WRITE_WORKERS, len(writes))) as executor:
+            results = list(executor.map(lambda write: put_proposal(*write), writes.values()))
+        for (item, _), ok in zip(writes.values(), results):
+            if ok:
+                written += 1
+            else:
+                failures.append({
+                    "internal_product_id": item['ProductID'],
+                    "competitor_product_id": item['VariantID'],
+                    "error": "Proposal changed while it was being generated; send the row again."
+                })
+
+    return written, skipped, failures
+
+def fill_competitor_prices(proposals):
+    """
+    Fetch competitor_price for proposals that only carry a competitor_url.
+    Returns (proposals ready for process_proposals, failures, fetch status counts).
+    """
+    urls = [
+        proposal['competitor_url'] for proposal in proposals
+        if proposal.get('competitor_price') in (None, '') and proposal.get('competitor_url')
+    ]
+    if not urls:
+        return proposals, [], {}
+
+    results, stats = fetch_competitor_prices(urls)
+    priced = []
+    failures = []
+    for proposal in proposals:
+        if proposal.get('competitor_price') in (None, '') and proposal.get('competitor_url'):
+            result = results.get(proposal['competitor_url'], {"price": None, "error": "Unsupported competitor URL"})
+            if result['price'] is None:
+                failures.append({
+                    "internal_product_id": proposal.get('internal_product_id'),
+                    "competitor_product_id": proposal.get('competitor_product_id'),
+                    "error": f"Could not fetch competitor price from {proposal['competitor_url']}: {result.get('error')}"
+                })
+                continue
+            proposal = dict(proposal, competitor_price=result['price'])
+        priced.append(proposal)
+    return priced, failures, stats
+
+def stored_proposals(segment, total_segments, start_key=None):
+    """
+    Yield a proposal (without competitor_price) for every stored row that has a CompetitorURL,
+    reading one segment of a parallel scan, after start_key when given. Each carries the
+    store_id of its row. Rows already applied are repriced from the price they were set to.
+    """
+    scan_kwargs = {'ExclusiveStartKey': start_key} if start_key else {}
+    for item in scan_items(
+        table,
+        Segment=segment,
+        TotalSegments=total_segments,
+        **scan_kwargs,
+        ProjectionExpression="StoreID, ProductID, VariantID, CompetitorURL, CurrentPrice, ProposedPrice, ApprovalStatus",
+        FilterExpression="attribute_type(CompetitorURL, :string)",
+        ExpressionAttributeValues={':string': 'S'}
+    ):
+        current_price = item['ProposedPrice'] if item.get('ApprovalStatus') == 'Completed' else item.get('CurrentPrice')
+        yield {
+            'store_id': item['StoreID'],
+            'internal_product_id': item['ProductID'],
+            'competitor_product_id': item['VariantID'],
+            'competitor_url': item['CompetitorURL'],
+            'current_price': current_price,
+        }
+
+def process_crawl(segment, total_segments, engine, context, start_key=None):
+    """
+    Fetch competitor prices for one scan segment of the stored rows and regenerate their
+    proposals, chunk by chunk, writing each chunk store by store. Stops early when the
+    invocation nears its timeout and returns the key of the last row it processed, from
+    which the next invocation resumes the segment scan.
+    Returns (written, skipped, failed, failures, fetch status counts, resume key or None).
+    """
+    written = skipped = failed = 0
+    failures = []
+    fetch_stats = Counter()
+    rows = stored_proposals(segment, total_segments, start_key)
+    while True:
+        chunk = list(islice(rows, FEED_CHUNK_SIZE))
+        if not chunk:
+            return written, skipped, failed, failures, dict(fetch_stats), None
 
+        priced, chunk_failures, stats = fill_competitor_prices(chunk)
+        fetch_stats.update(stats)
+        by_store = {}
+        for proposal in priced:
+            by_store.setdefault(proposal['store_id'], []).append(proposal)
+        for store_id, store_proposals in by_store.items():
+            chunk_written, chunk_skipped, proposal_failures = process_proposals(store_proposals, engine, store_id)
+            written += chunk_written
+            skipped += chunk_skipped
+            chunk_failures += proposal_failures
+        failed += len(chunk_failures)
+        failures.extend(chunk_failures[:MAX_REPORTED_FAILURES - len(failures)])
+
+        if context.get_remaining_time_in_millis() < CRAWL_TIME_MARGIN_MS:
+            last = chunk[-1]
+            resume_key = proposal_key(last['store_id'], last['internal_product_id'], last['competitor_product_id'])
+            return written, skipped, failed, failures, dict(fetch_stats), resume_key
+
+def invoke_async(context, payload):
+    """Invoke this function again asynchronously."""
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload).encode('utf-8')
+    )
+
+def fan_out_feed(bucket, key, rules, context):
+    """
+    Split a large feed into byte ranges (CSV, JSON lines) or row groups (Parquet) and hand
+    each part to its own asynchronous invocation. Returns the number of parts, or 0 when
+    the feed is small enough to read in this invocation.
+    """
+    format = feed_format(key)
+    feed = {"bucket": bucket, "key": key}
+
+    if format == 'parquet':
+        row_groups = parquet_row_groups(bucket, key)
+        if row_groups <= FEED_ROW_GROUPS_PER_WORKER:
+            return 0
+        parts = [
+            dict(feed, row_groups=list(range(start, min(start + FEED_ROW_GROUPS_PER_WORKER, row_groups))))
+            for start in range(0, row_groups, FEED_ROW_GROUPS_PER_WORKER)
+        ]
+    else:
+        size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+        if size <= FEED_RANGE_BYTES:
+            return 0
+        if format == 'csv':
+            # Quoted fields may contain newlines, so CSV ranges are cut at record starts
+            header = read_csv_header(bucket, key)
+            byte_ranges = plan_csv_ranges(bucket, key, size, FEED_RANGE_BYTES)
+        else:
+            header = None
+            byte_ranges = plan_byte_ranges(size, FEED_RANGE_BYTES)
+        parts = [dict(feed, byte_range=list(byte_range), header=header) for byte_range in byte_ranges]
+
+    for part in parts:
+        invoke_async(context, {"feed": part, "rules": rules})
+    return len(parts)
+
+def process_feed(feed, engine):
+    """Stream one feed (or one part of it) from S3 through the proposal pipeline, chunk by chunk."""
+    store_id = feed_store_id(feed['key'])
+    written = skipped = failed = 0
+    failures = []
+    # Lines of the feed that could not be parsed; drained after every chunk
+    invalid_lines = []
+    chunks = iter_feed_chunks(
+        feed['bucket'],
+        feed['key'],
+        chunk_size=FEED_CHUNK_SIZE,
+        byte_range=tuple(feed['byte_range']) if feed.get('byte_range') else None,
+        header=feed.get('header'),
+        row_groups=feed.get('row_groups'),
+        invalid_lines=invalid_lines
+    )
+    while True:
+        # Time the S3 read and parsing separately from pricing and writes
+        with span('feed.read'):
+            chunk = next(chunks, None)
+        chunk_failures = list(invalid_lines)
+        invalid_lines.clear()
+        if chunk:
+            chunk_written, chunk_skipped, proposal_failures = process_proposals(chunk, engine, store_id)
+            written += chunk_written
+            skipped += chunk_skipped
+            chunk_failures.extend(proposal_failures)
+        failed += len(chunk_failures)
+        # Keep a sample of failures so memory stays bounded for very large feeds
+        failures.extend(chunk_failures[:MAX_REPORTED_FAILURES - len(failures)])
+        if chunk is None:
+            break
+    if failed:
+        print(f"Feed s3://{feed['bucket']}/{feed['key']}: {failed} rows failed, e.g. {failures[:3]}")
+    return written, skipped, failed, failures
+
+@instrumented
 def lambda_handler(event, context):
-    """Lambda function to generate a pricing sheet document."""
+    """
+    Lambda function to generate a pricing sheet document.
+    Proposals arrive inline in the event, or as a feed file in S3 (an S3 ObjectCreated
+    notification, or a {"feed": {...}} part dispatched by a previous invocation).
+    Large feeds are split across concurrent invocations.
+    Proposals are written to one store's partition: the event's "store_id", the folder of a feed
+    uploaded as feeds/<store_id>/<file>, or for crawls the store of each stored row.
+    With {"crawl": true} the competitor prices of every stored CompetitorURL are fetched and
+    their proposals regenerated, split into CRAWL_SEGMENTS {"crawl": {"segment": ...}} invocations.
+    """
     
     # Expected event format:
     # {
+    #   "store_id": "<store_id>",  (optional, defaults to DEFAULT_STORE_ID)
     #   "proposals": [
     #       {"competitor_url": "<some_url>", "competitor_product_id": "<some_id>", "competitor_price": <some_price>, "internal_product_id": "<your_product_id>", "current_price": <current_price>}
-    #   ]
+    #   ],  (competitor_price may be omitted; it is then fetched from competitor_url)
+    #   "rules": [{"rule": "match_competitor"}, {"rule": "round_ending", "ending": 0.99}]  (optional)
     # }
     
-    # Extract proposals from the event
-    proposals = event.get('proposals', [])
-    
-    if not proposals:
-        return {"statusCode": 400, "body": json.dumps("No pricing proposals provided.")}
+    try:
+        engine = PricingEngine.from_config(event.get('rules'))
+    except (TypeError, ValueError) as e:
+        return {"statusCode": 400, "body": json.dumps(f"Invalid pricing rules: {e}")}
 
-    # Create entries in the PricingProposals table
-    for proposal in proposals:
-        internal_product_id = proposal['internal_product_id']
-        competitor_price = float(proposal['competitor_price'])
-        current_price = float(proposal['current_price'])
+    # Crawl mode: fetch competitor prices for the stored rows, one scan segment per invocation
+    crawl = event.get('crawl')
+    if crawl:
+        if not isinstance(crawl, dict):
+            for segment in range(CRAWL_SEGMENTS):
+                invoke_async(context, {"crawl": {"segment": segment, "total_segments": CRAWL_SEGMENTS}, "rules": event.get('rules')})
+            print(f"Competitor crawl split into {CRAWL_SEGMENTS} segments.")
+            return {"statusCode": 202, "body": json.dumps({"message": "Competitor crawl started.", "parts_dispatched": CRAWL_SEGMENTS})}
 
-        # Fetch the minimum price for this product
-        min_price = get_minimum_price(internal_product_id)
+        written, skipped, failed, failures, fetch_stats, resume_key = process_crawl(
+            crawl['segment'], crawl['total_segments'], engine, context, crawl.get('start_key')
+        )
+        print(f"Crawl segment {crawl['segment']}: {written} written, {skipped} unchanged, {failed} failed, fetches {fetch_stats}.")
+        if resume_key:
+            # Continue the segment after the last processed row in a fresh invocation
+            invoke_async(context, {"crawl": dict(crawl, start_key=resume_key), "rules": event.get('rules')})
+            print(f"Crawl segment {crawl['segment']} continues after {resume_key}.")
+        body = {
+            "message": "Competitor crawl segment processed." if resume_key is None else "Competitor crawl segment continues in a new invocation.",
+            "written": written,
+            "skipped": skipped,
+            "failed": failed,
+            "complete": resume_key is None,
+            "fetches": fetch_stats,
+            "failures": failures[:MAX_REPORTED_FAILURES]
+        }
+        return {"statusCode": 200, "body": json.dumps(body, default=str)}
 
-        if min_price is None:
-            return {"statusCode": 500, "body": json.dumps(f"Error retrieving minimum price for Product ID {internal_product_id}.")}
+    # S3-triggered mode: stream each uploaded feed, fanning out the large ones
+    if event.get('Records') or event.get('feed'):
+        feeds = [event['feed']] if event.get('feed') else [
+            {"bucket": record['s3']['bucket']['name'], "key": unquote_plus(record['s3']['object']['key'])}
+            for record in event['Records']
+        ]
 
-        # Only mark for approval if competitor price is lower than current price but higher than the minimum price
-        if competitor_price < current_price and competitor_price >= min_price:
-            proposed_price = competitor_price
-        else:
-            proposed_price = current_price
+        written = skipped = failed = dispatched = 0
+        failures = []
+        try:
+            for feed in feeds:
+                if not event.get('feed'):
+                    parts = fan_out_feed(feed['bucket'], feed['key'], event.get('rules'), context)
+                    if parts:
+                        dispatched += parts
+                        print(f"Feed s3://{feed['bucket']}/{feed['key']} split into {parts} parts.")
+                        continue
+                feed_written, feed_skipped, feed_failed, feed_failures = process_feed(feed, engine)
+                written += feed_written
+                skipped += feed_skipped
+                failed += feed_failed
+                failures.extend(feed_failures)
+        except ValueError as e:
+            return {"statusCode": 400, "body": json.dumps(f"Invalid feed: {e}")}
 
-        item = {
-            'ProductID': str(internal_product_id),
-            'VariantID': str(proposal['competitor_product_id']),
-            'CompetitorURL': proposal['competitor_url'],
-            'CurrentPrice': current_price,
-            'CompetitorPrice': competitor_price,
-            'ProposedPrice': proposed_price,
-            'ApprovalStatus': 'Pending',
-            'ReviewedBy': 'None'
+        print(f"Feed processed: {written} written, {skipped} unchanged, {failed} failed, {dispatched} parts dispatched.")
+        body = {
+            "message": "Pricing feed processed.",
+            "written": written,
+            "skipped": skipped,
+            "failed": failed,
+            "parts_dispatched": dispatched,
+            "failures": failures[:MAX_REPORTED_FAILURES],
+            "min_price_cache": dict(min_price_cache.stats)
         }
+        return {"statusCode": 200, "body": json.dumps(body, default=str)}
+
+    # Extract proposals from the event
+    proposals = event.get('proposals', [])
+    
+    if not proposals:
+        return {"statusCode": 400, "body": json.dumps("No pricing proposals provided.")}
+
+    try:
+        store_id = store_id_from(event)
+    except ValueError as e:
+        return {"statusCode": 400, "body": json.dumps(str(e))}
 
-        # Write to DynamoDB table
-        table.put_item(Item=item)
+    # Proposals without a competitor_price are priced from their competitor_url
+    proposals, failures, fetch_stats = fill_competitor_prices(proposals)
+    written = skipped = 0
+    if proposals:
+        written, skipped, proposal_failures = process_proposals(proposals, engine, store_id)
+        failures += proposal_failures
 
-    return {"statusCode": 200, "body": json.dumps("Pricing sheet generated and stored successfully.")}
+    body = {
+        "message": "Pricing sheet generated and stored successfully.",
+        "written": written,
+        "skipped": skipped,
+        "failed": len(failures),
+        "failures": failures,
+        "fetches": fetch_stats,
+        "min_price_cache": dict(min_price_cache.stats)
+    }
+    status_code = 500 if failures and not (written or skipped) else 200
+    return {"statusCode": status_code, "body": json.dumps(body, default=str)}
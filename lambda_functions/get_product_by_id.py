@@ -1,18 +1,23 @@
-import boto3
 import json
 import os
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from lambda_functions.aws_clients import deserialize_item, lazy_client, serialize_item
+from lambda_functions.get_products import json_default
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.stores import proposal_key, store_id_from
+
+# A single GetItem does not need the DynamoDB resource model; the client is created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+dynamodb_client = lazy_client('dynamodb')
 
+@instrumented
 def lambda_handler(event, context):
     """
     Lambda function to get a product by ProductID and VariantID from the PricingProposals table.
     Expects the following parameters in the event's path:
     - product_id: The ID of the product
     - variant_id: The ID of the variant (optional, if variants are applicable)
+    and an optional "store_id" query string parameter (defaults to DEFAULT_STORE_ID).
     """
 
     try:
@@ -27,25 +32,28 @@ def lambda_handler(event, context):
                 "body": json.dumps("Missing required fields: 'product_id' and 'variant_id'.")
             }
 
-        # Fetch the product from DynamoDB
-        response = table.get_item(
-            Key={
-                'ProductID': product_id,
-                'VariantID': variant_id
+        try:
+            store_id = store_id_from(event.get('queryStringParameters'))
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(str(e))
             }
-        )
+
+        # Fetch the product from DynamoDB
+        response = dynamodb_client.get_item(TableName=table_name, Key=serialize_item(proposal_key(store_id, product_id, variant_id)))
 
         # Check if the product was found
         if 'Item' not in response:
             return {
                 "statusCode": 404,
-                "body": json.dumps(f"Product with ID {product_id} and Variant {variant_id} not found.")
+                "body": json.dumps(f"Product with ID {product_id} and Variant {variant_id} not found in store {store_id}.")
             }
 
         # Return the product details
         return {
             "statusCode": 200,
-            "body": json.dumps(response['Item'])
+            "body": json.dumps(deserialize_item(response['Item']), default=json_default)
         }
 
     except Exception as e:
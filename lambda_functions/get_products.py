@@ -1,32 +1,115 @@
-import boto3
+import base64
 import json
 import os
+from decimal import Decimal
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.dynamodb_utils import query_status_page
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.stores import store_id_from, store_status
+
+# The DynamoDB table is created on first use
 table_name = os.getenv('DYNAMODB_TABLE', 'PricingProposals')
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(last_key):
+    """Turn a DynamoDB LastEvaluatedKey into an opaque, URL-safe cursor."""
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_key, default=str).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Turn a cursor produced by encode_cursor back into an ExclusiveStartKey."""
+    start_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    # PriceDrop is a number key of the drop index but was encoded as a string
+    if 'PriceDrop' in start_key:
+        start_key['PriceDrop'] = Decimal(start_key['PriceDrop'])
+    return start_key
 
+def price_drop(item):
+    """How far the proposed price is below the current price (negative for increases)."""
+    return Decimal(item.get('CurrentPrice', 0)) - Decimal(item.get('ProposedPrice', 0))
+
+def json_default(value):
+    """Serialize the Decimal values returned by DynamoDB."""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def build_response(status_code, payload):
+    """
+    Build the HTTP response. API Gateway gzip-compresses it for clients that accept it
+    (provider.apiGateway.minimumCompressionSize in serverless.yml).
+    """
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(payload, default=json_default)
+    }
+
+@instrumented
 def lambda_handler(event, context):
     """
-    Lambda function to get all products with price changes pending approval.
+    Lambda function to get products with price changes pending approval, one page at a time.
+    Only the requested store's partition of the status index is read.
+    Supported query string parameters:
+    - store_id: Store to list (default DEFAULT_STORE_ID)
+    - limit: Page size (default 50, maximum 500)
+    - cursor: Opaque cursor returned as next_cursor by the previous page
+    - product_prefix: Only return products whose ProductID starts with this prefix
+    - min_delta: Only return proposals whose price moves by at least this amount
+    - sort: "price_drop" to list proposals largest price drop first, across pages, from the
+      drop index (rows written before PriceDrop existed need scripts/backfill_status_index.py)
     """
+    params = event.get('queryStringParameters') or {}
+
+    try:
+        limit = min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        min_delta = Decimal(params['min_delta']) if params.get('min_delta') else None
+        start_key = decode_cursor(params['cursor']) if params.get('cursor') else None
+        store_id = store_id_from(params)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        if start_key and start_key.get('StoreStatus') != store_status(store_id, 'Pending'):
+            raise ValueError("cursor belongs to another store")
+    except Exception as e:
+        return build_response(400, f"Invalid query parameters: {str(e)}")
+
+    sort = params.get('sort')
+    if sort not in (None, 'price_drop'):
+        return build_response(400, f"Invalid sort: {sort}. Allowed value is 'price_drop'.")
+    # A cursor resumes the index it was read from, so it cannot switch the order
+    if start_key and ('PriceDrop' in start_key) != (sort == 'price_drop'):
+        return build_response(400, "Invalid query parameters: cursor belongs to another sort order")
+
+    query_kwargs = {}
+    if params.get('product_prefix'):
+        query_kwargs['FilterExpression'] = "begins_with(ProductID, :product_prefix)"
+        query_kwargs['ExpressionAttributeValues'] = {':product_prefix': params['product_prefix']}
+
+    # Price deltas are computed attributes, so they are filtered after the read
+    item_filter = None
+    if min_delta is not None:
+        item_filter = lambda item: abs(price_drop(item)) >= min_delta
 
     try:
-        # Scan the DynamoDB table to fetch items with ApprovalStatus as "Pending"
-        response = table.scan(
-            FilterExpression="ApprovalStatus = :status",
-            ExpressionAttributeValues={":status": "Pending"}
+        # Query the store's status index partition for one page of items with ApprovalStatus as "Pending"
+        items, last_key = query_status_page(
+            table,
+            store_id,
+            "Pending",
+            limit,
+            exclusive_start_key=start_key,
+            item_filter=item_filter,
+            largest_drop_first=sort == 'price_drop',
+            **query_kwargs
         )
 
-        # Return the list of products that are pending approval
-        return {
-            "statusCode": 200,
-            "body": json.dumps(response.get('Items', []))
-        }
+        # Return the page of products that are pending approval
+        return build_response(200, {"items": items, "next_cursor": encode_cursor(last_key)})
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps(f"Error retrieving products: {str(e)}")
-        }
+        return build_response(500, f"Error retrieving products: {str(e)}")
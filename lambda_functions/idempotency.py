@@ -0,0 +1,93 @@
+"""
+Idempotency store for stream consumers.
+
+Records which keys (stream sequence numbers, content hashes) have already been handled, so
+retried batches and repeated notifications are dropped before any side effect. Keys are held
+in an in-process LRU with a TTL, which catches retries landing on the same warm container.
+When a table name is configured they are also written to a DynamoDB table with a TTL
+attribute, which catches retries that land on another container.
+
+    store = IdempotencyStore(os.getenv('NOTIFICATION_DEDUPE_TABLE'), ttl_seconds=86400)
+    already = store.seen(keys)
+    ... act on the rest ...
+    store.record(keys)
+
+Keys are recorded only after the side effect succeeded, so a failed send is retried. The
+table is read and written with the low-level client, so stream consumers never load the
+DynamoDB resource model.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from lambda_functions.aws_clients import get_client
+from lambda_functions.dynamodb_utils import batch_get_items, batch_write_items
+
+
+class IdempotencyStore:
+    """Seen-key set with an in-memory LRU and an optional TTL-expired DynamoDB table behind it."""
+
+    def __init__(self, table_name=None, ttl_seconds=86400, max_entries=100000):
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'table_hits': 0, 'misses': 0}
+
+    def seen(self, keys):
+        """Return the subset of keys that were recorded within the TTL."""
+        now = time.time()
+        found = set()
+        unknown = []
+
+        with self.lock:
+            for key in dict.fromkeys(keys):
+                expires_at = self.entries.get(key)
+                if expires_at and expires_at > now:
+                    self.entries.move_to_end(key)
+                    found.add(key)
+                    self.stats['memory_hits'] += 1
+                else:
+                    unknown.append(key)
+
+        if unknown and self.table_name:
+            items = batch_get_items(
+                get_client('dynamodb'),
+                self.table_name,
+                [{'DedupeKey': {'S': key}} for key in unknown],
+                ProjectionExpression='DedupeKey, ExpiresAt'
+            )
+            with self.lock:
+                for item in items:
+                    key, expires_at = item['DedupeKey']['S'], int(item['ExpiresAt']['N'])
+                    # DynamoDB deletes expired items lazily, so the TTL is checked here too
+                    if expires_at > now:
+                        found.add(key)
+                        self._remember(key, expires_at)
+                        self.stats['table_hits'] += 1
+
+        self.stats['misses'] += sum(1 for key in unknown if key not in found)
+        return found
+
+    def record(self, keys):
+        """Mark keys as handled."""
+        expires_at = int(time.time()) + self.ttl_seconds
+        keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for key in keys:
+                self._remember(key, expires_at)
+
+        if keys and self.table_name:
+            batch_write_items(
+                get_client('dynamodb'),
+                self.table_name,
+                [{'DedupeKey': {'S': key}, 'ExpiresAt': {'N': str(expires_at)}} for key in keys]
+            )
+
+    def _remember(self, key, expires_at):
+        self.entries[key] = expires_at
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
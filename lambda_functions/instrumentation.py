@@ -0,0 +1,171 @@
+"""
+Per-invocation timing, DynamoDB capacity and CloudWatch metrics for the Lambda handlers.
+
+Decorating a handler with @instrumented records, for every invocation:
+
+* a timed span per downstream AWS call (e.g. "dynamodb.Query", "ses.SendEmail"), captured
+  through botocore event hooks on every client built by aws_clients, so handlers need no
+  per-call code;
+* the DynamoDB capacity consumed, per table, by asking every DynamoDB call for
+  ReturnConsumedCapacity=TOTAL;
+* any extra spans opened with `with span("platform.push.shopify"):` for work that is not an
+  AWS call.
+
+When the handler returns (or raises) a single CloudWatch Embedded Metric Format record is
+printed. CloudWatch Logs turns it into metrics without any PutMetricData call, and the same
+line is a structured JSON log with the request id and per-span breakdown.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'PriceApproval')
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# DynamoDB operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = frozenset((
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems'
+))
+
+# EMF allows at most 100 metrics per directive
+MAX_EMF_METRICS = 100
+
+_lock = threading.Lock()
+_spans = {}
+_capacity = {}
+
+
+def reset():
+    """Clear the recorded spans and capacity; called at the start of every invocation."""
+    with _lock:
+        _spans.clear()
+        _capacity.clear()
+
+
+def record_span(name, duration_ms):
+    """Add one timed occurrence of a span. Safe to call from worker threads."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            _spans[name] = {'count': 1, 'total_ms': duration_ms, 'max_ms': duration_ms}
+        else:
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+
+def record_capacity(consumed):
+    """Add the ConsumedCapacity of a DynamoDB response (a dict or a list of dicts) per table."""
+    entries = consumed if isinstance(consumed, list) else [consumed]
+    with _lock:
+        for entry in entries:
+            table_name = entry.get('TableName', 'unknown')
+            _capacity[table_name] = _capacity.get(table_name, 0.0) + float(entry.get('CapacityUnits', 0))
+
+
+@contextmanager
+def span(name):
+    """Time a block of work as a named span."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, (time.perf_counter() - start) * 1000)
+
+
+def _request_capacity(params, model, **kwargs):
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _before_call(context, **kwargs):
+    context['instrumentation_start'] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs):
+    start = context.get('instrumentation_start')
+    if start is not None:
+        record_span(f"{model.service_model.service_name}.{model.name}", (time.perf_counter() - start) * 1000)
+    consumed = parsed.get('ConsumedCapacity') if isinstance(parsed, dict) else None
+    if consumed:
+        record_capacity(consumed)
+
+
+def instrument_client(client):
+    """Register the timing (and, for DynamoDB, capacity) hooks on a boto3 client. Returns the client."""
+    events = client.meta.events
+    events.register('before-call', _before_call)
+    events.register('after-call', _after_call)
+    if client.meta.service_model.service_name == 'dynamodb':
+        events.register('provide-client-params.dynamodb', _request_capacity)
+    return client
+
+
+def build_record(function_name, request_id, duration_ms, error):
+    """Build the EMF record for one invocation from the recorded spans and capacity."""
+    with _lock:
+        spans = {name: dict(stats) for name, stats in _spans.items()}
+        capacity = dict(_capacity)
+
+    values = {
+        'Duration': (duration_ms, 'Milliseconds'),
+        'Errors': (1 if error else 0, 'Count'),
+        'DynamoDBCalls': (sum(stats['count'] for name, stats in spans.items() if name.startswith('dynamodb.')), 'Count'),
+        'ConsumedCapacity': (sum(capacity.values()), 'Count'),
+    }
+    for name, stats in sorted(spans.items(), key=lambda entry: -entry[1]['total_ms']):
+        if len(values) + 2 > MAX_EMF_METRICS:
+            break
+        values[f"{name}.Time"] = (stats['total_ms'], 'Milliseconds')
+        values[f"{name}.Calls"] = (stats['count'], 'Count')
+
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["Function"]],
+                "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in values.items()]
+            }]
+        },
+        "Function": function_name,
+        "RequestId": request_id,
+        "Spans": {
+            name: {'count': stats['count'], 'total_ms': round(stats['total_ms'], 2), 'max_ms': round(stats['max_ms'], 2)}
+            for name, stats in spans.items()
+        },
+        "CapacityByTable": {name: round(units, 2) for name, units in capacity.items()},
+    }
+    for name, (value, _) in values.items():
+        record[name] = round(value, 2) if isinstance(value, float) else value
+    if error:
+        record["Error"] = error
+    return record
+
+
+def instrumented(handler):
+    """Decorator for lambda_handler functions that emits one EMF record per invocation."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not METRICS_ENABLED:
+            return handler(event, context)
+
+        reset()
+        start = time.perf_counter()
+        error = None
+        try:
+            return handler(event, context)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            function_name = getattr(context, 'function_name', None) or handler.__module__.rsplit('.', 1)[-1]
+            request_id = getattr(context, 'aws_request_id', None)
+            duration_ms = (time.perf_counter() - start) * 1000
+            print(json.dumps(build_record(function_name, request_id, duration_ms, error), default=str))
+    return wrapper
@@ -0,0 +1,197 @@
+"""
+Read-through cache for MinimumPrices.
+
+Minimum prices change rarely, so lookups are served from an in-process LRU cache with a
+TTL that survives across warm invocations. Misses are fetched in bulk through the loader
+(get_minimum_prices, a batched BatchGetItem read) and cached. Products without a minimum
+price are cached too, so they are not looked up again on every call.
+
+Prices are keyed by StoreProductID ("<StoreID>#<ProductID>", see stores), since every store
+has its own minimums.
+
+Optionally a gzip-compressed JSON snapshot of the whole table ({"StoreProductID": "price"})
+is loaded from S3 once per container and consulted before DynamoDB. The snapshot is kept
+up to date by the min_price_snapshot stream handler and rebuilt by it daily; containers
+re-check its ETag at most every SNAPSHOT_CHECK_SECONDS and drop everything they cached when
+it changes, which is how MinimumPrices writes invalidate warm caches. Until the snapshot
+exists (e.g. before the first daily rebuild) containers keep trying to read it on the same
+schedule; its absence is expected and not logged as an error.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lambda_functions.aws_clients import lazy_client, lazy_resource
+from lambda_functions.dynamodb_utils import batch_get_items
+from lambda_functions.stores import split_store_product_id, store_product_id
+
+SNAPSHOT_BUCKET = os.getenv('MIN_PRICE_SNAPSHOT_BUCKET')
+SNAPSHOT_KEY = os.getenv('MIN_PRICE_SNAPSHOT_KEY', 'snapshots/minimum-prices.json.gz')
+SNAPSHOT_CHECK_SECONDS = int(os.getenv('MIN_PRICE_SNAPSHOT_CHECK_SECONDS', '60'))
+
+# Assume there's a separate table for minimum prices
+min_price_table_name = os.getenv('MIN_PRICE_TABLE', 'MinimumPrices')
+
+dynamodb = lazy_resource('dynamodb')
+s3 = lazy_client('s3')
+
+def get_minimum_prices(store_product_ids):
+    """
+    Fetch the minimum prices for a collection of StoreProductIDs with BatchGetItem.
+    Duplicate IDs are requested once and unprocessed keys are retried with backoff.
+    Returns a dict of StoreProductID -> minimum price; products without a minimum are omitted.
+    """
+    keys = [
+        dict(zip(('StoreID', 'ProductID'), split_store_product_id(value)))
+        for value in dict.fromkeys(str(value) for value in store_product_ids)
+    ]
+    items = batch_get_items(
+        dynamodb,
+        min_price_table_name,
+        keys,
+        ProjectionExpression='StoreID, ProductID, MinimumPrice'
+    )
+    return {store_product_id(item['StoreID'], item['ProductID']): float(item['MinimumPrice']) for item in items}
+
+def read_snapshot(bucket, key):
+    """Load a snapshot from S3. Returns (prices, etag), or ({}, None) when it does not exist yet."""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return {}, None
+    prices = json.loads(gzip.decompress(response['Body'].read()))
+    return {product_id: float(price) for product_id, price in prices.items()}, response['ETag']
+
+def write_snapshot(bucket, key, prices, expected_etag=None):
+    """
+    Store a snapshot of StoreProductID -> minimum price in S3 and return its new ETag.
+    The write is conditional: it only replaces the object with the given ETag, or only
+    creates it when expected_etag is None. Raises SnapshotConflict when another writer got
+    there first, so the caller can re-read and retry.
+    """
+    body = gzip.compress(json.dumps({product_id: str(price) for product_id, price in prices.items()}).encode('utf-8'))
+    condition = {'IfMatch': expected_etag} if expected_etag else {'IfNoneMatch': '*'}
+    try:
+        response = s3.put_object(Bucket=bucket, Key=key, Body=body, ContentType='application/json', ContentEncoding='gzip', **condition)
+    except s3.exceptions.ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict'):
+            raise SnapshotConflict(f"Snapshot s3://{bucket}/{key} changed since ETag {expected_etag}") from e
+        raise
+    return response['ETag']
+
+
+class SnapshotConflict(Exception):
+    """The snapshot was replaced by another writer between read and write."""
+
+
+class MinimumPriceCache:
+    """LRU + TTL cache of StoreProductID -> minimum price with hit/miss counters."""
+
+    def __init__(self, loader, max_entries=50000, ttl_seconds=3600, snapshot_bucket=None, snapshot_key=SNAPSHOT_KEY):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_bucket = snapshot_bucket
+        self.snapshot_key = snapshot_key
+        self.entries = OrderedDict()
+        self.snapshot = None
+        self.snapshot_etag = None
+        self.snapshot_checked_at = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'snapshot_hits': 0, 'misses': 0, 'invalidations': 0, 'snapshot_loads': 0}
+
+    def get_many(self, product_ids):
+        """Return a dict of StoreProductID -> minimum price for the products that have one."""
+        self._refresh_snapshot()
+        now = time.monotonic()
+        prices = {}
+        missing = []
+
+        with self.lock:
+            for product_id in dict.fromkeys(str(product_id) for product_id in product_ids):
+                entry = self.entries.get(product_id)
+                fresh = entry is not None and entry[1] > now
+                if fresh and entry[0] is not None:
+                    self.entries.move_to_end(product_id)
+                    prices[product_id] = entry[0]
+                    self.stats['hits'] += 1
+                elif self.snapshot and product_id in self.snapshot:
+                    prices[product_id] = self.snapshot[product_id]
+                    self.stats['snapshot_hits'] += 1
+                elif fresh:
+                    # Looked up before and had no minimum price
+                    self.entries.move_to_end(product_id)
+                    self.stats['negative_hits'] += 1
+                else:
+                    missing.append(product_id)
+                    self.stats['misses'] += 1
+
+        if missing:
+            loaded = self.loader(missing)
+            with self.lock:
+                for product_id in missing:
+                    self._store(product_id, loaded.get(product_id), now)
+            prices.update(loaded)
+        return prices
+
+    def invalidate(self, product_ids=None):
+        """Drop the given products, or everything (including the snapshot) when none are given."""
+        with self.lock:
+            if product_ids is None:
+                self.entries.clear()
+                self.snapshot = None
+                self.snapshot_etag = None
+                self.snapshot_checked_at = 0
+            else:
+                for product_id in product_ids:
+                    self.entries.pop(str(product_id), None)
+            self.stats['invalidations'] += 1
+
+    def _store(self, product_id, price, now):
+        self.entries[product_id] = (price, now + self.ttl_seconds)
+        self.entries.move_to_end(product_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _refresh_snapshot(self):
+        """
+        Load the S3 snapshot once, then reload it whenever its ETag changes. While there is no
+        snapshot (snapshot_etag is None) every check tries to read it again.
+        """
+        if not self.snapshot_bucket or time.monotonic() - self.snapshot_checked_at < SNAPSHOT_CHECK_SECONDS:
+            return
+        self.snapshot_checked_at = time.monotonic()
+
+        try:
+            if self.snapshot_etag is not None:
+                try:
+                    etag = s3.head_object(Bucket=self.snapshot_bucket, Key=self.snapshot_key)['ETag']
+                except s3.exceptions.ClientError as e:
+                    # HeadObject has no body, so a missing object is a bare 404
+                    if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                        raise
+                    etag = None
+                if etag == self.snapshot_etag:
+                    return
+            snapshot, etag = read_snapshot(self.snapshot_bucket, self.snapshot_key)
+        except Exception as e:
+            print(f"Error loading minimum price snapshot: {e}")
+            return
+
+        with self.lock:
+            if etag is None and self.snapshot_etag is None:
+                # Still no snapshot
+                self.snapshot = {}
+                return
+            if self.snapshot_etag is not None:
+                # The table changed since the snapshot we held; cached entries may be stale too
+                self.entries.clear()
+                self.stats['invalidations'] += 1
+            self.snapshot = snapshot
+            self.snapshot_etag = etag
+            if etag is not None:
+                self.stats['snapshot_loads'] += 1
@@ -0,0 +1,68 @@
+import json
+import os
+
+from lambda_functions.aws_clients import lazy_table
+from lambda_functions.dynamodb_utils import scan_items
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.min_price_cache import SNAPSHOT_BUCKET, SNAPSHOT_KEY, SnapshotConflict, read_snapshot, write_snapshot
+from lambda_functions.stores import store_product_id
+
+# The DynamoDB table is created on first use
+min_price_table_name = os.getenv('MIN_PRICE_TABLE', 'MinimumPrices')
+min_price_table = lazy_table(min_price_table_name)
+
+# Read-modify-write rounds before giving up and letting the stream retry the batch
+MAX_WRITE_ATTEMPTS = 5
+
+def rebuild_snapshot():
+    """Read the whole MinimumPrices table into a fresh snapshot."""
+    return {
+        store_product_id(item['StoreID'], item['ProductID']): float(item['MinimumPrice'])
+        for item in scan_items(min_price_table, total_segments=4, ProjectionExpression="StoreID, ProductID, MinimumPrice")
+    }
+
+def apply_records(snapshot, records):
+    """Patch the changed and removed products of a batch of stream records into a snapshot."""
+    for record in records:
+        keys = record['dynamodb']['Keys']
+        product_key = store_product_id(keys['StoreID']['S'], keys['ProductID']['S'])
+        if record['eventName'] == 'REMOVE':
+            snapshot.pop(product_key, None)
+        else:
+            snapshot[product_key] = float(record['dynamodb']['NewImage']['MinimumPrice']['N'])
+    return snapshot
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Lambda function that keeps the S3 snapshot of MinimumPrices in step with the table.
+    Triggered by the MinimumPrices DynamoDB stream; changed and removed products are patched
+    into the snapshot, and the new object's ETag tells warm generate_price_sheet containers
+    to drop their cached minimums. Invoked without Records (the daily schedule), it rebuilds
+    the snapshot from a full scan, which also repairs any drift.
+
+    Every write is conditional on the ETag that was read (If-Match), so concurrent shards or
+    a rebuild racing a patch cannot overwrite each other's changes; on a conflict the snapshot
+    is re-read and the batch (or the scan) applied again.
+    """
+    if not SNAPSHOT_BUCKET:
+        return {"statusCode": 400, "body": json.dumps("MIN_PRICE_SNAPSHOT_BUCKET is not configured.")}
+
+    records = event.get('Records')
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        snapshot, etag = read_snapshot(SNAPSHOT_BUCKET, SNAPSHOT_KEY)
+        if not records or etag is None:
+            snapshot = rebuild_snapshot()
+        else:
+            snapshot = apply_records(snapshot, records)
+
+        try:
+            write_snapshot(SNAPSHOT_BUCKET, SNAPSHOT_KEY, snapshot, expected_etag=etag)
+            break
+        except SnapshotConflict as e:
+            if attempt == MAX_WRITE_ATTEMPTS:
+                raise
+            print(f"{e}; retrying ({attempt}/{MAX_WRITE_ATTEMPTS}).")
+
+    print(f"Minimum price snapshot updated with {len(snapshot)} products.")
+    return {"statusCode": 200, "body": json.dumps(f"Snapshot updated with {len(snapshot)} products.")}
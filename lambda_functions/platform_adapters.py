@@ -0,0 +1,111 @@
+"""
+Platform adapters over the Pricing Integration Framework.
+
+Each adapter wraps one `pricing_integration` platform module behind the same interface:
+`update(product_id, variant_id, price)` for a single variant and `bulk_update(items)` for
+many. Bulk updates go through the platform's bulk client (see platform_bulk.py: a Shopify
+bulk mutation, the NetSuite bulk price RESTlet, a Zoey multi-update) when its credentials
+are configured, or through the module's `bulk_update_product_prices(updates)` when it has
+one. Items are then sent in chunks of the platform's batch limit; without either,
+bulk_update falls back to one call per item.
+
+A bulk function receives a list of {"product_id", "variant_id", "price"} dicts and returns
+a dict of (product_id, variant_id) -> bool. Keys missing from the result are treated as
+failures. Platform modules are imported on first use.
+"""
+
+import importlib
+import os
+import threading
+
+from lambda_functions.platform_bulk import bulk_client
+
+
+class PlatformAdapter:
+    """Uniform single and bulk price updates for one commerce platform."""
+
+    name = None
+    module_name = None
+    max_batch_size = 1
+
+    def __init__(self, update_func, bulk_func=None):
+        self.update_func = update_func
+        self.bulk_func = bulk_func
+
+    @property
+    def batch_size(self):
+        """Number of items sent per platform request."""
+        return self.max_batch_size if self.bulk_func else 1
+
+    def update(self, product_id, variant_id, price):
+        return bool(self.update_func(product_id, variant_id, price))
+
+    def bulk_update(self, items):
+        """
+        Update many prices. items is an iterable of dicts with ProductID, VariantID and
+        ProposedPrice. Returns a dict of (ProductID, VariantID) -> bool covering every item.
+        """
+        items = list(items)
+        results = {}
+
+        if not self.bulk_func:
+            for item in items:
+                key = (item['ProductID'], item['VariantID'])
+                results[key] = self.update(key[0], key[1], item['ProposedPrice'])
+            return results
+
+        for start in range(0, len(items), self.max_batch_size):
+            chunk = items[start:start + self.max_batch_size]
+            updates = [
+                {"product_id": item['ProductID'], "variant_id": item['VariantID'], "price": item['ProposedPrice']}
+                for item in chunk
+            ]
+            response = self.bulk_func(updates) or {}
+            for item in chunk:
+                key = (item['ProductID'], item['VariantID'])
+                results[key] = bool(response.get(key, False))
+        return results
+
+
+class ShopifyAdapter(PlatformAdapter):
+    name = 'shopify'
+    module_name = 'pricing_integration.shopify_api'
+    max_batch_size = int(os.getenv('SHOPIFY_BATCH_SIZE', '250'))
+
+
+class NetSuiteAdapter(PlatformAdapter):
+    name = 'netsuite'
+    module_name = 'pricing_integration.netsuite_api'
+    # RESTlet calls run under a 5,000-unit governance limit, which a few hundred item updates use up
+    max_batch_size = int(os.getenv('NETSUITE_BATCH_SIZE', '200'))
+
+
+class ZoeyAdapter(PlatformAdapter):
+    name = 'zoey'
+    module_name = 'pricing_integration.zoey_api'
+    max_batch_size = int(os.getenv('ZOEY_BATCH_SIZE', '100'))
+
+
+ADAPTER_CLASSES = {adapter.name: adapter for adapter in (ShopifyAdapter, NetSuiteAdapter, ZoeyAdapter)}
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+def get_adapter(platform):
+    """
+    Return the cached adapter for a platform, importing its integration module on first use.
+    None if unknown. Raises ImportError when the integration module cannot be loaded; the
+    import is retried on the next call.
+    """
+    adapter_class = ADAPTER_CLASSES.get(platform)
+    if adapter_class is None:
+        return None
+
+    with _adapters_lock:
+        if platform not in _adapters:
+            module = importlib.import_module(adapter_class.module_name)
+            _adapters[platform] = adapter_class(
+                module.update_product_price,
+                bulk_client(platform) or getattr(module, 'bulk_update_product_prices', None)
+            )
+        return _adapters[platform]
@@ -0,0 +1,252 @@
+"""
+Bulk price-update clients for the commerce platforms.
+
+The `pricing_integration` modules only update one variant per call. These clients send a
+whole chunk of updates per round trip and report the outcome of every item:
+
+* Shopify: one GraphQL Admin API request with an aliased `productVariantsBulkUpdate`
+  mutation per product (up to SHOPIFY_PRODUCTS_PER_REQUEST products, 250 variants each).
+  Failed variants are read from each mutation's userErrors.
+* NetSuite: one call to the bulk price RESTlet (NETSUITE_RESTLET_URL), signed with
+  token-based authentication. The RESTlet receives {"updates": [{"product_id", "variant_id",
+  "price"}]} and answers {"results": [{"product_id", "variant_id", "success"}]}.
+* Zoey: one multi-update request (PUT on the products collection of the REST API) carrying
+  every variant's new price, signed with OAuth 1.0a. Per-item outcomes come back in the
+  success and error messages of the response.
+
+Each client is a callable taking a list of {"product_id", "variant_id", "price"} dicts and
+returning a dict of (product_id, variant_id) -> bool, the contract of PlatformAdapter's
+bulk_func. A client is only built when its credentials are configured; otherwise the adapter
+keeps the integration module's per-item updates. Throttling responses raise PlatformThrottled
+with the wait the platform asked for, which platform_push honours for the whole platform.
+Connections are kept alive per thread and host, matching the per-platform push pools.
+"""
+
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import secrets
+import threading
+import time
+from urllib.parse import parse_qsl, quote, urlsplit
+
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('PLATFORM_REQUEST_TIMEOUT_SECONDS', '30'))
+SHOPIFY_API_VERSION = os.getenv('SHOPIFY_API_VERSION', '2024-10')
+# productVariantsBulkUpdate accepts at most 250 variants; each aliased mutation costs about
+# 10 query points, so 50 per request stays well under the 1000-point single query limit
+SHOPIFY_VARIANTS_PER_MUTATION = 250
+SHOPIFY_PRODUCTS_PER_REQUEST = int(os.getenv('SHOPIFY_PRODUCTS_PER_REQUEST', '50'))
+
+
+class PlatformError(Exception):
+    """A bulk request failed as a whole."""
+
+
+class PlatformThrottled(PlatformError):
+    """The platform asked us to slow down; retry_after is in seconds (or None)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_connections = threading.local()
+
+def _connection(scheme, host):
+    """Keep-alive connection of the current thread to a host."""
+    pool = _connections.__dict__.setdefault('pool', {})
+    if (scheme, host) not in pool:
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        pool[(scheme, host)] = connection_class(host, timeout=REQUEST_TIMEOUT_SECONDS)
+    return pool[(scheme, host)]
+
+def send_json(method, url, payload, headers=None):
+    """
+    Send a JSON request and return (status, parsed body). Raises PlatformThrottled on 429/503
+    and PlatformError on other non-2xx answers (except 207 Multi-Status) and connection errors.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else '')
+    body = json.dumps(payload, default=str).encode('utf-8')
+    request_headers = dict(headers or {}, **{'Content-Type': 'application/json', 'Accept': 'application/json'})
+
+    connection = _connection(parts.scheme, parts.netloc)
+    try:
+        connection.request(method, path, body, request_headers)
+        response = connection.getresponse()
+        data = response.read()
+    except (OSError, http.client.HTTPException) as e:
+        # Reconnect on the next request instead of reusing a broken connection
+        connection.close()
+        raise PlatformError(f"{method} {parts.netloc}{parts.path} failed: {e}") from None
+
+    if response.status in (429, 503):
+        raise PlatformThrottled(f"HTTP {response.status}", response.getheader('Retry-After'))
+    if response.status >= 300:
+        raise PlatformError(f"HTTP {response.status}: {data[:500].decode('utf-8', 'replace')}")
+    return response.status, json.loads(data) if data else {}
+
+def _percent_encode(value):
+    return quote(str(value), safe='~')
+
+def oauth1_header(method, url, consumer_key, consumer_secret, token, token_secret, realm=None,
+                  signature_method='HMAC-SHA256'):
+    """Authorization header for an OAuth 1.0a request (RFC 5849) with a JSON body."""
+    oauth = {
+        'oauth_consumer_key': consumer_key,
+        'oauth_token': token,
+        'oauth_signature_method': signature_method,
+        'oauth_timestamp': str(int(time.time())),
+        'oauth_nonce': secrets.token_hex(16),
+        'oauth_version': '1.0',
+    }
+    parts = urlsplit(url)
+    parameters = sorted(
+        (_percent_encode(name), _percent_encode(value))
+        for name, value in parse_qsl(parts.query, keep_blank_values=True) + list(oauth.items())
+    )
+    base_string = '&'.join(_percent_encode(part) for part in (
+        method.upper(),
+        f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}",
+        '&'.join(f"{name}={value}" for name, value in parameters),
+    ))
+    key = f"{_percent_encode(consumer_secret)}&{_percent_encode(token_secret)}"
+    digest = hashlib.sha256 if signature_method == 'HMAC-SHA256' else hashlib.sha1
+    oauth['oauth_signature'] = base64.b64encode(hmac.new(key.encode(), base_string.encode(), digest).digest()).decode()
+
+    fields = ([f'realm="{realm}"'] if realm else []) + [f'{name}="{_percent_encode(value)}"' for name, value in oauth.items()]
+    return 'OAuth ' + ', '.join(fields)
+
+def _shopify_gid(kind, value):
+    value = str(value)
+    return value if value.startswith('gid://') else f"gid://shopify/{kind}/{value}"
+
+
+class ShopifyBulkClient:
+    """Aliased productVariantsBulkUpdate mutations, one alias per product (or per 250 of its variants)."""
+
+    def __init__(self, shop_domain, access_token, api_version=SHOPIFY_API_VERSION, scheme='https'):
+        self.url = f"{scheme}://{shop_domain}/admin/api/{api_version}/graphql.json"
+        self.headers = {'X-Shopify-Access-Token': access_token}
+
+    def __call__(self, updates):
+        groups = {}
+        for update in updates:
+            groups.setdefault(update['product_id'], []).append(update)
+        mutations = [
+            (product_id, variants[start:start + SHOPIFY_VARIANTS_PER_MUTATION])
+            for product_id, variants in groups.items()
+            for start in range(0, len(variants), SHOPIFY_VARIANTS_PER_MUTATION)
+        ]
+
+        results = {}
+        for start in range(0, len(mutations), SHOPIFY_PRODUCTS_PER_REQUEST):
+            results.update(self._send(mutations[start:start + SHOPIFY_PRODUCTS_PER_REQUEST]))
+        return results
+
+    def _send(self, mutations):
+        declarations, fields, variables = [], [], {}
+        for index, (product_id, variants) in enumerate(mutations):
+            declarations.append(f"$p{index}: ID!, $v{index}: [ProductVariantsBulkInput!]!")
+            fields.append(f"m{index}: productVariantsBulkUpdate(productId: $p{index}, variants: $v{index}) "
+                          "{ userErrors { field message } }")
+            variables[f"p{index}"] = _shopify_gid('Product', product_id)
+            variables[f"v{index}"] = [
+                {"id": _shopify_gid('ProductVariant', update['variant_id']), "price": str(update['price'])}
+                for update in variants
+            ]
+        query = f"mutation BulkPrices({', '.join(declarations)}) {{ {' '.join(fields)} }}"
+        _, body = send_json('POST', self.url, {"query": query, "variables": variables}, self.headers)
+
+        errors = body.get('errors') or []
+        if any((error.get('extensions') or {}).get('code') == 'THROTTLED' for error in errors):
+            raise PlatformThrottled("Shopify query cost throttled", self._throttle_wait(body))
+        data = body.get('data') or {}
+        if errors and not data:
+            raise PlatformError(f"Shopify rejected the request: {errors[0].get('message')}")
+
+        results = {}
+        for index, (product_id, variants) in enumerate(mutations):
+            outcome = data.get(f"m{index}")
+            failed = set()
+            for error in (outcome or {}).get('userErrors') or []:
+                field = error.get('field') or []
+                # ["variants", "3", "price"] points at one variant; anything else fails the product
+                if len(field) >= 2 and field[0] == 'variants' and str(field[1]).isdigit():
+                    failed.add(int(field[1]))
+                else:
+                    failed.update(range(len(variants)))
+            for position, update in enumerate(variants):
+                results[(update['product_id'], update['variant_id'])] = outcome is not None and position not in failed
+        return results
+
+    @staticmethod
+    def _throttle_wait(body):
+        """Seconds until the query cost bucket holds enough points for this request again."""
+        cost = (body.get('extensions') or {}).get('cost') or {}
+        status = cost.get('throttleStatus') or {}
+        try:
+            missing = float(cost['requestedQueryCost']) - float(status['currentlyAvailable'])
+            return max(missing, 0) / float(status['restoreRate'])
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            return None
+
+
+class NetSuiteBulkClient:
+    """One call of the bulk price RESTlet per chunk, with token-based authentication."""
+
+    def __init__(self, restlet_url, account_id, consumer_key, consumer_secret, token_id, token_secret):
+        self.url = restlet_url
+        self.realm = account_id.upper().replace('-', '_')
+        self.credentials = (consumer_key, consumer_secret, token_id, token_secret)
+
+    def __call__(self, updates):
+        authorization = oauth1_header('POST', self.url, *self.credentials, realm=self.realm)
+        _, body = send_json('POST', self.url, {"updates": updates}, {'Authorization': authorization})
+        return {
+            (str(result.get('product_id')), str(result.get('variant_id'))): bool(result.get('success'))
+            for result in body.get('results') or []
+        }
+
+
+class ZoeyBulkClient:
+    """One multi-update of the products collection per chunk; variants are products of their own in Zoey."""
+
+    def __init__(self, api_url, consumer_key, consumer_secret, token, token_secret):
+        self.url = f"{api_url.rstrip('/')}/api/rest/products"
+        self.credentials = (consumer_key, consumer_secret, token, token_secret)
+
+    def __call__(self, updates):
+        authorization = oauth1_header('PUT', self.url, *self.credentials, signature_method='HMAC-SHA1')
+        payload = [{"entity_id": update['variant_id'], "price": str(update['price'])} for update in updates]
+        _, body = send_json('PUT', self.url, payload, {'Authorization': authorization})
+
+        messages = body.get('messages') or {}
+        succeeded = {str(message.get('product_id')) for message in messages.get('success') or []}
+        # Variant ids are unique across products, so each outcome maps back to one update
+        return {
+            (update['product_id'], update['variant_id']): str(update['variant_id']) in succeeded
+            for update in updates
+        }
+
+
+def _configured(*names):
+    values = [os.getenv(name, '') for name in names]
+    return values if all(values) else None
+
+def bulk_client(platform):
+    """The bulk client of a platform when its credentials are configured, else None."""
+    if platform == 'shopify':
+        config = _configured('SHOPIFY_SHOP_DOMAIN', 'SHOPIFY_ACCESS_TOKEN')
+        return ShopifyBulkClient(*config) if config else None
+    if platform == 'netsuite':
+        config = _configured('NETSUITE_RESTLET_URL', 'NETSUITE_ACCOUNT_ID', 'NETSUITE_CONSUMER_KEY',
+                             'NETSUITE_CONSUMER_SECRET', 'NETSUITE_TOKEN_ID', 'NETSUITE_TOKEN_SECRET')
+        return NetSuiteBulkClient(*config) if config else None
+    if platform == 'zoey':
+        config = _configured('ZOEY_API_URL', 'ZOEY_CONSUMER_KEY', 'ZOEY_CONSUMER_SECRET', 'ZOEY_TOKEN', 'ZOEY_TOKEN_SECRET')
+        return ZoeyBulkClient(*config) if config else None
+    return None
@@ -0,0 +1,191 @@
+"""
+Concurrent price pushes to the commerce platforms.
+
+Items are grouped by platform, chunked to the platform adapter's bulk batch size and
+pushed on a dedicated thread pool per platform, each with its own concurrency bound and
+request-rate limit. The pools live at module level, so their worker threads (and any
+keep-alive connections the integration clients hold per thread) are reused across warm
+invocations. Failed items are retried with exponential backoff and jitter; exceptions
+carrying a `retry_after` attribute (e.g. HTTP 429 responses) pause the platform's rate
+limiter, up to MAX_BACKOFF_SECONDS, so every thread pushing to that platform backs off.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from lambda_functions.instrumentation import span
+
+# Maximum number of in-flight requests per platform
+PLATFORM_CONCURRENCY = {
+    'shopify': int(os.getenv('SHOPIFY_CONCURRENCY', '4')),
+    'netsuite': int(os.getenv('NETSUITE_CONCURRENCY', '2')),
+    'zoey': int(os.getenv('ZOEY_CONCURRENCY', '4')),
+}
+
+# Sustained requests per second allowed per platform
+PLATFORM_RATE_LIMIT = {
+    'shopify': float(os.getenv('SHOPIFY_RATE_LIMIT', '2')),
+    'netsuite': float(os.getenv('NETSUITE_RATE_LIMIT', '5')),
+    'zoey': float(os.getenv('ZOEY_RATE_LIMIT', '5')),
+}
+
+MAX_PUSH_ATTEMPTS = int(os.getenv('MAX_PUSH_ATTEMPTS', '3'))
+BASE_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Admit nobody for `seconds`, then resume at the sustained rate without a burst."""
+        with self.lock:
+            until = time.monotonic() + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.tokens = 0
+                self.updated = until
+
+
+_executors = {}
+_limiters = {}
+_pool_lock = threading.Lock()
+
+def _platform_pool(platform):
+    """Return the long-lived executor and rate limiter for a platform, creating them on first use."""
+    with _pool_lock:
+        if platform not in _executors:
+            _executors[platform] = ThreadPoolExecutor(
+                max_workers=PLATFORM_CONCURRENCY.get(platform, 2),
+                thread_name_prefix=f"push-{platform}"
+            )
+            _limiters[platform] = RateLimiter(PLATFORM_RATE_LIMIT.get(platform, 5))
+        return _executors[platform], _limiters[platform]
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Exponential backoff with full jitter, or the server-provided Retry-After when present.
+    Either way the delay is capped at MAX_BACKOFF_SECONDS, so a long Retry-After cannot
+    stall a push thread (and the apply run) past its deadline.
+    """
+    if retry_after is not None:
+        try:
+            return min(max(float(retry_after), 0), MAX_BACKOFF_SECONDS)
+        except (TypeError, ValueError):
+            pass  # e.g. an HTTP-date Retry-After; fall back to jittered backoff
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** attempt)))
+
+def push_with_retry(adapter, limiter, items, max_attempts=MAX_PUSH_ATTEMPTS):
+    """
+    Push one platform request worth of items through an adapter, retrying only the items
+    that failed, with backoff. Returns a dict of (ProductID, VariantID) -> (success, error).
+    """
+    pending = list(items)
+    outcomes = {}
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        retry_after = None
+        try:
+            with span(f"platform.{adapter.name}"):
+                if len(pending) == 1:
+                    item = pending[0]
+                    results = {(item['ProductID'], item['VariantID']): adapter.update(item['ProductID'], item['VariantID'], item['ProposedPrice'])}
+                else:
+                    results = adapter.bulk_update(pending)
+            error = "Platform rejected the update"
+        except Exception as e:
+            results = {}
+            error = str(e)
+            retry_after = getattr(e, 'retry_after', None)
+
+        failed = []
+        for item in pending:
+            key = (item['ProductID'], item['VariantID'])
+            if results.get(key):
+                outcomes[key] = (True, None)
+            else:
+                outcomes[key] = (False, error)
+                failed.append(item)
+
+        pending = failed
+        if not pending:
+            break
+        if attempt + 1 < max_attempts:
+            delay = backoff_delay(attempt, retry_after)
+            if retry_after is not None:
+                # The platform is throttling: hold back every thread pushing to it, not just this one
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+    return outcomes
+
+def push_prices(items, get_adapter):
+    """
+    Push approved items concurrently, grouped by their Platform attribute and chunked to
+    each platform's bulk batch size. get_adapter maps a platform name to a PlatformAdapter
+    (or None for unknown platforms). Yields (item, platform, success, error) tuples as
+    requests complete. A platform whose integration module fails to import fails only its
+    own items.
+    """
+    by_platform = {}
+    for item in items:
+        by_platform.setdefault(item.get('Platform', 'shopify'), []).append(item)
+
+    futures = {}
+    for platform, platform_items in by_platform.items():
+        try:
+            adapter = get_adapter(platform)
+        except (ImportError, AttributeError) as e:
+            print(f"Could not load the {platform} integration: {str(e)}")
+            for item in platform_items:
+                yield item, platform, False, f"Could not load the {platform} integration: {str(e)}"
+            continue
+        if adapter is None:
+            for item in platform_items:
+                yield item, platform, False, f"Unknown platform {platform}"
+            continue
+
+        executor, limiter = _platform_pool(platform)
+        batch_size = adapter.batch_size
+        for start in range(0, len(platform_items), batch_size):
+            chunk = platform_items[start:start + batch_size]
+            futures[executor.submit(push_with_retry, adapter, limiter, chunk)] = (platform, chunk)
+
+    for future in as_completed(futures):
+        platform, chunk = futures[future]
+        try:
+            outcomes = future.result()
+            missing = (False, "No result returned for item")
+        except Exception as e:
+            outcomes = {}
+            missing = (False, str(e))
+        for item in chunk:
+            success, error = outcomes.get((item['ProductID'], item['VariantID']), missing)
+            yield item, platform, success, error
@@ -0,0 +1,136 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from lambda_functions.aws_clients import deserialize_item, lazy_client, serialize_item
+from lambda_functions.dynamodb_utils import batch_write_items, query_items
+from lambda_functions.instrumentation import instrumented
+from lambda_functions.stores import store_id_from
+
+# Low-level client created on first use; both handlers here are short and latency-bound
+history_table_name = os.getenv('PRICE_HISTORY_TABLE', 'PriceHistory')
+dynamodb_client = lazy_client('dynamodb')
+
+# History rows expire after this many days (0 keeps them forever)
+HISTORY_RETENTION_DAYS = int(os.getenv('PRICE_HISTORY_RETENTION_DAYS', '730'))
+DEFAULT_HISTORY_DAYS = 90
+
+# Compact event codes stored in the "e" attribute
+EVENT_CODES = {'Pending': 'P', 'Approved': 'A', 'Rejected': 'R', 'Completed': 'C'}
+EVENT_NAMES = {code: status for status, code in EVENT_CODES.items()}
+
+# Compact attribute names -> readable names used in API responses
+ATTRIBUTES = {'cp': 'current_price', 'kp': 'competitor_price', 'pp': 'proposed_price', 'by': 'reviewed_by'}
+
+def sku_key(store_id, product_id, variant_id):
+    """Partition key of a SKU's history in a store: all of its events are one query away."""
+    return f"{store_id}#{product_id}#{variant_id}"
+
+def history_entry(record):
+    """
+    Compact history row for a PricingProposals stream record, or None when nothing that
+    belongs in the price history changed (e.g. apply bookkeeping attributes).
+    """
+    if record['eventName'] not in ('INSERT', 'MODIFY'):
+        return None
+
+    new_image = record['dynamodb']['NewImage']
+    old_image = record['dynamodb'].get('OldImage', {})
+    tracked = ('CurrentPrice', 'CompetitorPrice', 'ProposedPrice', 'ApprovalStatus')
+    if old_image and all(old_image.get(attribute) == new_image.get(attribute) for attribute in tracked):
+        return None
+
+    created = datetime.fromtimestamp(int(record['dynamodb']['ApproximateCreationDateTime']), timezone.utc)
+    entry = {
+        'SKU': sku_key(new_image['StoreID']['S'], new_image['ProductID']['S'], new_image['VariantID']['S']),
+        # The sequence number keeps events within the same second distinct and ordered
+        'At': f"{created:%Y-%m-%dT%H:%M:%SZ}#{record['dynamodb']['SequenceNumber']}",
+        'e': EVENT_CODES.get(new_image.get('ApprovalStatus', {}).get('S'), '?'),
+    }
+    for short, attribute in (('cp', 'CurrentPrice'), ('kp', 'CompetitorPrice'), ('pp', 'ProposedPrice')):
+        if 'N' in new_image.get(attribute, {}):
+            entry[short] = Decimal(new_image[attribute]['N'])
+    if entry['e'] in ('A', 'R') and new_image.get('ReviewedBy', {}).get('S'):
+        entry['by'] = new_image['ReviewedBy']['S']
+    if HISTORY_RETENTION_DAYS:
+        entry['ttl'] = int((created + timedelta(days=HISTORY_RETENTION_DAYS)).timestamp())
+    return entry
+
+def get_price_history(store_id, product_id, variant_id, days=DEFAULT_HISTORY_DAYS):
+    """Price trajectory of one SKU of a store over the last `days` days, oldest first, with a single query."""
+    since = f"{datetime.now(timezone.utc) - timedelta(days=days):%Y-%m-%dT%H:%M:%SZ}"
+    events = []
+    for image in query_items(
+        dynamodb_client,
+        TableName=history_table_name,
+        KeyConditionExpression="SKU = :sku AND #at >= :since",
+        ExpressionAttributeNames={'#at': 'At'},
+        ExpressionAttributeValues=serialize_item({':sku': sku_key(store_id, product_id, variant_id), ':since': since})
+    ):
+        item = deserialize_item(image)
+        event = {'at': item['At'].split('#', 1)[0], 'status': EVENT_NAMES.get(item['e'], item['e'])}
+        for short, name in ATTRIBUTES.items():
+            if short in item:
+                event[name] = float(item[short]) if isinstance(item[short], Decimal) else item[short]
+        events.append(event)
+    return events
+
+@instrumented
+def record_history(event, context):
+    """
+    Lambda function that appends PricingProposals changes to the PriceHistory table.
+    Triggered by the PricingProposals DynamoDB stream.
+    """
+    entries = [entry for entry in (history_entry(record) for record in event.get('Records', [])) if entry]
+    # Every entry has its own (SKU, At) key, so no batch repeats a key
+    batch_write_items(dynamodb_client, history_table_name, [serialize_item(entry) for entry in entries])
+
+    print(f"Recorded {len(entries)} price history events.")
+    return {"statusCode": 200, "body": json.dumps(f"Recorded {len(entries)} price history events.")}
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Lambda function to get the price history of a product variant.
+    Expects product_id and variant_id path parameters and optional "store_id" (default
+    DEFAULT_STORE_ID) and "days" (default 90) query string parameters.
+    """
+    try:
+        path_parameters = event.get('pathParameters') or {}
+        product_id = path_parameters.get('product_id')
+        variant_id = path_parameters.get('variant_id')
+
+        # Validate required fields
+        if not product_id or not variant_id:
+            return {
+                "statusCode": 400,
+                "body": json.dumps("Missing required fields: 'product_id' and 'variant_id'.")
+            }
+
+        params = event.get('queryStringParameters') or {}
+        try:
+            store_id = store_id_from(params)
+            days = int(params.get('days', DEFAULT_HISTORY_DAYS))
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(f"Invalid query parameters: {str(e)}")
+            }
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "store_id": store_id,
+                "product_id": product_id,
+                "variant_id": variant_id,
+                "days": days,
+                "events": get_price_history(store_id, product_id, variant_id, days)
+            })
+        }
+
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps(f"Error retrieving price history: {str(e)}")
+        }
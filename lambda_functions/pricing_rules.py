@@ -0,0 +1,221 @@
+"""
+Columnar pricing-rule engine.
+
+A feed is evaluated as NumPy arrays (one entry per SKU) instead of row by row, so a
+whole price sheet is computed with a handful of vectorized operations. The engine has
+no AWS dependencies and can be used outside Lambda:
+
+    engine = PricingEngine.from_config([
+        {"rule": "match_competitor"},
+        {"rule": "round_ending", "ending": 0.99},
+    ])
+    proposed = engine.evaluate(current_price=[...], competitor_price=[...], minimum_price=[...])
+
+Whatever the configured rules do, evaluate clamps the result to the minimum price last, so no
+configuration can propose a price below MinimumPrice.
+
+Rule options are validated when a rule is built, so a bad configuration fails in from_config
+with a ValueError instead of in the middle of evaluating a feed.
+"""
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Columns evaluate always provides; rules may also use extra columns passed to evaluate
+FEED_COLUMNS = ('current_price', 'competitor_price', 'minimum_price')
+
+
+def number_option(name, value, minimum=None, below=None):
+    """
+    Convert a numeric rule option to float, or raise ValueError. minimum is inclusive and
+    below exclusive; None means unbounded.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite, got {value!r}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value!r}")
+    if below is not None and number >= below:
+        raise ValueError(f"{name} must be below {below}, got {value!r}")
+    return number
+
+def column_option(name, value):
+    """Validate a column-name rule option (None or a non-empty string)."""
+    if value is not None and (not isinstance(value, str) or not value):
+        raise ValueError(f"{name} must be a column name, got {value!r}")
+    return value
+
+
+class PricingRule(ABC):
+    """Base class for pricing rules. Each rule maps the proposed-price column to a new one."""
+
+    name = None
+
+    @abstractmethod
+    def apply(self, proposed, feed):
+        """Return the new proposed-price column for the feed's columns."""
+
+
+class MatchCompetitor(PricingRule):
+    """
+    Match the competitor when it is cheaper than the current price, but never go below the
+    minimum price. This is the rule generate_price_sheet has always applied.
+    """
+
+    name = 'match_competitor'
+
+    def apply(self, proposed, feed):
+        competitor = feed['competitor_price']
+        eligible = (competitor < feed['current_price']) & (competitor >= feed['minimum_price'])
+        return np.where(eligible, competitor, proposed)
+
+
+class UndercutByPercent(PricingRule):
+    """Price a percentage below the competitor wherever the competitor is cheaper than the current price."""
+
+    name = 'undercut'
+
+    def __init__(self, percent):
+        self.percent = number_option('percent', percent, minimum=0, below=100)
+
+    def apply(self, proposed, feed):
+        competitor = feed['competitor_price']
+        target = competitor * (1 - self.percent / 100)
+        return np.where(competitor < feed['current_price'], target, proposed)
+
+
+class PriceBounds(PricingRule):
+    """Clamp prices between a floor and a ceiling, each given as a constant or a feed column."""
+
+    name = 'bounds'
+
+    def __init__(self, floor=None, ceiling=None, floor_column=None, ceiling_column=None):
+        self.floor = None if floor is None else number_option('floor', floor, minimum=0)
+        self.ceiling = None if ceiling is None else number_option('ceiling', ceiling, minimum=0)
+        if self.floor is not None and self.ceiling is not None and self.floor > self.ceiling:
+            raise ValueError(f"floor {floor!r} is above ceiling {ceiling!r}")
+        self.floor_column = column_option('floor_column', floor_column)
+        self.ceiling_column = column_option('ceiling_column', ceiling_column)
+
+    @property
+    def columns(self):
+        return [column for column in (self.floor_column, self.ceiling_column) if column]
+
+    def apply(self, proposed, feed):
+        if self.floor_column:
+            proposed = np.maximum(proposed, feed[self.floor_column])
+        if self.floor is not None:
+            proposed = np.maximum(proposed, self.floor)
+        if self.ceiling_column:
+            proposed = np.minimum(proposed, feed[self.ceiling_column])
+        if self.ceiling is not None:
+            proposed = np.minimum(proposed, self.ceiling)
+        return proposed
+
+
+class RoundToEnding(PricingRule):
+    """Round prices down to the nearest charm ending, e.g. 10.50 -> 9.99 and 10.99 -> 10.99."""
+
+    name = 'round_ending'
+
+    def __init__(self, ending=0.99):
+        self.ending = number_option('ending', ending, minimum=0, below=1)
+
+    def apply(self, proposed, feed):
+        # Prices below the ending have no lower charm price and are left as they are. The small
+        # epsilon keeps prices that already end in the ending from dropping a whole unit
+        rounded = np.floor(np.maximum(proposed - self.ending, 0) + 1e-9) + self.ending
+        return np.where(proposed >= self.ending, rounded, proposed)
+
+
+class MaxDailyDelta(PricingRule):
+    """Limit how far a price may move from the current price in one run, as a percentage and/or an amount."""
+
+    name = 'max_delta'
+
+    def __init__(self, max_percent=None, max_amount=None):
+        self.max_percent = None if max_percent is None else number_option('max_percent', max_percent, minimum=0)
+        self.max_amount = None if max_amount is None else number_option('max_amount', max_amount, minimum=0)
+
+    def apply(self, proposed, feed):
+        current = feed['current_price']
+        allowed = np.full_like(current, np.inf)
+        if self.max_percent is not None:
+            allowed = np.minimum(allowed, current * self.max_percent / 100)
+        if self.max_amount is not None:
+            allowed = np.minimum(allowed, self.max_amount)
+        return np.clip(proposed, current - allowed, current + allowed)
+
+
+RULES = {
+    rule.name: rule
+    for rule in (MatchCompetitor, UndercutByPercent, PriceBounds, RoundToEnding, MaxDailyDelta)
+}
+
+
+# Applied after every configured rule
+MINIMUM_PRICE_FLOOR = PriceBounds(floor_column='minimum_price')
+
+
+class PricingEngine:
+    """Apply an ordered list of pricing rules to a columnar feed, then floor at the minimum price."""
+
+    def __init__(self, rules=None):
+        self.rules = list(rules) if rules is not None else [MatchCompetitor()]
+
+    @classmethod
+    def from_config(cls, config, extra_columns=()):
+        """
+        Build an engine from a list of rule specs such as {"rule": "undercut", "percent": 2}.
+        An empty or missing config yields the default match-competitor engine. Rules may only
+        refer to FEED_COLUMNS and the given extra_columns. Raises ValueError for a bad config.
+        """
+        if not config:
+            return cls()
+        if not isinstance(config, list):
+            raise ValueError("rules must be a list of rule specs")
+
+        known_columns = set(FEED_COLUMNS) | set(extra_columns)
+        rules = []
+        for spec in config:
+            if not isinstance(spec, dict):
+                raise ValueError(f"Each rule spec must be an object, got {spec!r}")
+            options = dict(spec)
+            rule_name = options.pop('rule', None)
+            if rule_name not in RULES:
+                raise ValueError(f"Unknown pricing rule: {rule_name}. Allowed values are {sorted(RULES)}.")
+            try:
+                rule = RULES[rule_name](**options)
+            except TypeError:
+                raise ValueError(f"Unsupported options for {rule_name}: {sorted(options)}") from None
+            unknown = [column for column in getattr(rule, 'columns', []) if column not in known_columns]
+            if unknown:
+                raise ValueError(f"Unknown column for {rule_name}: {unknown[0]}. Known columns are {sorted(known_columns)}.")
+            rules.append(rule)
+        return cls(rules)
+
+    def evaluate(self, current_price, competitor_price, minimum_price, **extra_columns):
+        """
+        Compute proposed prices for a whole feed. Every argument is an array-like with one
+        entry per SKU; extra columns are made available to rules by name. Returns a float64
+        array of proposed prices rounded to cents, never below minimum_price.
+        """
+        feed = {
+            'current_price': np.asarray(current_price, dtype=np.float64),
+            'competitor_price': np.asarray(competitor_price, dtype=np.float64),
+            'minimum_price': np.asarray(minimum_price, dtype=np.float64),
+        }
+        for column, values in extra_columns.items():
+            feed[column] = np.asarray(values, dtype=np.float64)
+
+        proposed = feed['current_price'].copy()
+        for rule in self.rules:
+            proposed = rule.apply(proposed, feed)
+        return np.round(MINIMUM_PRICE_FLOOR.apply(proposed, feed), 2)
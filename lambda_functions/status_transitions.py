@@ -0,0 +1,128 @@
+"""
+Proposal status transitions with optimistic concurrency.
+
+Every ApprovalStatus change goes through this module, which only allows
+
+    Pending -> Approved -> Completed
+    Pending -> Rejected
+
+Each transition is a single conditional update_item. The condition checks that the row is still in
+a state the transition may start from and, when the caller read the row earlier, that its
+Version is unchanged. Version is incremented on every transition (and bumped by
+generate_price_sheet when it rewrites a proposal). A reviewer clicking at the same moment as
+the apply job therefore loses on the server with a ConditionalCheckFailed. Nothing is
+resolved by read-modify-write round trips, and a Completed row can never be flipped back
+to Approved and pushed again.
+
+Rows keep the status index keys (StoreStatus, StatusUpdatedAt) only while their status is in the
+index (Pending and Approved).
+"""
+
+from lambda_functions.aws_clients import deserialize_item
+from lambda_functions.dynamodb_utils import INDEXED_STATUSES, status_timestamp
+from lambda_functions.stores import split_store_product_id, store_status
+
+# Target status -> statuses it may be reached from
+ALLOWED_TRANSITIONS = {
+    'Approved': ('Pending',),
+    'Rejected': ('Pending',),
+    'Completed': ('Approved',),
+}
+
+
+class InvalidTransition(ValueError):
+    """The requested target status is not part of the state machine."""
+
+
+class TransitionConflict(Exception):
+    """The row was not in an allowed source state, or its Version changed since it was read."""
+
+    def __init__(self, key, new_status, current=None):
+        self.key = key
+        self.new_status = new_status
+        self.current = current or {}
+        current_status = self.current.get('ApprovalStatus', 'missing')
+        store_id, product_id = split_store_product_id(key.get('StoreProductID', ''))
+        super().__init__(
+            f"Cannot move Product {product_id} (Variant {key.get('VariantID')}) in store {store_id} "
+            f"to {new_status}: it is {current_status}."
+        )
+
+
+def transition_update(key, new_status, expected_version=None, set_attributes=None, remove_attributes=()):
+    """
+    Build the update_item arguments (Key, UpdateExpression, ConditionExpression and expression
+    names/values) for one transition. The result can be passed to Table.update_item, or used
+    inside a TransactWriteItems Update once TableName is added.
+
+    expected_version is the Version the caller read. None skips the version check. 0 means the row
+    was read before it had a Version.
+    """
+    sources = ALLOWED_TRANSITIONS.get(new_status)
+    if sources is None:
+        raise InvalidTransition(f"Unknown target status: {new_status}.")
+
+    names = {'#status': 'ApprovalStatus', '#version': 'Version'}
+    values = {':new_status': new_status, ':one': 1}
+    assignments = ["#status = :new_status"]
+    removals = list(remove_attributes)
+
+    for index, (attribute, value) in enumerate((set_attributes or {}).items()):
+        names[f'#set{index}'] = attribute
+        values[f':set{index}'] = value
+        assignments.append(f"#set{index} = :set{index}")
+
+    # Only statuses listed in the status index carry its keys
+    if new_status in INDEXED_STATUSES:
+        store_id, _ = split_store_product_id(key['StoreProductID'])
+        values[':store_status'] = store_status(store_id, new_status)
+        values[':updated_at'] = status_timestamp()
+        assignments += ["StoreStatus = :store_status", "StatusUpdatedAt = :updated_at"]
+    else:
+        removals += ["StoreStatus", "StatusUpdatedAt"]
+
+    source_placeholders = []
+    for index, source in enumerate(sources):
+        values[f':from{index}'] = source
+        source_placeholders.append(f':from{index}')
+    condition = f"#status IN ({', '.join(source_placeholders)})"
+
+    if expected_version is not None:
+        if int(expected_version) == 0:
+            condition += " AND attribute_not_exists(#version)"
+        else:
+            values[':expected_version'] = int(expected_version)
+            condition += " AND #version = :expected_version"
+
+    update_expression = f"SET {', '.join(assignments)}"
+    if removals:
+        update_expression += f" REMOVE {', '.join(removals)}"
+    update_expression += " ADD #version :one"
+
+    return {
+        'Key': key,
+        'UpdateExpression': update_expression,
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+    }
+
+
+def transition(table, key, new_status, expected_version=None, set_attributes=None, remove_attributes=(),
+               return_values='UPDATED_NEW'):
+    """
+    Apply one transition to a row of the PricingProposals table.
+    Returns the update_item response. Raises TransitionConflict when the condition fails; the
+    row's current attributes come back with the failure, so no extra read is needed.
+    """
+    update = transition_update(key, new_status, expected_version, set_attributes, remove_attributes)
+    try:
+        return table.update_item(
+            ReturnValues=return_values,
+            ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            **update
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException as e:
+        # Errors are not converted by the resource, so the returned row is still in attribute-value form
+        current = e.response.get('Item')
+        raise TransitionConflict(key, new_status, deserialize_item(current) if current else None) from None
@@ -0,0 +1,56 @@
+"""
+Store (storefront / sales channel) partitioning of the pricing tables.
+
+Every proposal and minimum price belongs to one store, and the store is part of every key:
+
+* PricingProposals is keyed on StoreProductID ("<StoreID>#<ProductID>") + VariantID, and also
+  carries StoreID and ProductID as plain attributes. The hash key stays high-cardinality, so
+  one store's batch writes are spread over many partitions instead of a single hot one;
+* the status index is keyed on StoreStatus ("<StoreID>#<ApprovalStatus>") + StatusUpdatedAt,
+  so listing, exporting or applying one store's Pending/Approved rows reads only that store's
+  index partition;
+* MinimumPrices is keyed on StoreID + ProductID.
+
+Requests name their store with a "store_id" parameter (body, query string or event). Requests
+without one use DEFAULT_STORE_ID, so single-store clients keep working unchanged.
+"""
+
+import os
+import re
+
+DEFAULT_STORE_ID = os.getenv('DEFAULT_STORE_ID', 'default')
+# Stores served by scheduled jobs (apply runs, crawls); each gets its own invocation
+STORE_IDS = [store_id.strip() for store_id in os.getenv('STORE_IDS', DEFAULT_STORE_ID).split(',') if store_id.strip()]
+
+SEPARATOR = '#'
+STORE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def validate_store_id(store_id):
+    """Return store_id as a string, or raise ValueError when it cannot be used in a key."""
+    store_id = str(store_id)
+    if not STORE_ID_PATTERN.match(store_id):
+        raise ValueError(f"Invalid store_id: {store_id!r}. Use 1-64 letters, digits, '_', '-' or '.'.")
+    return store_id
+
+def store_id_from(params):
+    """The validated store_id of a request body, query string or event, or DEFAULT_STORE_ID."""
+    store_id = (params or {}).get('store_id')
+    return validate_store_id(store_id) if store_id not in (None, '') else DEFAULT_STORE_ID
+
+def store_product_id(store_id, product_id):
+    """PricingProposals hash key of a product in a store."""
+    return f"{store_id}{SEPARATOR}{product_id}"
+
+def split_store_product_id(value):
+    """(StoreID, ProductID) of a StoreProductID."""
+    store_id, _, product_id = value.partition(SEPARATOR)
+    return store_id, product_id
+
+def proposal_key(store_id, product_id, variant_id):
+    """PricingProposals primary key of one variant."""
+    return {'StoreProductID': store_product_id(store_id, product_id), 'VariantID': str(variant_id)}
+
+def store_status(store_id, status):
+    """Status index hash key of a store's rows with the given ApprovalStatus."""
+    return f"{store_id}{SEPARATOR}{status}"
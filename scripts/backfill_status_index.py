@@ -0,0 +1,77 @@
+"""
+Backfill StoreStatus, StatusUpdatedAt and PriceDrop so existing PricingProposals rows appear in
+the StoreStatusIndex and StoreDropIndex GSIs.
+
+Rows written without the index keys are missing from the sparse indexes, which only contain rows
+that carry them. This stamps every Pending or Approved row that is missing any of them with
+its "<StoreID>#<ApprovalStatus>", the current time and CurrentPrice - ProposedPrice; Completed
+and Rejected rows are left out of the indexes. The update is conditional, so rows touched by a handler in the meantime keep their
+own values.
+
+Usage:
+    python scripts/backfill_status_index.py [--table PricingProposals] [--segments 8] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.dynamodb_utils import INDEXED_STATUSES, price_drop_value, scan_items, status_timestamp
+from lambda_functions.stores import store_status
+
+MISSING_INDEX_KEYS = "attribute_not_exists(StoreStatus) OR attribute_not_exists(StatusUpdatedAt) OR attribute_not_exists(PriceDrop)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.getenv('DYNAMODB_TABLE', 'PricingProposals'))
+    parser.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be updated")
+    args = parser.parse_args()
+
+    table = boto3.resource('dynamodb').Table(args.table)
+    client = table.meta.client
+
+    status_values = {f":status{i}": status for i, status in enumerate(INDEXED_STATUSES)}
+    missing = scan_items(
+        table,
+        total_segments=args.segments,
+        ProjectionExpression="StoreProductID, VariantID, StoreID, ApprovalStatus, CurrentPrice, ProposedPrice",
+        FilterExpression=f"ApprovalStatus IN ({', '.join(status_values)}) "
+                         f"AND ({MISSING_INDEX_KEYS})",
+        ExpressionAttributeValues=status_values
+    )
+
+    updated = skipped = 0
+    for item in missing:
+        if args.dry_run:
+            updated += 1
+            continue
+        try:
+            client.update_item(
+                TableName=args.table,
+                Key={'StoreProductID': item['StoreProductID'], 'VariantID': item['VariantID']},
+                UpdateExpression="SET StoreStatus = :store_status, StatusUpdatedAt = if_not_exists(StatusUpdatedAt, :updated_at), "
+                                 "PriceDrop = if_not_exists(PriceDrop, :price_drop)",
+                ConditionExpression=f"ApprovalStatus = :status AND ({MISSING_INDEX_KEYS})",
+                ExpressionAttributeValues={
+                    ':store_status': store_status(item['StoreID'], item['ApprovalStatus']),
+                    ':status': item['ApprovalStatus'],
+                    ':updated_at': status_timestamp(),
+                    ':price_drop': price_drop_value(item.get('CurrentPrice', 0), item.get('ProposedPrice', 0))
+                }
+            )
+            updated += 1
+        except client.exceptions.ConditionalCheckFailedException:
+            skipped += 1
+
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"{action} {updated} rows; {skipped} rows changed concurrently and were skipped.")
+
+
+if __name__ == '__main__':
+    main()
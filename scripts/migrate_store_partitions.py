@@ -0,0 +1,119 @@
+"""
+Copy PricingProposals and MinimumPrices into the store-partitioned tables and move the
+PriceHistory SKUs into their stores.
+
+The store-keyed tables (StorePricingProposals keyed on StoreProductID + VariantID, with the
+StoreStatusIndex GSI, and StoreMinimumPrices keyed on StoreID + ProductID) replace the old
+ones, whose key schemas cannot be changed in place. The deploy keeps the old tables
+(DeletionPolicy: Retain). This script copies every row into its store:
+
+* --store-id puts every row in one store (DEFAULT_STORE_ID when omitted);
+* --store-attribute takes the store from an existing attribute of each proposal (for example
+  Platform), falling back to --store-id for rows without it. A product's minimum price is
+  then copied to every store its proposals were assigned to.
+
+Pending and Approved rows get their StoreStatus status index key and their PriceDrop. Copied proposals carry
+Migrated = true: the stream consumers drop INSERTs with that marker, so the copy sends no
+notification emails and records no price history events. The old history is moved instead:
+every PriceHistory row keyed on "ProductID#VariantID" is rewritten to "<StoreID>#ProductID#VariantID"
+for each store of the product, and the old row is deleted. The dashboard summary does not see
+the copied rows either, so run scripts/rebuild_dashboard_summary.py afterwards (the daily
+rebuild would also pick them up).
+
+Rows are written with overwrites, so the script can be re-run. Pause generate_price_sheet,
+reviews and apply runs while it runs, then remove the old tables.
+
+Usage:
+    python scripts/migrate_store_partitions.py [--store-id default | --store-attribute Platform]
+        [--source-table PricingProposals] [--target-table StorePricingProposals]
+        [--source-min-price-table MinimumPrices] [--target-min-price-table StoreMinimumPrices]
+        [--history-table PriceHistory] [--segments 8] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.dynamodb_utils import INDEXED_STATUSES, price_drop_value, scan_items, status_timestamp
+from lambda_functions.price_history import sku_key
+from lambda_functions.stores import DEFAULT_STORE_ID, SEPARATOR, store_product_id, store_status, validate_store_id
+
+# Marks copied rows, whose stream INSERTs the consumers filter out (see serverless.yml)
+MIGRATED_ATTRIBUTE = 'Migrated'
+
+
+def store_row(item, store_id):
+    """The store-keyed copy of a PricingProposals row."""
+    row = dict(item, StoreProductID=store_product_id(store_id, item['ProductID']), StoreID=store_id)
+    row[MIGRATED_ATTRIBUTE] = True
+    if row.get('ApprovalStatus') in INDEXED_STATUSES:
+        row['StoreStatus'] = store_status(store_id, row['ApprovalStatus'])
+        row.setdefault('StatusUpdatedAt', status_timestamp())
+        row.setdefault('PriceDrop', price_drop_value(row.get('CurrentPrice', 0), row.get('ProposedPrice', 0)))
+    else:
+        row.pop('StoreStatus', None)
+        row.pop('StatusUpdatedAt', None)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store-id', default=DEFAULT_STORE_ID, help="Store of rows without --store-attribute")
+    parser.add_argument('--store-attribute', help="Proposal attribute holding each row's store")
+    parser.add_argument('--source-table', default='PricingProposals')
+    parser.add_argument('--target-table', default=os.getenv('DYNAMODB_TABLE', 'StorePricingProposals'))
+    parser.add_argument('--source-min-price-table', default='MinimumPrices')
+    parser.add_argument('--target-min-price-table', default=os.getenv('MIN_PRICE_TABLE', 'StoreMinimumPrices'))
+    parser.add_argument('--history-table', default=os.getenv('PRICE_HISTORY_TABLE', 'PriceHistory'))
+    parser.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be copied")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb')
+    default_store = validate_store_id(args.store_id)
+
+    # ProductID -> stores its proposals were copied to
+    product_stores = {}
+    proposals = 0
+    with dynamodb.Table(args.target_table).batch_writer(overwrite_by_pkeys=['StoreProductID', 'VariantID']) as batch:
+        for item in scan_items(dynamodb.Table(args.source_table), total_segments=args.segments):
+            store_id = validate_store_id(item[args.store_attribute]) if item.get(args.store_attribute) else default_store
+            product_stores.setdefault(item['ProductID'], set()).add(store_id)
+            if not args.dry_run:
+                batch.put_item(Item=store_row(item, store_id))
+            proposals += 1
+
+    minimum_prices = 0
+    with dynamodb.Table(args.target_min_price_table).batch_writer(overwrite_by_pkeys=['StoreID', 'ProductID']) as batch:
+        for item in scan_items(dynamodb.Table(args.source_min_price_table), total_segments=args.segments):
+            for store_id in sorted(product_stores.get(item['ProductID'], {default_store})):
+                if not args.dry_run:
+                    batch.put_item(Item=dict(item, StoreID=store_id))
+                minimum_prices += 1
+
+    # History rows keep their At and event attributes; only the SKU gains the store
+    history_rows = 0
+    history_table = dynamodb.Table(args.history_table)
+    with history_table.batch_writer(overwrite_by_pkeys=['SKU', 'At']) as batch:
+        for item in scan_items(history_table, total_segments=args.segments):
+            if item['SKU'].count(SEPARATOR) != 1:
+                continue
+            product_id, _, variant_id = item['SKU'].partition(SEPARATOR)
+            if not args.dry_run:
+                for store_id in sorted(product_stores.get(product_id, {default_store})):
+                    batch.put_item(Item=dict(item, SKU=sku_key(store_id, product_id, variant_id)))
+                batch.delete_item(Key={'SKU': item['SKU'], 'At': item['At']})
+            history_rows += 1
+
+    action = "Would copy" if args.dry_run else "Copied"
+    stores = sorted(set().union(*product_stores.values())) if product_stores else []
+    print(f"{action} {proposals} proposals and {minimum_prices} minimum prices into stores {stores}.")
+    print(f"{'Would move' if args.dry_run else 'Moved'} {history_rows} price history rows into their stores.")
+
+
+if __name__ == '__main__':
+    main()
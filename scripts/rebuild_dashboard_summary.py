@@ -0,0 +1,33 @@
+"""
+Recompute the dashboard summary (DashboardSummary table) from scratch.
+
+Scans PricingProposals with parallel segments, rewrites every store's overview and
+per-product summary items and deletes items of products and stores that no longer exist. Use it after a bulk load,
+after deploying the summary for the first time, or when the incremental stream updates are
+suspected to have drifted. The same rebuild also runs daily as rebuildDashboardSummary.
+
+Usage:
+    python scripts/rebuild_dashboard_summary.py [--segments 16]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.dashboard_summary import REBUILD_SEGMENTS, rebuild_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segments', type=int, default=REBUILD_SEGMENTS, help="Parallel scan segments")
+    args = parser.parse_args()
+
+    counts = rebuild_summary(total_segments=args.segments)
+    print(f"Rebuilt the dashboard summary: {json.dumps(counts)}")
+
+
+if __name__ == '__main__':
+    main()
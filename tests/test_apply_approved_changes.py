@@ -0,0 +1,277 @@
+"""
+Unit tests for the checkpointing, fan-out accounting and retry bookkeeping of
+lambda_functions/apply_approved_changes.py.
+
+Run with: python -m pytest tests
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import apply_approved_changes
+from lambda_functions.status_transitions import TransitionConflict
+
+
+class ConditionalCheckFailed(Exception):
+    response = {}
+
+
+class FakeTable:
+    """
+    Enough of a boto3 Table for this module: SET and ADD update expressions, and conditions
+    decided by a `condition(item, values)` callable.
+    """
+
+    meta = SimpleNamespace(client=SimpleNamespace(exceptions=SimpleNamespace(ConditionalCheckFailedException=ConditionalCheckFailed)))
+
+    def __init__(self, condition=None):
+        self.items = {}
+        self.updates = []
+        self.condition = condition
+
+    @staticmethod
+    def _key(key):
+        return tuple(sorted(key.items()))
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get(self._key(Key))
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item):
+        self.items[self._key({'RunID': Item['RunID']})] = dict(Item)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+                    ConditionExpression=None, ReturnValues='NONE'):
+        self.updates.append({'Key': Key, 'UpdateExpression': UpdateExpression, 'ConditionExpression': ConditionExpression,
+                             'ExpressionAttributeNames': ExpressionAttributeNames, 'ExpressionAttributeValues': ExpressionAttributeValues})
+        item = self.items.setdefault(self._key(Key), dict(Key))
+        if ConditionExpression and self.condition and not self.condition(item, ExpressionAttributeValues):
+            raise ConditionalCheckFailed()
+
+        names = ExpressionAttributeNames or {}
+        for action, clause in re.findall(r'(SET|ADD) (.*?)(?= SET | ADD |$)', UpdateExpression):
+            for assignment in clause.split(', '):
+                name, value = re.split(r' = | ', assignment, maxsplit=1)
+                name, value = names.get(name, name), ExpressionAttributeValues[value]
+                item[name] = item.get(name, 0) + value if action == 'ADD' else value
+        return {'Attributes': dict(item)} if ReturnValues == 'ALL_NEW' else {}
+
+
+class FakeContext:
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:apply'
+
+    def __init__(self, remaining_ms=900000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def approved(index, **attributes):
+    return dict({'StoreID': 'store-1', 'ProductID': f"P{index}", 'VariantID': f"V{index}", 'ProposedPrice': 9, 'Platform': 'shopify',
+                 'Version': 2}, **attributes)
+
+
+@pytest.fixture
+def apply(monkeypatch):
+    """Fake tables, pushes and re-invocations; returns a namespace to configure and inspect them."""
+    fake = SimpleNamespace(
+        table=FakeTable(),
+        run_table=FakeTable(condition=lambda item, values: item.get('RunStatus') != values[':done']),
+        pages=[],
+        queries=[],
+        invocations=[],
+        pushed=[],
+        failing=set(),
+        completed=[],
+        conflicting=set(),
+    )
+
+    def query_status_page(table, store_id, status, limit, exclusive_start_key=None, **query_kwargs):
+        fake.queries.append({'store_id': store_id, 'exclusive_start_key': exclusive_start_key, **query_kwargs})
+        return fake.pages.pop(0)
+
+    def push_prices(items, get_adapter):
+        fake.pushed.append([item['ProductID'] for item in items])
+        for item in items:
+            failed = item['ProductID'] in fake.failing
+            yield item, item['Platform'], not failed, "HTTP 500" if failed else None
+
+    def mark_completed(item):
+        if item['ProductID'] in fake.conflicting:
+            raise TransitionConflict({'StoreProductID': f"store-1#{item['ProductID']}", 'VariantID': item['VariantID']}, 'Completed')
+        fake.completed.append(item['ProductID'])
+
+    monkeypatch.setattr(apply_approved_changes, 'table', fake.table)
+    monkeypatch.setattr(apply_approved_changes, 'run_table', fake.run_table)
+    monkeypatch.setattr(apply_approved_changes, 'query_status_page', query_status_page)
+    monkeypatch.setattr(apply_approved_changes, 'push_prices', push_prices)
+    monkeypatch.setattr(apply_approved_changes, 'mark_completed', mark_completed)
+    monkeypatch.setattr(apply_approved_changes, 'invoke_async', lambda context, payload: fake.invocations.append(json.loads(json.dumps(payload, default=str))))
+    return fake
+
+
+def run_out_of_time_after_each_batch(monkeypatch, context):
+    push_prices = apply_approved_changes.push_prices
+
+    def push_then_run_out_of_time(batch, get_adapter):
+        yield from push_prices(batch, get_adapter)
+        context.remaining_ms = 0
+
+    monkeypatch.setattr(apply_approved_changes, 'push_prices', push_then_run_out_of_time)
+
+
+def run_state(fake, run_id):
+    return fake.run_table.items[(('RunID', run_id),)]
+
+
+def test_record_failure_only_updates_the_version_that_was_read(apply):
+    assert apply_approved_changes.record_failure(approved(1, ApplyAttempts=2), "HTTP 500")
+    update = apply.table.updates[0]
+    assert update['ConditionExpression'] == "attribute_exists(StoreProductID) AND #version = :version"
+    assert update['ExpressionAttributeValues'][':version'] == 2
+    assert update['ExpressionAttributeValues'][':attempts'] == 3
+
+
+def test_record_failure_of_a_row_without_version(apply):
+    item = approved(1)
+    del item['Version']
+    apply_approved_changes.record_failure(item, "HTTP 500")
+    assert apply.table.updates[0]['ConditionExpression'] == "attribute_exists(StoreProductID) AND attribute_not_exists(#version)"
+
+
+def test_record_failure_ignores_a_row_that_changed(apply):
+    apply.table.condition = lambda item, values: False
+    assert apply_approved_changes.record_failure(approved(1), "HTTP 500") is False
+
+
+def test_failed_pushes_back_off_exponentially(apply):
+    before = datetime.now(timezone.utc)
+    for attempts in (0, 1, 3):
+        apply_approved_changes.record_failure(approved(1, ApplyAttempts=attempts), "HTTP 500")
+    delays = [datetime.fromisoformat(update['ExpressionAttributeValues'][':next_attempt']) - before for update in apply.table.updates]
+    for delay, minutes in zip(delays, (5, 10, 40)):
+        # NextAttemptAt is stored to the millisecond
+        assert timedelta(minutes=minutes, seconds=-1) <= delay < timedelta(minutes=minutes, seconds=5)
+
+
+def test_process_chunk_counts_every_outcome(apply):
+    apply.failing = {'P2'}
+    apply.conflicting = {'P3'}
+    apply.run_table.put_item({'RunID': 'run-1', 'Applied': 0, 'Failed': 0, 'Conflicts': 0})
+
+    result = apply_approved_changes.process_chunk('run-1', [approved(index) for index in range(1, 5)])
+
+    assert result == (2, 1, 1, [])
+    state = run_state(apply, 'run-1')
+    assert (state['Applied'], state['Failed'], state['Conflicts']) == (2, 1, 1)
+
+
+def test_failure_on_a_changed_row_counts_as_a_conflict(apply):
+    apply.failing = {'P1'}
+    apply.table.condition = lambda item, values: False
+    assert apply_approved_changes.process_chunk('run-1', [approved(1)])[:3] == (0, 0, 1)
+
+
+def test_process_chunk_stops_at_the_deadline_between_batches(apply, monkeypatch):
+    monkeypatch.setattr(apply_approved_changes, 'PUSH_BATCH_SIZE', 2)
+    context = FakeContext()
+    items = [approved(index) for index in range(1, 6)]
+    run_out_of_time_after_each_batch(monkeypatch, context)
+    applied, failed, conflicts, remaining = apply_approved_changes.process_chunk('run-1', items, context)
+    assert applied == 2
+    assert [item['ProductID'] for item in remaining] == ['P3', 'P4', 'P5']
+
+
+def test_due_filter_skips_backed_off_and_exhausted_items(apply):
+    apply.pages = [([], None)]
+    apply_approved_changes.lambda_handler({'store_id': 'store-1'}, FakeContext())
+    query = apply.queries[0]
+    assert "NextAttemptAt <= :now" in query['FilterExpression']
+    assert "ApplyAttempts < :max_attempts" in query['FilterExpression']
+    assert query['ExpressionAttributeValues'][':max_attempts'] == apply_approved_changes.MAX_APPLY_ATTEMPTS
+
+
+def test_run_resumes_from_its_checkpoint(apply):
+    cursor = {'StoreProductID': 'store-1#P2', 'VariantID': 'V2', 'StoreStatus': 'store-1#Approved', 'StatusUpdatedAt': '2026-01-01'}
+    apply.run_table.put_item({'RunID': 'run-1', 'StoreID': 'store-1', 'RunStatus': 'Running', 'Cursor': json.dumps(cursor), 'Checkpoints': 3})
+    apply.pages = [([approved(3)], None)]
+
+    response = apply_approved_changes.lambda_handler({'run_id': 'run-1'}, FakeContext())
+
+    assert response['statusCode'] == 200
+    assert apply.queries[0]['exclusive_start_key'] == cursor
+    assert apply.queries[0]['store_id'] == 'store-1'
+    assert apply.completed == ['P3']
+    assert run_state(apply, 'run-1')['RunStatus'] == 'Done'
+
+
+def test_run_checkpoints_and_continues_when_out_of_time(apply, monkeypatch):
+    next_key = {'StoreProductID': 'store-1#P1', 'VariantID': 'V1'}
+    apply.pages = [([approved(1)], next_key)]
+    context = FakeContext()
+    run_out_of_time_after_each_batch(monkeypatch, context)
+
+    response = apply_approved_changes.lambda_handler({'store_id': 'store-1'}, context)
+
+    assert response['statusCode'] == 202
+    run_id = json.loads(response['body'])['run_id']
+    state = run_state(apply, run_id)
+    assert json.loads(state['Cursor']) == next_key
+    assert state['Checkpoints'] == 1
+    assert apply.invocations == [{'run_id': run_id}]
+
+
+def test_chunk_cut_short_is_checkpointed_at_its_start(apply, monkeypatch):
+    monkeypatch.setattr(apply_approved_changes, 'PUSH_BATCH_SIZE', 1)
+    start_key = {'StoreProductID': 'store-1#P0', 'VariantID': 'V0'}
+    apply.run_table.put_item({'RunID': 'run-1', 'StoreID': 'store-1', 'RunStatus': 'Running', 'Cursor': json.dumps(start_key), 'Checkpoints': 0})
+    apply.pages = [([approved(1), approved(2)], {'StoreProductID': 'store-1#P2', 'VariantID': 'V2'})]
+    context = FakeContext()
+    run_out_of_time_after_each_batch(monkeypatch, context)
+    assert apply_approved_changes.lambda_handler({'run_id': 'run-1'}, context)['statusCode'] == 202
+    assert json.loads(run_state(apply, 'run-1')['Cursor']) == start_key
+    assert apply.pushed == [['P1']]
+
+
+def test_fan_out_counts_chunks_until_the_last_worker_finishes(apply, monkeypatch):
+    monkeypatch.setattr(apply_approved_changes, 'APPLY_FAN_OUT', True)
+    apply.pages = [([approved(1), approved(2)], {'StoreProductID': 'store-1#P2', 'VariantID': 'V2'}), ([approved(3)], None)]
+
+    response = apply_approved_changes.lambda_handler({'store_id': 'store-1'}, FakeContext())
+    run_id = json.loads(response['body'])['run_id']
+    state = run_state(apply, run_id)
+    assert (state['Outstanding'], state['RunStatus'], state['ScanComplete']) == (2, 'Draining', True)
+    assert apply.pushed == []
+    chunks = [invocation for invocation in apply.invocations if 'chunk' in invocation]
+    assert [len(invocation['chunk']) for invocation in chunks] == [2, 1]
+
+    # Workers deserialize their chunk and count themselves done; the last one finishes the run
+    apply_approved_changes.lambda_handler(chunks[0], FakeContext())
+    assert run_state(apply, run_id)['RunStatus'] == 'Draining'
+    apply_approved_changes.lambda_handler(chunks[1], FakeContext())
+    state = run_state(apply, run_id)
+    assert (state['Outstanding'], state['RunStatus'], state['Applied']) == (0, 'Done', 3)
+    assert apply.completed == ['P1', 'P2', 'P3']
+
+
+def test_worker_out_of_time_passes_on_the_rest_of_its_chunk(apply, monkeypatch):
+    monkeypatch.setattr(apply_approved_changes, 'PUSH_BATCH_SIZE', 1)
+    apply.run_table.put_item({'RunID': 'run-1', 'RunStatus': 'Draining', 'ScanComplete': True, 'Outstanding': 1})
+    chunk = {'run_id': 'run-1', 'chunk': [apply_approved_changes.serialize_item(approved(index)) for index in (1, 2)]}
+    context = FakeContext()
+    run_out_of_time_after_each_batch(monkeypatch, context)
+    apply_approved_changes.lambda_handler(chunk, context)
+
+    # The chunk is still outstanding, continued by a new invocation with its last item
+    assert run_state(apply, 'run-1')['Outstanding'] == 1
+    assert run_state(apply, 'run-1')['RunStatus'] == 'Draining'
+    assert [len(invocation['chunk']) for invocation in apply.invocations] == [1]
@@ -0,0 +1,141 @@
+"""
+Unit tests for the transactions of lambda_functions/bulk_review.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import bulk_review
+from lambda_functions.bulk_review import apply_reviews
+
+
+class TransactionCanceled(Exception):
+    def __init__(self, codes):
+        super().__init__("Transaction cancelled")
+        self.response = {'CancellationReasons': [{'Code': code} for code in codes]}
+
+
+class FakeClient:
+    """
+    TransactWriteItems that cancels a transaction when any row is listed in `outcomes`. Each
+    listed row answers its queued reason codes in turn (then succeeds); the other rows of a
+    cancelled transaction report 'None'.
+    """
+
+    exceptions = SimpleNamespace(TransactionCanceledException=TransactionCanceled)
+
+    def __init__(self, outcomes=None):
+        self.outcomes = {key: list(codes) for key, codes in (outcomes or {}).items()}
+        self.transactions = []
+
+    def transact_write_items(self, TransactItems):
+        keys = [update['Update']['Key'] for update in TransactItems]
+        rows = [(key['StoreProductID'].split('#', 1)[1], key['VariantID']) for key in keys]
+        self.transactions.append(rows)
+        codes = [self.outcomes[row].pop(0) if self.outcomes.get(row) else 'None' for row in rows]
+        if any(code != 'None' for code in codes):
+            raise TransactionCanceled(codes)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(outcomes=None):
+        fake = FakeClient(outcomes)
+        monkeypatch.setattr(bulk_review, 'dynamodb', SimpleNamespace(meta=SimpleNamespace(client=fake)))
+        return fake
+    monkeypatch.setattr(bulk_review.time, 'sleep', lambda seconds: None)
+    return install
+
+
+def keys(*rows, version=None):
+    return [dict({'ProductID': product_id, 'VariantID': variant_id}, **({'Version': version} if version is not None else {}))
+            for product_id, variant_id in rows]
+
+
+def test_every_row_is_reviewed_in_transactions_of_100(client):
+    fake = client()
+    rows = [(f"P{index}", 'V1') for index in range(250)]
+    outcomes = apply_reviews('store-1', keys(*rows), 'Approved', 'alice')
+
+    assert [len(transaction) for transaction in fake.transactions] == [100, 100, 50]
+    assert set(outcomes.values()) == {('approved', None)}
+    assert len(outcomes) == 250
+
+
+def test_rows_failing_their_condition_are_skipped_and_the_rest_retried(client):
+    fake = client({('P2', 'V1'): ['ConditionalCheckFailed']})
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), ('P2', 'V1'), ('P3', 'V1')), 'Rejected', 'bob')
+
+    assert fake.transactions == [[('P1', 'V1'), ('P2', 'V1'), ('P3', 'V1')], [('P1', 'V1'), ('P3', 'V1')]]
+    assert outcomes[('P1', 'V1')] == ('rejected', None)
+    assert outcomes[('P2', 'V1')][0] == 'skipped'
+    assert outcomes[('P3', 'V1')] == ('rejected', None)
+
+
+def test_single_item_version_conflict_is_skipped(client):
+    fake = client({('P1', 'V1'): ['ConditionalCheckFailed']})
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), version=3), 'Approved', 'alice')
+
+    assert outcomes == {('P1', 'V1'): ('skipped', "Not pending (already reviewed, changed or missing).")}
+    # Skipped rows are not retried
+    assert len(fake.transactions) == 1
+
+
+def test_version_is_part_of_the_condition():
+    update = bulk_review.review_update('store-1', keys(('P1', 'V1'), version=3)[0], 'Approved', 'alice')['Update']
+    assert update['TableName'] == bulk_review.table_name
+    assert "#version = :expected_version" in update['ConditionExpression']
+    assert update['ExpressionAttributeValues'][':expected_version'] == 3
+    assert update['ExpressionAttributeValues'][':set0'] == 'alice'
+
+
+def test_transaction_conflicts_are_retried(client):
+    fake = client({('P1', 'V1'): ['TransactionConflict', 'ThrottlingError']})
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), ('P2', 'V1')), 'Approved', 'alice')
+
+    assert len(fake.transactions) == 3
+    assert outcomes == {('P1', 'V1'): ('approved', None), ('P2', 'V1'): ('approved', None)}
+
+
+def test_rows_still_conflicting_after_every_attempt_fail(client):
+    attempts = bulk_review.MAX_TRANSACTION_ATTEMPTS
+    client({('P1', 'V1'): ['TransactionConflict'] * attempts})
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), ('P2', 'V1')), 'Approved', 'alice')
+
+    # The chunk is retried as a whole, so its other row is not approved on its own
+    assert outcomes == {
+        ('P1', 'V1'): ('failed', "Transaction could not be completed."),
+        ('P2', 'V1'): ('failed', "Transaction could not be completed."),
+    }
+
+
+def test_partial_success_across_chunks(client, monkeypatch):
+    monkeypatch.setattr(bulk_review, 'TRANSACTION_SIZE', 2)
+    client({('P2', 'V1'): ['ConditionalCheckFailed'], ('P3', 'V1'): ['TransactionConflict'] * bulk_review.MAX_TRANSACTION_ATTEMPTS})
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), ('P2', 'V1'), ('P3', 'V1'), ('P4', 'V1'), ('P5', 'V1')), 'Approved', 'alice')
+
+    assert [outcomes[(f"P{index}", 'V1')][0] for index in range(1, 6)] == ['approved', 'skipped', 'failed', 'failed', 'approved']
+
+
+def test_missing_cancellation_reasons_retry_the_whole_chunk(client):
+    fake = client()
+    calls = []
+
+    def cancel_once(TransactItems):
+        calls.append(len(TransactItems))
+        if len(calls) == 1:
+            error = TransactionCanceled([])
+            error.response = {}
+            raise error
+
+    fake.transact_write_items = cancel_once
+    outcomes = apply_reviews('store-1', keys(('P1', 'V1'), ('P2', 'V1')), 'Approved', 'alice')
+    assert calls == [2, 2]
+    assert set(outcomes.values()) == {('approved', None)}
@@ -0,0 +1,146 @@
+"""
+Unit tests for lambda_functions/competitor_fetcher.py, against the local competitor fixture server.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.competitor_fixture_server import CompetitorFixtureHandler, fixture_price, reprice, reset_counters, start_server
+from lambda_functions import competitor_fetcher
+from lambda_functions.competitor_fetcher import PageCache, fetch_competitor_prices, is_allowed_domain, is_public_address
+
+
+@pytest.fixture
+def fixture_server(monkeypatch):
+    """Start the fixture server with an empty page cache; loopback hosts are allowed for it."""
+    servers = []
+
+    def start(**kwargs):
+        reset_counters()
+        server = start_server(**kwargs)
+        servers.append(server)
+        return server.server_port
+
+    monkeypatch.setattr(competitor_fetcher, 'ALLOW_PRIVATE_ADDRESSES', True)
+    monkeypatch.setattr(competitor_fetcher, 'page_cache', PageCache())
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unchanged_pages_are_revalidated_with_their_etag(fixture_server):
+    port = fixture_server(latency_ms=0)
+    url = f"http://127.0.0.1:{port}/products/etag-1"
+
+    results, stats = fetch_competitor_prices([url])
+    assert results[url] == {"price": fixture_price('etag-1'), "status": "fetched"}
+
+    results, stats = fetch_competitor_prices([url])
+    assert results[url] == {"price": fixture_price('etag-1'), "status": "not_modified"}
+    assert stats == {"not_modified": 1}
+    assert CompetitorFixtureHandler.statuses[304] == 1
+
+
+def test_repriced_pages_are_fetched_and_parsed_again(fixture_server):
+    port = fixture_server(latency_ms=0)
+    url = f"http://127.0.0.1:{port}/products/reprice-1"
+    fetch_competitor_prices([url])
+
+    reprice(['reprice-1'])
+    results, _ = fetch_competitor_prices([url])
+    assert results[url] == {"price": fixture_price('reprice-1', revision=1), "status": "fetched"}
+
+
+def test_unchanged_body_reuses_the_parsed_price(fixture_server, monkeypatch):
+    port = fixture_server(latency_ms=0, ignore_conditional=True)
+    url = f"http://127.0.0.1:{port}/products/parse-1"
+    fetch_competitor_prices([url])
+
+    parsed = []
+    extract_price = competitor_fetcher.extract_price
+    monkeypatch.setattr(competitor_fetcher, 'extract_price', lambda body: parsed.append(body) or extract_price(body))
+    results, _ = fetch_competitor_prices([url])
+
+    # The site resent the whole page, but its content hash matched the cached one
+    assert results[url] == {"price": fixture_price('parse-1'), "status": "parse_cached"}
+    assert CompetitorFixtureHandler.statuses[200] == 2
+    assert parsed == []
+
+
+def test_requests_to_one_domain_respect_its_concurrency_limit(fixture_server, monkeypatch):
+    monkeypatch.setattr(competitor_fetcher, 'DOMAIN_CONCURRENCY', 1)
+    monkeypatch.setattr(competitor_fetcher, 'DOMAIN_RATE_LIMIT', 0)
+    port = fixture_server(latency_ms=100)
+    urls = [f"http://{host}:{port}/products/limit-{index}" for host in ('127.0.0.1', 'localhost') for index in range(4)]
+
+    start = time.monotonic()
+    results, stats = fetch_competitor_prices(urls)
+    elapsed = time.monotonic() - start
+
+    assert stats == {"fetched": 8}
+    for host in ('127.0.0.1', 'localhost'):
+        times = sorted(CompetitorFixtureHandler.request_times[host])
+        assert len(times) == 4
+        # One request at a time: each one is answered before the next is sent
+        assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+    # ...while the two domains are fetched side by side
+    assert elapsed < 0.75
+
+
+def test_requests_to_one_domain_are_spaced_by_its_rate_limit(fixture_server, monkeypatch):
+    monkeypatch.setattr(competitor_fetcher, 'DOMAIN_CONCURRENCY', 4)
+    monkeypatch.setattr(competitor_fetcher, 'DOMAIN_RATE_LIMIT', 10)
+    port = fixture_server(latency_ms=0)
+    fetch_competitor_prices([f"http://127.0.0.1:{port}/products/rate-{index}" for index in range(4)])
+
+    times = sorted(CompetitorFixtureHandler.request_times['127.0.0.1'])
+    assert times[-1] - times[0] >= 0.28
+
+
+def test_private_and_metadata_addresses_are_never_fetched(monkeypatch):
+    monkeypatch.setattr(competitor_fetcher, 'page_cache', PageCache())
+    reset_counters()
+    server = start_server(latency_ms=0)
+    try:
+        urls = [
+            f"http://127.0.0.1:{server.server_port}/products/private-1",
+            f"http://localhost:{server.server_port}/products/private-2",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://[::1]:9/products/1",
+        ]
+        results, stats = fetch_competitor_prices(urls)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert stats == {"error": 4}
+    assert all('non-public address' in result['error'] for result in results.values())
+    assert not CompetitorFixtureHandler.request_times
+
+
+@pytest.mark.parametrize('address', ['127.0.0.1', '10.1.2.3', '172.16.0.1', '192.168.1.1', '169.254.169.254',
+                                     '100.64.0.1', '0.0.0.0', '224.0.0.1', '::1', 'fe80::1', 'fd00::1', '::ffff:10.0.0.1'])
+def test_non_public_addresses_are_rejected(address):
+    assert not is_public_address(address)
+
+
+@pytest.mark.parametrize('address', ['93.184.216.34', '2606:4700:4700::1111'])
+def test_public_addresses_are_accepted(address):
+    assert is_public_address(address)
+
+
+def test_allowed_domains_cover_their_subdomains(monkeypatch):
+    assert is_allowed_domain('anything.example')
+    monkeypatch.setattr(competitor_fetcher, 'ALLOWED_DOMAINS', ('competitor.com',))
+    assert is_allowed_domain('competitor.com')
+    assert is_allowed_domain('www.Competitor.com.')
+    assert not is_allowed_domain('evilcompetitor.com')
+    assert not is_allowed_domain('competitor.com.evil.net')
@@ -0,0 +1,223 @@
+"""
+Unit tests for the incremental stream updates of lambda_functions/dashboard_summary.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import dashboard_summary
+from lambda_functions.dashboard_summary import SummaryDelta, product_update, update_summary
+from lambda_functions.idempotency import IdempotencyStore
+
+
+def image(product_id, variant_id, status, current, proposed, store_id='store-1'):
+    return {
+        'StoreID': {'S': store_id},
+        'ProductID': {'S': product_id},
+        'VariantID': {'S': variant_id},
+        'ApprovalStatus': {'S': status},
+        'CurrentPrice': {'N': str(current)},
+        'ProposedPrice': {'N': str(proposed)},
+    }
+
+
+def record(event_name, sequence_number, old=None, new=None):
+    some_image = new or old
+    store_product_id = f"{some_image['StoreID']['S']}#{some_image['ProductID']['S']}"
+    dynamodb = {'Keys': {'StoreProductID': {'S': store_product_id}, 'VariantID': some_image['VariantID']},
+                'SequenceNumber': sequence_number}
+    if old:
+        dynamodb['OldImage'] = old
+    if new:
+        dynamodb['NewImage'] = new
+    return {'eventName': event_name, 'dynamodb': dynamodb}
+
+
+def test_insert_adds_a_pending_row_and_its_drop():
+    delta = SummaryDelta()
+    delta.add_record(record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '8.50')))
+
+    assert delta.counts == {'Pending': 1}
+    assert delta.impact == Decimal('-1.50')
+    assert delta.products['P1'] == {'counts': {'Pending': 1}, 'impact': Decimal('-1.50')}
+    assert delta.drops == {('P1', 'V1'): Decimal('1.50')}
+
+
+def test_insert_of_a_price_increase_has_no_drop():
+    delta = SummaryDelta()
+    delta.add_record(record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '11.00')))
+    assert delta.impact == Decimal('1.00')
+    assert delta.drops == {('P1', 'V1'): None}
+
+
+def test_status_change_moves_the_row_between_counts():
+    delta = SummaryDelta()
+    delta.add_record(record('MODIFY', '2', old=image('P1', 'V1', 'Pending', '10.00', '8.50'),
+                            new=image('P1', 'V1', 'Approved', '10.00', '8.50')))
+
+    assert delta.counts == {'Pending': -1, 'Approved': 1}
+    # Only Pending rows have an impact or a drop
+    assert delta.impact == Decimal('1.50')
+    assert delta.drops == {('P1', 'V1'): None}
+
+
+def test_modify_of_a_pending_price_replaces_its_impact():
+    delta = SummaryDelta()
+    delta.add_record(record('MODIFY', '2', old=image('P1', 'V1', 'Pending', '10.00', '8.50'),
+                            new=image('P1', 'V1', 'Pending', '10.00', '7.00')))
+    # The row stays Pending, so no count changes
+    assert not +delta.counts
+    assert delta.impact == Decimal('-1.50')
+    assert delta.drops == {('P1', 'V1'): Decimal('3.00')}
+
+
+def test_remove_takes_the_row_and_its_drop_out():
+    delta = SummaryDelta()
+    delta.add_record(record('REMOVE', '3', old=image('P1', 'V1', 'Pending', '10.00', '8.50')))
+
+    assert delta.counts == {'Pending': -1}
+    assert delta.impact == Decimal('1.50')
+    assert delta.drops == {('P1', 'V1'): None}
+
+
+def test_records_of_a_batch_are_folded_in_order():
+    delta = SummaryDelta()
+    pending = image('P1', 'V1', 'Pending', '10.00', '8.50')
+    delta.add_record(record('INSERT', '9', new=pending))
+    delta.add_record(record('MODIFY', '10', old=pending, new=image('P1', 'V1', 'Rejected', '10.00', '8.50')))
+    delta.add_record(record('INSERT', '11', new=image('P1', 'V2', 'Pending', '5.00', '4.00')))
+
+    assert +delta.counts == {'Rejected': 1, 'Pending': 1}
+    assert delta.impact == Decimal('-1.00')
+    assert delta.drops == {('P1', 'V1'): None, ('P1', 'V2'): Decimal('1.00')}
+    assert delta.sequences['P1'] == '11'.zfill(40)
+
+
+def test_product_update_adds_counts_and_sets_or_removes_drops():
+    delta = SummaryDelta()
+    delta.add_record(record('MODIFY', '2', old=image('P1', 'V1', 'Pending', '10.00', '8.50'),
+                            new=image('P1', 'V1', 'Approved', '10.00', '8.50')))
+    delta.add_record(record('INSERT', '3', new=image('P1', 'V2', 'Pending', '10.00', '9.00')))
+    drops = dashboard_summary.product_drops(delta)['P1']
+    update = product_update('store-1', 'P1', delta.products['P1'], drops, 'now', delta.sequences['P1'])
+
+    names, values = update['ExpressionAttributeNames'], update['ExpressionAttributeValues']
+    assert update['Key'] == {'SummaryID': 'product#store-1#P1'}
+    assert update['ConditionExpression'] == "attribute_not_exists(LastSequence) OR LastSequence < :sequence"
+    # Pending: -1 + 1 nets out and is left alone; Approved is added
+    assert {names[name]: values[name.replace('#', ':')] for name in names if name.startswith('#count')} == {'ApprovedCount': 1}
+    assert ' REMOVE ' in update['UpdateExpression'] and names['#drop0'] == 'Drop:V1'
+    assert values[':drop1'] == Decimal('1.00') and names['#drop1'] == 'Drop:V2'
+    assert values[':impact'] == Decimal('0.50')
+
+
+class ConditionalCheckFailed(Exception):
+    pass
+
+
+class FakeSummaryTable:
+    """The summary table: product updates through the client, overview read-modify-writes."""
+
+    def __init__(self):
+        self.items = {}
+        self.product_updates = []
+        self.overview_conflicts = 0
+        exceptions = SimpleNamespace(ConditionalCheckFailedException=ConditionalCheckFailed)
+        self.meta = SimpleNamespace(client=SimpleNamespace(update_item=self.update_product, exceptions=exceptions))
+
+    def update_product(self, **update):
+        item = self.items.get(update['Key']['SummaryID'], {})
+        if item.get('LastSequence', '') >= update['ExpressionAttributeValues'][':sequence']:
+            raise ConditionalCheckFailed()
+        self.product_updates.append(update)
+        self.items[update['Key']['SummaryID']] = dict(item, LastSequence=update['ExpressionAttributeValues'][':sequence'])
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get(Key['SummaryID'])
+        return {'Item': item} if item else {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        if self.overview_conflicts:
+            self.overview_conflicts -= 1
+            raise ConditionalCheckFailed()
+        item = self.items.setdefault(Key['SummaryID'], {})
+        item['TopDrops'] = ExpressionAttributeValues[':top_drops']
+        item['Version'] = item.get('Version', 0) + 1
+        for name, attribute in ExpressionAttributeNames.items():
+            if name.startswith('#count'):
+                item[attribute] = item.get(attribute, 0) + ExpressionAttributeValues[name.replace('#', ':')]
+        item['PendingImpact'] = item.get('PendingImpact', 0) + ExpressionAttributeValues.get(':impact', 0)
+
+
+@pytest.fixture
+def summary(monkeypatch):
+    table = FakeSummaryTable()
+    monkeypatch.setattr(dashboard_summary, 'summary_table', table)
+    monkeypatch.setattr(dashboard_summary, 'applied_records', IdempotencyStore())
+    return table
+
+
+def overview(table, store_id='store-1'):
+    return table.items[f"overview#{store_id}"]
+
+
+def test_update_summary_applies_insert_modify_and_remove(summary):
+    pending = image('P1', 'V1', 'Pending', '10.00', '8.50')
+    update_summary({'Records': [
+        record('INSERT', '1', new=pending),
+        record('INSERT', '2', new=image('P2', 'V1', 'Pending', '20.00', '15.00')),
+    ]}, None)
+    assert (overview(summary)['PendingCount'], overview(summary)['PendingImpact']) == (2, Decimal('-6.50'))
+    assert [entry['ProductID'] for entry in overview(summary)['TopDrops']] == ['P2', 'P1']
+
+    update_summary({'Records': [
+        record('MODIFY', '3', old=pending, new=image('P1', 'V1', 'Approved', '10.00', '8.50')),
+        record('REMOVE', '4', old=image('P2', 'V1', 'Pending', '20.00', '15.00')),
+    ]}, None)
+    item = overview(summary)
+    assert (item['PendingCount'], item['ApprovedCount'], item['PendingImpact']) == (0, 1, Decimal('0.00'))
+    assert item['TopDrops'] == []
+
+
+def test_replayed_records_are_not_counted_twice(summary):
+    records = [record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '8.50'))]
+    assert update_summary({'Records': records}, None) == {"batchItemFailures": []}
+    update_summary({'Records': records}, None)
+
+    assert overview(summary)['PendingCount'] == 1
+    assert len(summary.product_updates) == 1
+
+
+def test_product_items_skip_records_they_already_include(summary):
+    records = [record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '8.50'))]
+    update_summary({'Records': records}, None)
+    # A retry on a container that lost the applied-record keys still leaves the product item alone
+    dashboard_summary.applied_records = IdempotencyStore()
+    update_summary({'Records': records}, None)
+    assert len(summary.product_updates) == 1
+
+
+def test_overview_conflicts_are_retried(summary):
+    summary.overview_conflicts = 2
+    update_summary({'Records': [record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '8.50'))]}, None)
+    assert overview(summary)['PendingCount'] == 1
+
+
+def test_stores_whose_overview_keeps_changing_are_reported(summary):
+    summary.overview_conflicts = dashboard_summary.MAX_OVERVIEW_ATTEMPTS
+    response = update_summary({'Records': [
+        record('INSERT', '1', new=image('P1', 'V1', 'Pending', '10.00', '8.50')),
+        record('INSERT', '2', new=image('P1', 'V1', 'Pending', '10.00', '8.50', store_id='store-2')),
+    ]}, None)
+
+    # store-1 is processed first and uses up every attempt; store-2 goes through
+    assert response == {"batchItemFailures": [{"itemIdentifier": '1'}]}
+    assert overview(summary, 'store-2')['PendingCount'] == 1
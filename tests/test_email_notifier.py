@@ -0,0 +1,156 @@
+"""
+Unit tests for the digest grouping and dedupe of lambda_functions/email_notifier.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import email_notifier
+from lambda_functions.email_notifier import build_digest, lambda_handler, parse_record
+from lambda_functions.idempotency import IdempotencyStore
+
+
+class FakeSES:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+        self.raw = []
+
+    def send_email(self, Source, Destination, Message):
+        if self.fail:
+            raise RuntimeError("Throttling: Maximum sending rate exceeded")
+        self.sent.append(Message)
+        return {'MessageId': f"m{len(self.sent)}"}
+
+    def send_raw_email(self, Source, Destinations, RawMessage):
+        self.raw.append(RawMessage['Data'])
+        return {'MessageId': f"r{len(self.raw)}"}
+
+
+@pytest.fixture
+def ses(monkeypatch):
+    fake = FakeSES()
+    monkeypatch.setattr(email_notifier, 'ses', fake)
+    monkeypatch.setattr(email_notifier, 'dedupe_store', IdempotencyStore())
+    return fake
+
+
+def image(product_id, variant_id, current, proposed, status='Pending', store_id='store-1', reviewed_by=None):
+    new_image = {
+        'StoreID': {'S': store_id},
+        'ProductID': {'S': product_id},
+        'VariantID': {'S': variant_id},
+        'CurrentPrice': {'N': str(current)},
+        'CompetitorPrice': {'N': str(proposed)},
+        'ProposedPrice': {'N': str(proposed)},
+        'ApprovalStatus': {'S': status},
+    }
+    if reviewed_by:
+        new_image['ReviewedBy'] = {'S': reviewed_by}
+    return new_image
+
+
+def insert(sequence_number, *args, **kwargs):
+    return {'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': sequence_number, 'NewImage': image(*args, **kwargs)}}
+
+
+def review(sequence_number, product_id, variant_id, status, reviewer='alice'):
+    return {'eventName': 'MODIFY', 'dynamodb': {
+        'SequenceNumber': sequence_number,
+        'OldImage': image(product_id, variant_id, 10, 9),
+        'NewImage': image(product_id, variant_id, 10, 9, status=status, reviewed_by=reviewer),
+    }}
+
+
+def entries(*records):
+    return [parse_record(record) for record in records]
+
+
+def test_only_new_proposals_and_reviews_of_pending_rows_are_reported():
+    completed = review('3', 'P1', 'V1', 'Completed')
+    completed['dynamodb']['OldImage']['ApprovalStatus'] = {'S': 'Approved'}
+    assert parse_record(insert('1', 'P1', 'V1', 10, 9))['event'] == 'New proposal'
+    assert parse_record(review('2', 'P1', 'V1', 'Rejected'))['reviewed_by'] == 'alice'
+    assert parse_record(completed) is None
+
+
+def test_digest_groups_rows_by_product():
+    subject, body_text, body_html, attachment = build_digest(entries(
+        insert('1', 'P2', 'V1', 20, 18),
+        insert('2', 'P1', 'V2', 10, 9),
+        review('3', 'P1', 'V1', 'Approved'),
+        insert('4', 'P2', 'V2', 20, 21),
+    ))
+
+    assert subject == "Pricing digest: 3 new proposals, 1 approved, 0 rejected"
+    assert "Products affected: 2" in body_text
+    assert "New proposals: 3 (2 decreases, 1 increases)" in body_text
+    assert "Total proposed price movement: -2.00" in body_text
+    # One header per product, each followed by its variants in order
+    assert body_html.count('<th colspan=') == 2
+    p1, p2 = body_html.index('Product P1 (store-1)'), body_html.index('Product P2 (store-1)')
+    assert p1 < body_html.index('<td>P1</td><td>V1</td>') < body_html.index('<td>P1</td><td>V2</td>') < p2
+    assert p2 < body_html.index('<td>P2</td><td>V1</td>') < body_html.index('<td>P2</td><td>V2</td>')
+    assert attachment is None
+
+
+def test_large_digest_inlines_the_largest_movements_and_attaches_every_row(monkeypatch):
+    monkeypatch.setattr(email_notifier, 'DIGEST_INLINE_ROWS', 2)
+    subject, body_text, body_html, attachment = build_digest(entries(
+        insert('1', 'P1', 'V1', 10, 9.5),
+        insert('2', 'P2', 'V1', 10, 5),
+        insert('3', 'P3', 'V1', 10, 12),
+    ))
+
+    assert "Showing the 2 largest movements of 3" in body_text
+    assert 'Product P1' not in body_html and 'Product P2' in body_html and 'Product P3' in body_html
+    assert attachment.splitlines()[1:] == [
+        'store-1,P1,V1,New proposal,10.00,9.50,9.50,-0.50,',
+        'store-1,P2,V1,New proposal,10.00,5.00,5.00,-5.00,',
+        'store-1,P3,V1,New proposal,10.00,12.00,12.00,+2.00,',
+    ]
+
+
+def test_batch_is_sent_as_one_digest(ses):
+    assert lambda_handler({'Records': [insert('1', 'P1', 'V1', 10, 9), insert('2', 'P2', 'V1', 10, 8)]}, None) == {"batchItemFailures": []}
+    assert len(ses.sent) == 1
+
+
+def test_replayed_stream_records_are_not_emailed_again(ses):
+    records = [insert('1', 'P1', 'V1', 10, 9), review('2', 'P2', 'V1', 'Approved')]
+    lambda_handler({'Records': records}, None)
+    lambda_handler({'Records': records}, None)
+    assert len(ses.sent) == 1
+
+
+def test_repeated_notification_content_is_dropped(ses):
+    lambda_handler({'Records': [insert('1', 'P1', 'V1', 10, 9)]}, None)
+    # The same proposal written again under a new sequence number, and twice within one batch
+    lambda_handler({'Records': [insert('2', 'P1', 'V1', 10, 9), insert('3', 'P2', 'V1', 10, 8), insert('4', 'P2', 'V1', 10, 8)]}, None)
+
+    assert len(ses.sent) == 2
+    assert ses.sent[1]['Subject']['Data'].startswith("Pricing digest: 1 new proposals")
+
+
+def test_failed_send_reports_every_record_and_is_retried(ses):
+    ses.fail = True
+    records = [insert('1', 'P1', 'V1', 10, 9), insert('2', 'P2', 'V1', 10, 8)]
+    response = lambda_handler({'Records': records}, None)
+    assert response == {"batchItemFailures": [{"itemIdentifier": '1'}, {"itemIdentifier": '2'}]}
+
+    # Nothing was recorded as sent, so the retry goes out
+    ses.fail = False
+    assert lambda_handler({'Records': records}, None) == {"batchItemFailures": []}
+    assert len(ses.sent) == 1
+
+
+def test_unparseable_records_are_dropped(ses):
+    broken = {'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': '1', 'NewImage': {'ProductID': {'S': 'P1'}}}}
+    assert lambda_handler({'Records': [broken, insert('2', 'P2', 'V1', 10, 8)]}, None) == {"batchItemFailures": []}
+    assert len(ses.sent) == 1
@@ -0,0 +1,145 @@
+"""
+Unit tests for the byte-range reading of lambda_functions/feed_reader.py.
+
+Run with: python -m pytest tests
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import feed_reader
+from lambda_functions.feed_reader import iter_feed_chunks, plan_byte_ranges, plan_csv_ranges
+
+
+class FakeBody:
+    """The parts of botocore's StreamingBody the reader uses, over an in-memory object."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def iter_lines(self, keepends=False):
+        # botocore splits with bytes.splitlines as well
+        yield from self.data.splitlines(keepends)
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+    def read(self):
+        return self.data
+
+    def close(self):
+        pass
+
+
+class FakeS3:
+    def __init__(self, data):
+        self.data = data
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.data
+        if Range:
+            first, _, last = Range[len('bytes='):].partition('-')
+            data = data[int(first):int(last) + 1 if last else None]
+        return {'Body': FakeBody(data)}
+
+
+@pytest.fixture
+def feed_object(monkeypatch):
+    def put(data):
+        monkeypatch.setattr(feed_reader, 's3', FakeS3(data))
+        return data
+    return put
+
+
+def read_all(key, ranges, header=None):
+    rows = []
+    for byte_range in ranges:
+        for chunk in iter_feed_chunks('bucket', key, chunk_size=3, byte_range=byte_range, header=header):
+            rows.extend(chunk)
+    return rows
+
+
+JSONL_ROWS = [{"internal_product_id": f"P{index}", "competitor_price": "1" * (index % 7 + 1)} for index in range(12)]
+
+
+def test_plan_byte_ranges_covers_every_byte_once():
+    assert plan_byte_ranges(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert plan_byte_ranges(8, 4) == [(0, 3), (4, 7)]
+
+
+def test_every_jsonl_line_is_read_exactly_once_for_every_range_size(feed_object):
+    data = feed_object(b"".join(json.dumps(row).encode() + b"\n" for row in JSONL_ROWS))
+    # Every split point is tried, so ranges start on a line start (newline at start-1), end right
+    # before one (a line starting exactly at end + 1) and cut lines in the middle
+    for range_bytes in range(1, len(data) + 1):
+        assert read_all('feed.jsonl', plan_byte_ranges(len(data), range_bytes)) == JSONL_ROWS, range_bytes
+
+
+def test_a_line_starting_exactly_at_end_belongs_to_the_range(feed_object):
+    data = feed_object(b'{"a": 1}\n{"a": 2}\n{"a": 3}\n')
+    second_line = data.index(b'{"a": 2}')
+    assert read_all('feed.jsonl', [(0, second_line)]) == [{"a": 1}, {"a": 2}]
+    assert read_all('feed.jsonl', [(second_line + 1, len(data) - 1)]) == [{"a": 3}]
+
+
+def test_the_first_range_keeps_its_first_line(feed_object):
+    feed_object(b'{"a": 1}\n{"a": 2}\n')
+    assert read_all('feed.jsonl', [(0, 0)]) == [{"a": 1}]
+
+
+def csv_feed(rows):
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(['internal_product_id', 'competitor_product_id', 'competitor_price'])
+    writer.writerows(rows)
+    return output.getvalue().encode()
+
+
+CSV_ROWS = [
+    ['P1', 'V1', '10.00'],
+    ['P2', 'a "quoted"\nmultiline\n\nvariant', '11.00'],
+    ['P3', 'V3', '12.00'],
+    ['P4', 'line one\nline two', '13.00'],
+    ['P5', 'V5', '14.00'],
+]
+EXPECTED_CSV = [dict(zip(['internal_product_id', 'competitor_product_id', 'competitor_price'], row)) for row in CSV_ROWS]
+
+
+def test_whole_csv_keeps_quoted_newlines(feed_object):
+    feed_object(csv_feed(CSV_ROWS))
+    assert read_all('feed.csv', [None]) == EXPECTED_CSV
+
+
+def test_csv_ranges_never_cut_a_quoted_record(feed_object):
+    data = feed_object(csv_feed(CSV_ROWS))
+    header = ['internal_product_id', 'competitor_product_id', 'competitor_price']
+    for range_bytes in range(1, len(data) + 1):
+        ranges = plan_csv_ranges('bucket', 'feed.csv', len(data), range_bytes)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data) - 1
+        assert all(end + 1 == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        # The header row is part of range 0 and is dropped there rather than read as a row
+        assert read_all('feed.csv', ranges, header=header) == EXPECTED_CSV, range_bytes
+
+
+def test_csv_ranges_are_planned_across_read_chunks(feed_object, monkeypatch):
+    monkeypatch.setattr(feed_reader, 'CSV_PLAN_CHUNK_BYTES', 5)
+    data = feed_object(csv_feed(CSV_ROWS))
+    for range_bytes in range(1, len(data) + 1):
+        ranges = plan_csv_ranges('bucket', 'feed.csv', len(data), range_bytes)
+        assert read_all('feed.csv', ranges, header=['internal_product_id', 'competitor_product_id', 'competitor_price']) == EXPECTED_CSV
+
+
+def test_unparseable_json_lines_are_reported_and_skipped(feed_object):
+    feed_object(b'{"a": 1}\n{broken\n[1, 2]\n\n{"a": 2}\n')
+    invalid_lines = []
+    rows = [row for chunk in iter_feed_chunks('bucket', 'feed.jsonl', invalid_lines=invalid_lines) for row in chunk]
+    assert rows == [{"a": 1}, {"a": 2}]
+    assert [failure['line'] for failure in invalid_lines] == ['{broken', '[1, 2]']
@@ -0,0 +1,44 @@
+"""
+Unit tests for lambda_functions/get_product_by_id.py.
+
+Run with: python -m pytest tests
+"""
+
+import json
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import get_product_by_id
+from lambda_functions.aws_clients import serialize_item
+
+
+class FakeClient:
+    def __init__(self, item=None):
+        self.item = item
+
+    def get_item(self, TableName, Key):
+        return {'Item': serialize_item(self.item)} if self.item else {}
+
+
+def event(product_id='P1', variant_id='V1'):
+    return {'pathParameters': {'product_id': product_id, 'variant_id': variant_id}, 'queryStringParameters': None}
+
+
+def test_found_item_with_decimal_prices_is_returned(monkeypatch):
+    item = {'ProductID': 'P1', 'VariantID': 'V1', 'ProposedPrice': Decimal('19.99'), 'Version': Decimal('2')}
+    monkeypatch.setattr(get_product_by_id, 'dynamodb_client', FakeClient(item))
+    response = get_product_by_id.lambda_handler(event(), None)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == {'ProductID': 'P1', 'VariantID': 'V1', 'ProposedPrice': 19.99, 'Version': 2}
+
+
+def test_missing_item_is_404(monkeypatch):
+    monkeypatch.setattr(get_product_by_id, 'dynamodb_client', FakeClient())
+    assert get_product_by_id.lambda_handler(event(), None)['statusCode'] == 404
+
+
+def test_missing_path_parameter_is_400():
+    assert get_product_by_id.lambda_handler(event(variant_id=None), None)['statusCode'] == 400
@@ -0,0 +1,62 @@
+"""
+Unit tests for the cursor helpers of lambda_functions/get_products.py.
+
+Run with: python -m pytest tests
+"""
+
+import json
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.get_products import decode_cursor, encode_cursor, lambda_handler
+
+
+STATUS_KEY = {
+    'StoreProductID': 'store-1#P1',
+    'VariantID': 'V1',
+    'StoreStatus': 'store-1#Pending',
+    'StatusUpdatedAt': '2026-01-01T00:00:00.000+00:00',
+}
+
+
+def test_no_last_key_means_no_cursor():
+    assert encode_cursor(None) is None
+    assert encode_cursor({}) is None
+
+
+def test_cursor_round_trips_a_status_index_key():
+    cursor = encode_cursor(STATUS_KEY)
+    assert decode_cursor(cursor) == STATUS_KEY
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(dict(STATUS_KEY, VariantID='?/+=' * 20))
+    assert all(character.isalnum() or character in '-_=' for character in cursor)
+
+
+def test_drop_index_cursor_restores_price_drop_as_a_number():
+    key = dict(STATUS_KEY, PriceDrop=Decimal('12.50'))
+    del key['StatusUpdatedAt']
+    start_key = decode_cursor(encode_cursor(key))
+    assert start_key['PriceDrop'] == Decimal('12.50')
+    assert isinstance(start_key['PriceDrop'], Decimal)
+
+
+def test_cursor_of_another_sort_order_is_rejected():
+    # Both checks fail before the table is queried
+    sorted_cursor = encode_cursor(dict(STATUS_KEY, PriceDrop=Decimal('1')))
+    response = lambda_handler({'queryStringParameters': {'store_id': 'store-1', 'cursor': sorted_cursor}}, None)
+    assert response['statusCode'] == 400
+
+    params = {'store_id': 'store-1', 'cursor': encode_cursor(STATUS_KEY), 'sort': 'price_drop'}
+    response = lambda_handler({'queryStringParameters': params}, None)
+    assert response['statusCode'] == 400
+    assert 'sort order' in json.loads(response['body'])
+
+
+def test_cursor_of_another_store_is_rejected():
+    response = lambda_handler({'queryStringParameters': {'store_id': 'store-2', 'cursor': encode_cursor(STATUS_KEY)}}, None)
+    assert response['statusCode'] == 400
@@ -0,0 +1,155 @@
+"""
+Unit tests for lambda_functions/min_price_cache.py.
+
+Run with: python -m pytest tests
+"""
+
+import gzip
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import min_price_cache
+from lambda_functions.min_price_cache import MinimumPriceCache
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(f"An error occurred ({code})")
+        self.response = {'Error': {'Code': code}}
+
+
+class NoSuchKey(ClientError):
+    def __init__(self):
+        super().__init__('NoSuchKey')
+
+
+class FakeS3:
+    """A snapshot object that may or may not exist, with the errors S3 raises for a missing key."""
+
+    exceptions = SimpleNamespace(NoSuchKey=NoSuchKey, ClientError=ClientError)
+
+    def __init__(self):
+        self.snapshot = None
+        self.etag = None
+        self.calls = []
+
+    def put(self, prices, etag):
+        self.snapshot = gzip.compress(json.dumps(prices).encode('utf-8'))
+        self.etag = etag
+
+    def get_object(self, Bucket, Key):
+        self.calls.append('get_object')
+        if self.snapshot is None:
+            raise NoSuchKey()
+        return {'Body': SimpleNamespace(read=lambda: self.snapshot), 'ETag': self.etag}
+
+    def head_object(self, Bucket, Key):
+        self.calls.append('head_object')
+        if self.snapshot is None:
+            raise ClientError('404')
+        return {'ETag': self.etag}
+
+
+class CountingLoader:
+    def __init__(self, prices):
+        self.prices = prices
+        self.requested = []
+
+    def __call__(self, product_ids):
+        self.requested.append(list(product_ids))
+        return {product_id: self.prices[product_id] for product_id in product_ids if product_id in self.prices}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(min_price_cache, 's3', fake)
+    # Check the snapshot on every call
+    monkeypatch.setattr(min_price_cache, 'SNAPSHOT_CHECK_SECONDS', 0)
+    return fake
+
+
+def test_products_without_minimum_are_not_looked_up_again():
+    loader = CountingLoader({'s#P1': 5.0})
+    cache = MinimumPriceCache(loader)
+
+    assert cache.get_many(['s#P1', 's#P2']) == {'s#P1': 5.0}
+    assert cache.get_many(['s#P1', 's#P2']) == {'s#P1': 5.0}
+
+    assert loader.requested == [['s#P1', 's#P2']]
+    assert (cache.stats['hits'], cache.stats['negative_hits'], cache.stats['misses']) == (1, 1, 2)
+
+
+def test_negative_lookups_expire_with_the_ttl():
+    loader = CountingLoader({})
+    cache = MinimumPriceCache(loader, ttl_seconds=-1)
+    cache.get_many(['s#P1'])
+    cache.get_many(['s#P1'])
+    assert loader.requested == [['s#P1'], ['s#P1']]
+
+
+def test_missing_snapshot_is_retried_without_logging_an_error(s3, capsys):
+    cache = MinimumPriceCache(CountingLoader({}), snapshot_bucket='bucket')
+    cache.get_many(['s#P1'])
+    cache.get_many(['s#P1'])
+
+    # No HeadObject 404s: without a snapshot every check reads it again
+    assert s3.calls == ['get_object', 'get_object']
+    assert 'Error' not in capsys.readouterr().out
+    assert cache.stats['snapshot_loads'] == 0
+
+
+def test_snapshot_is_picked_up_once_it_exists(s3):
+    loader = CountingLoader({})
+    cache = MinimumPriceCache(loader, snapshot_bucket='bucket')
+    assert cache.get_many(['s#P1']) == {}
+
+    s3.put({'s#P1': '7.5'}, '"v1"')
+    # The snapshot's price wins over the cached "no minimum price"
+    assert cache.get_many(['s#P1']) == {'s#P1': 7.5}
+    assert cache.stats['snapshot_loads'] == 1
+
+    cache.get_many(['s#P1'])
+    assert s3.calls[-1] == 'head_object'
+
+
+def test_changed_snapshot_drops_cached_entries(s3):
+    s3.put({'s#P1': '7.5'}, '"v1"')
+    loader = CountingLoader({'s#P2': 3.0})
+    cache = MinimumPriceCache(loader, snapshot_bucket='bucket')
+    assert cache.get_many(['s#P1', 's#P2']) == {'s#P1': 7.5, 's#P2': 3.0}
+
+    s3.put({'s#P1': '8.0', 's#P2': '3.5'}, '"v2"')
+    assert cache.get_many(['s#P1', 's#P2']) == {'s#P1': 8.0, 's#P2': 3.5}
+    assert cache.stats['invalidations'] == 1
+
+
+def test_deleted_snapshot_falls_back_to_the_loader(s3, capsys):
+    s3.put({'s#P1': '7.5'}, '"v1"')
+    cache = MinimumPriceCache(CountingLoader({'s#P1': 6.0}), snapshot_bucket='bucket')
+    assert cache.get_many(['s#P1']) == {'s#P1': 7.5}
+
+    s3.snapshot = None
+    assert cache.get_many(['s#P1']) == {'s#P1': 6.0}
+    assert cache.snapshot_etag is None
+    assert 'Error' not in capsys.readouterr().out
+
+
+def test_other_snapshot_errors_are_logged(s3, capsys):
+    s3.put({'s#P1': '7.5'}, '"v1"')
+    cache = MinimumPriceCache(CountingLoader({}), snapshot_bucket='bucket')
+    cache.get_many(['s#P1'])
+
+    def forbidden(Bucket, Key):
+        raise ClientError('403')
+
+    s3.head_object = forbidden
+    # The snapshot held so far keeps being used
+    assert cache.get_many(['s#P1']) == {'s#P1': 7.5}
+    assert 'Error loading minimum price snapshot' in capsys.readouterr().out
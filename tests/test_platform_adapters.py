@@ -0,0 +1,195 @@
+"""
+Unit tests for lambda_functions/platform_adapters.py and lambda_functions/platform_bulk.py.
+
+Run with: python -m pytest tests
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import sys
+from decimal import Decimal
+from urllib.parse import quote
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.stub_platform_server import start_server
+from lambda_functions import platform_bulk
+from lambda_functions.platform_adapters import PlatformAdapter
+from lambda_functions.platform_bulk import (
+    NetSuiteBulkClient,
+    PlatformError,
+    PlatformThrottled,
+    ShopifyBulkClient,
+    ZoeyBulkClient,
+    bulk_client,
+    oauth1_header,
+    send_json,
+)
+
+
+def items(*keys):
+    return [{'ProductID': product_id, 'VariantID': variant_id, 'ProposedPrice': Decimal('9.99')} for product_id, variant_id in keys]
+
+
+class SmallBatchAdapter(PlatformAdapter):
+    name = 'test'
+    max_batch_size = 2
+
+
+def test_bulk_update_sends_chunks_of_the_batch_limit_and_maps_results_back():
+    calls = []
+
+    def bulk(updates):
+        calls.append(updates)
+        # The platform rejects P3/V3 and leaves P5/V5 out of its answer
+        return {(update['product_id'], update['variant_id']): update['product_id'] != 'P3' for update in updates if update['product_id'] != 'P5'}
+
+    adapter = SmallBatchAdapter(lambda *args: True, bulk)
+    results = adapter.bulk_update(items(('P1', 'V1'), ('P2', 'V2'), ('P3', 'V3'), ('P4', 'V4'), ('P5', 'V5')))
+
+    assert adapter.batch_size == 2
+    assert [len(call) for call in calls] == [2, 2, 1]
+    assert calls[0][0] == {"product_id": 'P1', "variant_id": 'V1', "price": Decimal('9.99')}
+    assert results == {('P1', 'V1'): True, ('P2', 'V2'): True, ('P3', 'V3'): False, ('P4', 'V4'): True, ('P5', 'V5'): False}
+
+
+def test_without_bulk_function_every_item_is_its_own_update():
+    updated = []
+    adapter = SmallBatchAdapter(lambda product_id, variant_id, price: updated.append(variant_id) or variant_id != 'V2')
+    assert adapter.batch_size == 1
+    assert adapter.bulk_update(items(('P1', 'V1'), ('P1', 'V2'))) == {('P1', 'V1'): True, ('P1', 'V2'): False}
+    assert updated == ['V1', 'V2']
+
+
+def updates(*keys):
+    return [{"product_id": product_id, "variant_id": variant_id, "price": Decimal('5.00')} for product_id, variant_id in keys]
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record the requests of the bulk clients and answer them with the queued responses."""
+    requests = []
+    responses = []
+
+    def fake_send_json(method, url, payload, headers=None):
+        requests.append((method, url, payload, headers))
+        return 200, responses.pop(0)
+
+    monkeypatch.setattr(platform_bulk, 'send_json', fake_send_json)
+    return requests, responses
+
+
+def test_shopify_sends_one_aliased_mutation_per_product(sent):
+    requests, responses = sent
+    responses.append({"data": {"m0": {"userErrors": []}, "m1": {"userErrors": [{"field": ["variants", "1", "price"], "message": "bad"}]}}})
+
+    results = ShopifyBulkClient('shop.example.com', 'token')(updates(('1', '11'), ('2', '21'), ('2', '22')))
+
+    method, url, payload, headers = requests[0]
+    assert url == f"https://shop.example.com/admin/api/{platform_bulk.SHOPIFY_API_VERSION}/graphql.json"
+    assert headers == {'X-Shopify-Access-Token': 'token'}
+    assert "m0: productVariantsBulkUpdate" in payload['query'] and "m1: productVariantsBulkUpdate" in payload['query']
+    assert payload['variables']['p1'] == 'gid://shopify/Product/2'
+    assert payload['variables']['v1'] == [
+        {"id": 'gid://shopify/ProductVariant/21', "price": '5.00'},
+        {"id": 'gid://shopify/ProductVariant/22', "price": '5.00'},
+    ]
+    # The userError points at the second variant of the second product only
+    assert results == {('1', '11'): True, ('2', '21'): True, ('2', '22'): False}
+
+
+def test_shopify_error_without_variant_index_fails_the_whole_product(sent):
+    requests, responses = sent
+    responses.append({"data": {"m0": {"userErrors": [{"field": ["productId"], "message": "Product does not exist"}]}}})
+    assert ShopifyBulkClient('shop', 'token')(updates(('1', '11'), ('1', '12'))) == {('1', '11'): False, ('1', '12'): False}
+
+
+def test_shopify_splits_products_across_requests(sent, monkeypatch):
+    monkeypatch.setattr(platform_bulk, 'SHOPIFY_PRODUCTS_PER_REQUEST', 2)
+    requests, responses = sent
+    responses.extend([{"data": {"m0": {"userErrors": []}, "m1": {"userErrors": []}}}, {"data": {"m0": {"userErrors": []}}}])
+    results = ShopifyBulkClient('shop', 'token')(updates(('1', '11'), ('2', '21'), ('3', '31')))
+    assert len(requests) == 2
+    assert all(results.values()) and len(results) == 3
+
+
+def test_shopify_throttling_reports_the_wait_for_the_query_cost(sent):
+    requests, responses = sent
+    responses.append({
+        "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+        "extensions": {"cost": {"requestedQueryCost": 500, "throttleStatus": {"currentlyAvailable": 100, "restoreRate": 50}}},
+    })
+    with pytest.raises(PlatformThrottled) as error:
+        ShopifyBulkClient('shop', 'token')(updates(('1', '11')))
+    assert error.value.retry_after == 8.0
+
+
+def test_netsuite_maps_restlet_results_back(sent):
+    requests, responses = sent
+    responses.append({"results": [{"product_id": "1", "variant_id": "11", "success": True}, {"product_id": "2", "variant_id": "21", "success": False}]})
+    client = NetSuiteBulkClient('https://123-sb1.restlets.api.netsuite.com/app/site/hosting/restlet.nl?script=1&deploy=1',
+                                '123-sb1', 'ck', 'cs', 'tk', 'ts')
+    assert client(updates(('1', '11'), ('2', '21'))) == {('1', '11'): True, ('2', '21'): False}
+    method, _, payload, headers = requests[0]
+    assert method == 'POST' and payload == {"updates": updates(('1', '11'), ('2', '21'))}
+    assert headers['Authorization'].startswith('OAuth realm="123_SB1", ')
+
+
+def test_zoey_maps_success_messages_back_to_variants(sent):
+    requests, responses = sent
+    responses.append({"messages": {"success": [{"product_id": 11, "code": 200}], "error": [{"product_id": 21, "code": 400}]}})
+    results = ZoeyBulkClient('https://store.example.com/', 'ck', 'cs', 'tk', 'ts')(updates(('1', '11'), ('2', '21')))
+    assert results == {('1', '11'): True, ('2', '21'): False}
+    method, url, payload, _ = requests[0]
+    assert (method, url) == ('PUT', 'https://store.example.com/api/rest/products')
+    assert payload == [{"entity_id": '11', "price": '5.00'}, {"entity_id": '21', "price": '5.00'}]
+
+
+def test_oauth1_signature_covers_method_url_and_query(monkeypatch):
+    monkeypatch.setattr(platform_bulk.time, 'time', lambda: 1700000000)
+    monkeypatch.setattr(platform_bulk.secrets, 'token_hex', lambda size: 'nonce')
+    header = oauth1_header('POST', 'https://Example.com/path?b=2&a=1', 'ck', 'cs', 'tk', 'ts', realm='R')
+
+    parameters = "a=1&b=2&oauth_consumer_key=ck&oauth_nonce=nonce&oauth_signature_method=HMAC-SHA256" \
+                 "&oauth_timestamp=1700000000&oauth_token=tk&oauth_version=1.0"
+    base_string = f"POST&{quote('https://example.com/path', safe='')}&{quote(parameters, safe='')}"
+    signature = base64.b64encode(hmac.new(b'cs&ts', base_string.encode(), hashlib.sha256).digest()).decode()
+    assert header.startswith('OAuth realm="R", oauth_consumer_key="ck"')
+    assert f'oauth_signature="{quote(signature, safe="~")}"' in header
+
+
+def test_clients_are_only_built_with_complete_credentials(monkeypatch):
+    monkeypatch.setenv('SHOPIFY_SHOP_DOMAIN', 'shop.example.com')
+    monkeypatch.delenv('SHOPIFY_ACCESS_TOKEN', raising=False)
+    assert bulk_client('shopify') is None
+    monkeypatch.setenv('SHOPIFY_ACCESS_TOKEN', 'token')
+    assert isinstance(bulk_client('shopify'), ShopifyBulkClient)
+    assert bulk_client('unknown') is None
+
+
+def test_send_json_raises_throttled_with_retry_after():
+    server = start_server(latency_ms=0, throttle_rate=1.0)
+    try:
+        with pytest.raises(PlatformThrottled) as error:
+            send_json('POST', f"http://127.0.0.1:{server.server_port}/zoey/prices", {"items": []})
+        assert error.value.retry_after == '0.1'
+    finally:
+        server.shutdown()
+
+
+def test_send_json_returns_the_parsed_body():
+    server = start_server(latency_ms=0)
+    try:
+        status, body = send_json('POST', f"http://127.0.0.1:{server.server_port}/shopify/prices", {"items": [1, 2]})
+        assert (status, body) == (200, {"updated": 2})
+    finally:
+        server.shutdown()
+
+
+def test_connection_errors_become_platform_errors():
+    with pytest.raises(PlatformError):
+        send_json('POST', "http://127.0.0.1:9/prices", {})
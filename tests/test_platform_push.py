@@ -0,0 +1,95 @@
+"""
+Unit tests for the backoff and rate limiting of lambda_functions/platform_push.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions import platform_push
+from lambda_functions.platform_push import BASE_BACKOFF_SECONDS, MAX_BACKOFF_SECONDS, RateLimiter, backoff_delay, push_with_retry
+
+
+class Throttled(Exception):
+    retry_after = '2'
+
+
+class FakeAdapter:
+    name = 'fake'
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def update(self, product_id, variant_id, price):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise Throttled("429 Too Many Requests")
+        return True
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self.pauses = []
+
+    def acquire(self):
+        self.acquired += 1
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+def test_retry_after_is_used_as_given():
+    assert backoff_delay(0, retry_after='3') == 3.0
+    assert backoff_delay(5, retry_after=0.25) == 0.25
+
+
+def test_retry_after_is_capped():
+    assert backoff_delay(0, retry_after=3600) == MAX_BACKOFF_SECONDS
+
+
+def test_negative_retry_after_means_no_delay():
+    assert backoff_delay(0, retry_after=-5) == 0
+
+
+def test_unparseable_retry_after_falls_back_to_jittered_backoff():
+    for _ in range(100):
+        assert 0 <= backoff_delay(0, retry_after='Wed, 21 Oct 2026 07:28:00 GMT') <= BASE_BACKOFF_SECONDS
+
+
+def test_jittered_backoff_grows_up_to_the_cap():
+    for attempt in range(10):
+        for _ in range(50):
+            assert 0 <= backoff_delay(attempt) <= min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def test_pause_holds_back_acquire(monkeypatch):
+    clock = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(platform_push.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(platform_push.time, 'sleep', sleep)
+
+    limiter = RateLimiter(rate=4)
+    limiter.pause(2)
+    limiter.acquire()
+    # Waits out the pause, then the emptied bucket refills at the sustained rate
+    assert clock[0] == 102.25
+    assert sleeps == [2.0, 0.25]
+
+
+def test_retry_after_pauses_the_shared_limiter(monkeypatch):
+    monkeypatch.setattr(platform_push.time, 'sleep', lambda seconds: None)
+    limiter = RecordingLimiter()
+    outcomes = push_with_retry(FakeAdapter(failures=1), limiter, [{'ProductID': 'P1', 'VariantID': 'V1', 'ProposedPrice': 1}])
+    assert outcomes == {('P1', 'V1'): (True, None)}
+    assert limiter.pauses == [2.0]
+    assert limiter.acquired == 2
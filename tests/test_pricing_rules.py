@@ -0,0 +1,155 @@
+"""
+Unit tests for lambda_functions/pricing_rules.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.pricing_rules import (
+    MatchCompetitor,
+    MaxDailyDelta,
+    PriceBounds,
+    PricingEngine,
+    PricingRule,
+    RoundToEnding,
+    UndercutByPercent,
+)
+
+
+def feed(**columns):
+    return {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def test_pricing_rule_is_abstract():
+    with pytest.raises(TypeError):
+        PricingRule()
+
+
+def test_match_competitor():
+    f = feed(competitor_price=[9.5, 20.0, 4.0], current_price=[10.0, 10.0, 10.0], minimum_price=[5.0, 5.0, 5.0])
+    # Matches only a cheaper competitor that is still at or above the minimum price
+    np.testing.assert_allclose(MatchCompetitor().apply(np.array([10.0, 10.0, 10.0]), f), [9.5, 10.0, 10.0])
+
+
+def test_undercut_by_percent():
+    f = feed(competitor_price=[100.0, 20.0], current_price=[120.0, 15.0])
+    # Only undercuts where the competitor is cheaper than the current price
+    np.testing.assert_allclose(UndercutByPercent(5).apply(np.array([120.0, 15.0]), f), [95.0, 15.0])
+
+
+def test_price_bounds_constants_and_columns():
+    f = feed(minimum_price=[10.0, 10.0, 10.0], map_price=[15.0, 15.0, 15.0])
+    proposed = np.array([5.0, 12.0, 30.0])
+    np.testing.assert_allclose(PriceBounds(floor=8, ceiling=20).apply(proposed, f), [8.0, 12.0, 20.0])
+    np.testing.assert_allclose(
+        PriceBounds(floor_column='minimum_price', ceiling_column='map_price').apply(proposed, f),
+        [10.0, 12.0, 15.0],
+    )
+
+
+def test_round_to_ending():
+    proposed = np.array([12.34, 12.99, 13.00, 0.50])
+    np.testing.assert_allclose(RoundToEnding(0.99).apply(proposed, {}), [11.99, 12.99, 12.99, 0.50])
+
+
+def test_round_to_ending_never_goes_negative():
+    proposed = np.array([0.0, 0.25, 0.98])
+    assert (RoundToEnding(0.99).apply(proposed, {}) >= 0).all()
+
+
+def test_max_daily_delta():
+    f = feed(current_price=[100.0, 100.0, 100.0])
+    proposed = np.array([50.0, 105.0, 150.0])
+    np.testing.assert_allclose(MaxDailyDelta(max_percent=10).apply(proposed, f), [90.0, 105.0, 110.0])
+
+
+def test_default_engine_matches_competitor():
+    engine = PricingEngine()
+    result = engine.evaluate(current_price=[10.0, 10.0], competitor_price=[12.0, 8.0], minimum_price=[5.0, 5.0])
+    np.testing.assert_allclose(result, [10.0, 8.0])
+
+
+def test_from_config_composes_rules_in_order():
+    engine = PricingEngine.from_config([
+        {"rule": "undercut", "percent": 10},
+        {"rule": "round_ending", "ending": 0.99},
+    ])
+    result = engine.evaluate(current_price=[30.0], competitor_price=[20.0], minimum_price=[1.0])
+    # 20 - 10% = 18.00, rounded down to the .99 ending
+    np.testing.assert_allclose(result, [17.99])
+
+
+def test_from_config_rejects_unknown_rule():
+    with pytest.raises(ValueError):
+        PricingEngine.from_config([{"rule": "nope"}])
+
+
+@pytest.mark.parametrize('spec', [
+    {"rule": "undercut", "percent": "abc"},
+    {"rule": "undercut", "percent": -5},
+    {"rule": "undercut", "percent": 100},
+    {"rule": "undercut"},
+    {"rule": "round_ending", "ending": 1.5},
+    {"rule": "round_ending", "ending": None},
+    {"rule": "bounds", "floor": float('nan')},
+    {"rule": "bounds", "floor": 20, "ceiling": 10},
+    {"rule": "bounds", "ceiling": True},
+    {"rule": "max_delta", "max_percent": -1},
+    {"rule": "max_delta", "max_amount": [5]},
+    {"rule": "match_competitor", "percent": 5},
+])
+def test_from_config_rejects_invalid_options(spec):
+    with pytest.raises(ValueError):
+        PricingEngine.from_config([spec])
+
+
+def test_from_config_converts_options_to_numbers():
+    rules = PricingEngine.from_config([
+        {"rule": "undercut", "percent": "2.5"},
+        {"rule": "bounds", "floor": "1", "ceiling": 50},
+        {"rule": "max_delta", "max_amount": "3"},
+    ]).rules
+    assert (rules[0].percent, rules[1].floor, rules[1].ceiling, rules[2].max_amount) == (2.5, 1.0, 50.0, 3.0)
+
+
+def test_from_config_checks_bound_columns():
+    with pytest.raises(ValueError, match='map_price'):
+        PricingEngine.from_config([{"rule": "bounds", "ceiling_column": "map_price"}])
+    engine = PricingEngine.from_config([{"rule": "bounds", "ceiling_column": "map_price"}], extra_columns=['map_price'])
+    result = engine.evaluate(current_price=[30.0], competitor_price=[20.0], minimum_price=[1.0], map_price=[25.0])
+    np.testing.assert_allclose(result, [25.0])
+
+
+def test_from_config_rejects_malformed_specs():
+    with pytest.raises(ValueError):
+        PricingEngine.from_config({"rule": "undercut"})
+    with pytest.raises(ValueError):
+        PricingEngine.from_config(["undercut"])
+
+
+def test_undercut_never_goes_below_minimum_price():
+    engine = PricingEngine.from_config([{"rule": "undercut", "percent": 20}])
+    result = engine.evaluate(current_price=[12.0], competitor_price=[11.0], minimum_price=[10.5])
+    np.testing.assert_allclose(result, [10.5])
+
+
+def test_round_ending_after_match_never_goes_below_minimum_price():
+    engine = PricingEngine.from_config([
+        {"rule": "match_competitor"},
+        {"rule": "round_ending", "ending": 0.99},
+    ])
+    result = engine.evaluate(current_price=[12.0], competitor_price=[10.6], minimum_price=[10.5])
+    np.testing.assert_allclose(result, [10.5])
+
+
+def test_evaluate_rounds_to_cents():
+    engine = PricingEngine.from_config([{"rule": "undercut", "percent": 3}])
+    result = engine.evaluate(current_price=[20.0], competitor_price=[19.99], minimum_price=[1.0])
+    np.testing.assert_allclose(result, [19.39])
@@ -0,0 +1,92 @@
+"""
+Unit tests for lambda_functions/status_transitions.py.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lambda_functions.status_transitions import InvalidTransition, TransitionConflict, transition_update
+from lambda_functions.stores import proposal_key
+
+
+KEY = proposal_key('store-1', 'P1', 'V1')
+
+
+def test_unknown_target_status_is_rejected():
+    with pytest.raises(InvalidTransition):
+        transition_update(KEY, 'Pending')
+
+
+def test_condition_lists_every_allowed_source_as_a_placeholder():
+    update = transition_update(KEY, 'Approved')
+    assert update['Key'] == KEY
+    assert update['ConditionExpression'] == "#status IN (:from0)"
+    assert update['ExpressionAttributeValues'][':from0'] == 'Pending'
+    assert update['ExpressionAttributeValues'][':new_status'] == 'Approved'
+    assert update['ExpressionAttributeNames']['#status'] == 'ApprovalStatus'
+
+
+def test_completed_may_only_start_from_approved():
+    values = transition_update(KEY, 'Completed')['ExpressionAttributeValues']
+    assert [values[name] for name in values if name.startswith(':from')] == ['Approved']
+
+
+def test_no_expected_version_skips_the_version_check():
+    update = transition_update(KEY, 'Approved')
+    assert '#version' not in update['ConditionExpression']
+    assert ':expected_version' not in update['ExpressionAttributeValues']
+
+
+def test_expected_version_zero_requires_a_row_without_version():
+    update = transition_update(KEY, 'Approved', expected_version=0)
+    assert update['ConditionExpression'].endswith(" AND attribute_not_exists(#version)")
+    assert ':expected_version' not in update['ExpressionAttributeValues']
+
+
+def test_expected_version_requires_the_version_that_was_read():
+    update = transition_update(KEY, 'Approved', expected_version='3')
+    assert update['ConditionExpression'].endswith(" AND #version = :expected_version")
+    assert update['ExpressionAttributeValues'][':expected_version'] == 3
+
+
+def test_every_transition_increments_the_version():
+    update = transition_update(KEY, 'Rejected', expected_version=2)
+    assert update['UpdateExpression'].endswith(" ADD #version :one")
+    assert update['ExpressionAttributeValues'][':one'] == 1
+
+
+def test_indexed_status_sets_the_index_keys_of_its_store():
+    update = transition_update(KEY, 'Approved')
+    assert "StoreStatus = :store_status" in update['UpdateExpression']
+    assert "StatusUpdatedAt = :updated_at" in update['UpdateExpression']
+    assert "REMOVE" not in update['UpdateExpression']
+    assert update['ExpressionAttributeValues'][':store_status'] == 'store-1#Approved'
+
+
+def test_unindexed_status_removes_the_index_keys():
+    update = transition_update(KEY, 'Completed', remove_attributes=('ApplyAttempts',))
+    set_part, remove_part = update['UpdateExpression'].split(" REMOVE ")
+    assert "StoreStatus" not in set_part
+    assert remove_part.startswith("ApplyAttempts, StoreStatus, StatusUpdatedAt")
+    assert ':store_status' not in update['ExpressionAttributeValues']
+
+
+def test_set_attributes_use_name_and_value_placeholders():
+    update = transition_update(KEY, 'Approved', set_attributes={'ReviewedBy': 'alice', 'Note': 'ok'})
+    assert "#set0 = :set0" in update['UpdateExpression']
+    assert "#set1 = :set1" in update['UpdateExpression']
+    assert update['ExpressionAttributeNames']['#set0'] == 'ReviewedBy'
+    assert update['ExpressionAttributeValues'][':set1'] == 'ok'
+
+
+def test_conflict_message_names_the_current_status():
+    error = TransitionConflict(KEY, 'Approved', {'ApprovalStatus': 'Completed'})
+    assert "store-1" in str(error)
+    assert "it is Completed" in str(error)
+    assert "it is missing" in str(TransitionConflict(KEY, 'Approved'))